@@ -105,6 +105,16 @@ DATABASES = {
     }
 }
 
+# shared between gunicorn workers, the adjustments cache relies on it
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", os.path.join(BASE_DIR, "cache")),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -143,6 +153,15 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "common.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "common.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -174,4 +193,33 @@ MEDIA_URL = "/media/"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+STORAGES = {
+    # uploads are stored once per content, see common.storage
+    "default": {"BACKEND": "common.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# a blob stored or reused this recently is never purged (roses.blobs), an
+# upload of the same content may not have committed its reference yet
+BLOB_GRACE_SECONDS = int(os.getenv("BLOB_GRACE_SECONDS", 3600))
+
+# hand /media/ and /static/ transfers to nginx (common.media), the
+# /protected/ locations of nginx/default.conf
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", "0") == "1"
+
+# media only for logged in users; nginx sends public media from disk and has
+# to be built with the same value to route /media/ here (nginx/Dockerfile)
+MEDIA_AUTHENTICATED = os.getenv("MEDIA_AUTHENTICATED", "0") == "1"
+
+# worker processes rendering image variants (common.images), 0 renders inline
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# caps on uploaded images, checked from the header (common.uploads); a 40
+# megapixel camera JPEG fits, 50 megapixels decode to at most 200 MB of RGBA
+IMAGE_UPLOAD_MAX_BYTES = int(os.getenv("IMAGE_UPLOAD_MAX_BYTES", 30 * 1024 * 1024))
+IMAGE_UPLOAD_MAX_PIXELS = int(os.getenv("IMAGE_UPLOAD_MAX_PIXELS", 50_000_000))
+
+# larger uploads are streamed to a temporary file instead of kept in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -1,20 +1,38 @@
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from django.conf import settings
-from django.views.static import serve
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.views.generic import TemplateView
 
+from common import media
+from common.batch import BatchView
+from common.storage import ContentAddressedStorage
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/batch/", BatchView.as_view(), name="batch"),
     path("api/", include("roses.urls")),
     path("api/auth/", include("userprofile.urls")),
     # schemas
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="docs"),
-    # left for local startups
-    re_path(r"^static/(?P<path>.*)$", serve, {"document_root": settings.STATIC_ROOT}),
-    re_path(r"^media/(?P<path>.*)$", serve, {"document_root": settings.MEDIA_ROOT}),
+    # files: nginx sends them (X-Accel-Redirect), local startups stream them
+    re_path(
+        r"^static/(?P<path>.*)$",
+        media.serve,
+        {"root_setting": "STATIC_ROOT", "accel_prefix": "/protected/static/"},
+        name="static",
+    ),
+    re_path(
+        r"^media/(?P<path>.*)$",
+        media.serve,
+        {
+            "root_setting": "MEDIA_ROOT",
+            "accel_prefix": "/protected/media/",
+            "private": True,
+            "immutable": f"{ContentAddressedStorage.prefix}/",
+        },
+        name="media",
+    ),
     re_path(r"^.*$", TemplateView.as_view(template_name="index.html")),
 ]
@@ -1,4 +1,24 @@
-from .viewsets import NestedViewSet
+from .plans import QueryPlan, build_query_plan
+from .rows import RowSerializer
+from .sparse import prune_fields
+from .viewsets import (
+    BatchMixin,
+    NestedViewSet,
+    QueryPlanMixin,
+    RowListMixin,
+    SparseFieldsMixin,
+)
 from .utils import get_filename
 
-__all__ = ["get_filename", "NestedViewSet"]
+__all__ = [
+    "BatchMixin",
+    "build_query_plan",
+    "get_filename",
+    "prune_fields",
+    "NestedViewSet",
+    "QueryPlan",
+    "QueryPlanMixin",
+    "RowListMixin",
+    "RowSerializer",
+    "SparseFieldsMixin",
+]
@@ -0,0 +1,198 @@
+"""
+several api calls in one round trip, see BatchView.
+
+sub-requests are resolved and dispatched in process, skipping the middleware
+and re-authentication: the batch request is authenticated (and csrf checked)
+once and its user is handed to every sub-request. runs of consecutive reads
+are dispatched concurrently, writes run alone and in order, so a read listed
+after a write sees it.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import unquote_to_bytes, urlsplit
+
+import orjson
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from django.utils.encoding import iri_to_uri
+from drf_spectacular.utils import extend_schema
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+PREFIX = "/api/"
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=METHODS, default="GET")
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False, default=None)
+    headers = serializers.DictField(
+        child=serializers.CharField(), required=False, default=dict
+    )
+
+    def validate_path(self, value):
+        if not value.startswith(PREFIX):
+            raise serializers.ValidationError(f"Paths must start with {PREFIX}")
+        return value
+
+
+class SubResponseSerializer(serializers.Serializer):
+    status = serializers.IntegerField()
+    headers = serializers.DictField(child=serializers.CharField())
+    body = serializers.JSONField(allow_null=True)
+
+
+def build_environ(request, sub):
+    """the batch request's environ, rewritten for one sub-request"""
+
+    url = urlsplit(iri_to_uri(sub["path"]))
+    body = b"" if sub["body"] is None else orjson.dumps(sub["body"])
+
+    environ = {
+        key: value
+        for key, value in request.META.items()
+        if not key.startswith("HTTP_IF_")
+    }
+    environ.update(
+        {
+            "REQUEST_METHOD": sub["method"],
+            # wsgi servers hand the path over unquoted, as latin-1
+            "PATH_INFO": unquote_to_bytes(url.path).decode("iso-8859-1"),
+            "QUERY_STRING": url.query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "HTTP_ACCEPT": "application/json, */*",
+            "wsgi.input": BytesIO(body),
+        }
+    )
+    for name, value in sub["headers"].items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+    return environ
+
+
+def response_body(response):
+    if getattr(response, "data", None) is not None:
+        # drf responses are rendered once, as part of the batch
+        return response.data
+    if hasattr(response, "render"):
+        response.render()
+    if not response.content:
+        return None
+    if response.get("Content-Type", "").startswith("application/json"):
+        return orjson.loads(response.content)
+    return response.content.decode(response.charset)
+
+
+def error(status, detail):
+    return {"status": status, "headers": {}, "body": {"detail": detail}}
+
+
+class BatchView(APIView):
+    """
+    takes a list of {method, path, body, headers} and answers with a list of
+    {status, headers, body} in the same order.
+    """
+
+    max_requests = 20
+    max_workers = 4
+
+    @extend_schema(
+        request=SubRequestSerializer(many=True),
+        responses=SubResponseSerializer(many=True),
+    )
+    def post(self, request):
+        serializer = SubRequestSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        subs = serializer.validated_data
+
+        if not subs or len(subs) > self.max_requests:
+            raise serializers.ValidationError(
+                {
+                    "non_field_errors": [
+                        f"Expected between 1 and {self.max_requests} requests."
+                    ]
+                }
+            )
+
+        response = Response()
+        results = [None] * len(subs)
+        reads = []
+
+        def flush():
+            for index, result in zip(reads, self.run_reads(request, reads, subs)):
+                results[index] = result
+            reads.clear()
+
+        for index, sub in enumerate(subs):
+            if sub["method"] in SAFE_METHODS:
+                reads.append(index)
+                continue
+            flush()
+            results[index] = self.run(request, sub, response)
+        flush()
+
+        response.data = results
+        return response
+
+    def concurrent(self):
+        # threads get their own connections, which can't see a transaction
+        # opened on this one (ATOMIC_REQUESTS, tests)
+        return self.max_workers > 1 and not any(
+            connection.in_atomic_block
+            for connection in connections.all(initialized_only=True)
+        )
+
+    def run_reads(self, request, indexes, subs):
+        if len(indexes) < 2 or not self.concurrent():
+            return [self.run(request, subs[index]) for index in indexes]
+
+        def run_in_thread(sub):
+            try:
+                return self.run(request, sub)
+            finally:
+                connections.close_all()
+
+        workers = min(self.max_workers, len(indexes))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(run_in_thread, [subs[i] for i in indexes]))
+
+    def run(self, request, sub, batch_response=None):
+        """dispatch one sub-request, cookies it sets go on ``batch_response``"""
+
+        environ = build_environ(request, sub)
+        try:
+            match = resolve(environ["PATH_INFO"])
+        except Resolver404:
+            match = None
+        # the spa catch-all resolves everything else, only api views count
+        if match is None or not hasattr(match.func, "cls"):
+            return error(404, "Not found.")
+        if match.func.cls is type(self):
+            return error(400, "Batches can't be nested.")
+
+        sub_request = WSGIRequest(environ)
+        sub_request.resolver_match = match
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        except Exception as exc:
+            # what the handler would have answered, a 500 page unless DEBUG
+            response = response_for_exception(sub_request, exc)
+        if response.streaming:
+            return error(400, "Streaming responses can't be batched.")
+        if batch_response is not None:
+            batch_response.cookies.update(response.cookies)
+
+        return {
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            "body": response_body(response),
+        }
@@ -0,0 +1,81 @@
+"""
+BlurHash encoding (https://blurha.sh): a photo as a few dozen characters that
+decode to a blurred placeholder on the client.
+
+the image is taken apart into the first ``x × y`` cosine components of its
+colours in linear light; the average colour and the quantised factors of the
+others are written in base 83.
+"""
+
+import numpy as np
+
+ALPHABET = (
+    "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    "abcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+)
+
+
+def base83(value, length):
+    return "".join(
+        ALPHABET[value // 83 ** (length - i) % 83] for i in range(1, length + 1)
+    )
+
+
+def to_linear(srgb):
+    value = srgb / 255
+    return np.where(value <= 0.04045, value / 12.92, ((value + 0.055) / 1.055) ** 2.4)
+
+
+def to_srgb(linear):
+    value = min(max(linear, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def encode(image, components=None):
+    """
+    the BlurHash of an RGB Pillow image; ``components`` (x, y) between 1 and
+    9, by default 4 along the longer edge and 3 along the shorter. a small
+    image (some 32 pixels) gives the same hash as a large one, and faster.
+    """
+
+    width, height = image.size
+    if components is None:
+        components = (4, 3) if width >= height else (3, 4)
+    x_components, y_components = components
+    if not (1 <= x_components <= 9 and 1 <= y_components <= 9):
+        raise ValueError("BlurHash components must be between 1 and 9")
+
+    pixels = to_linear(np.asarray(image, dtype=np.float64))
+    basis_x = np.cos(
+        np.pi * np.outer(np.arange(x_components), np.arange(width)) / width
+    )
+    basis_y = np.cos(
+        np.pi * np.outer(np.arange(y_components), np.arange(height)) / height
+    )
+    # factors[j, i] = mean of pixel * cos(pi i x / width) * cos(pi j y / height),
+    # doubled for every component but the average colour
+    factors = np.einsum("jy,ix,yxc->jic", basis_y, basis_x, pixels)
+    factors *= 2 / (width * height)
+    factors[0, 0] /= 2
+    factors = factors.reshape(-1, 3)
+
+    dc, ac = factors[0], factors[1:]
+    result = base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+    else:
+        quantised_max, maximum = 0, 1
+    result += base83(quantised_max, 1)
+
+    r, g, b = (to_srgb(channel) for channel in dc)
+    result += base83((r << 16) + (g << 8) + b, 4)
+
+    scaled = ac / maximum
+    quantised = np.floor(np.sign(scaled) * np.abs(scaled) ** 0.5 * 9 + 9.5)
+    quantised = np.clip(quantised, 0, 18).astype(int)
+    for red, green, blue in quantised:
+        result += base83(red * 19 * 19 + green * 19 + blue, 2)
+    return result
@@ -0,0 +1,299 @@
+"""
+resized JPEG and WebP variants of uploaded photos.
+
+when a model with an image field commits a new upload, the variants are
+rendered off the request thread: ``schedule`` hands the job to a pool of
+``settings.IMAGE_WORKERS`` processes (0 renders inline). a worker decodes the
+original once, shrinks it step by step through VARIANTS from the largest size
+down and writes every variant beside the original, ``<name>.<variant>.<ext>``,
+then stores the variant names and pixel sizes in the model's ``variants``
+column, with the BlurHash of the smallest one in ``blurhash`` (the blurred
+tile shown until the photo arrives). a row whose photo changed in the
+meantime is left alone.
+"""
+
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from . import blurhash
+
+# variant name: longest edge in pixels, originals are never upscaled
+VARIANTS = {"grid": 480, "detail": 1200, "full": 2400}
+
+# format: (extension, Pillow save options)
+FORMATS = {
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("webp", {"quality": 80, "method": 4}),
+}
+
+# longest edge the BlurHash is computed at, more pixels don't change it
+BLURHASH_SIZE = 32
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def variant_name(name, variant, format):
+    root, _ = os.path.splitext(name)
+    return f"{root}.{variant}.{FORMATS[format][0]}"
+
+
+def flatten(image):
+    """RGB for JPEG, transparency composed onto white"""
+
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def save(image, path, format):
+    # written next to the target and renamed, readers never see half a file
+    # and two jobs rendering the same photo don't share a temporary file
+    fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as file:
+            image.save(file, format=format.upper(), **FORMATS[format][1])
+        # mkstemp creates the file private, the variants are served
+        os.chmod(tmp, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def render_variants(source, targets):
+    """
+    render ``targets`` ({variant: {format: path}}) from the image at
+    ``source``, returns {variant: (width, height)}
+    """
+
+    largest = max(VARIANTS[variant] for variant in targets)
+    sizes = {}
+    with Image.open(source) as image:
+        # JPEGs decode straight at a fraction of their size when that still
+        # covers the largest variant
+        image.draft("RGB", (largest, largest))
+        image = flatten(ImageOps.exif_transpose(image))
+
+        for variant in sorted(targets, key=VARIANTS.get, reverse=True):
+            edge = VARIANTS[variant]
+            image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            for format, path in targets[variant].items():
+                save(image, path, format)
+            sizes[variant] = image.size
+    return sizes
+
+
+def downscale(file, edge):
+    """
+    ``file`` as a JPEG at most ``edge`` pixels on its longest side. a JPEG is
+    decoded straight at the smallest fraction of its size that covers
+    ``edge``, a 40 megapixel photo never lands in memory whole; it is turned
+    and flattened once small.
+    """
+
+    with Image.open(file) as image:
+        scale = min(1, edge / max(image.size))
+        image.draft("RGB", (round(image.width * scale), round(image.height * scale)))
+        # no second, more conservative draft from thumbnail()
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=None)
+        image = flatten(ImageOps.exif_transpose(image))
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", **FORMATS["jpeg"][1])
+    root, _ = os.path.splitext(os.path.basename(file.name))
+    return ContentFile(buffer.getvalue(), name=f"{root}.{FORMATS['jpeg'][0]}")
+
+
+def render_blurhash(source):
+    with Image.open(source) as image:
+        image.draft("RGB", (BLURHASH_SIZE * 2, BLURHASH_SIZE * 2))
+        image = flatten(ImageOps.exif_transpose(image))
+        image.thumbnail((BLURHASH_SIZE, BLURHASH_SIZE), Image.Resampling.BOX)
+        return blurhash.encode(image)
+
+
+def build_variants(label, pk, field, name):
+    """
+    the job: render the variants of one stored photo and its BlurHash, and
+    record them
+    """
+
+    model = apps.get_model(label)
+    names = {
+        variant: {format: variant_name(name, variant, format) for format in FORMATS}
+        for variant in VARIANTS
+    }
+    targets = {
+        variant: {format: default_storage.path(n) for format, n in formats.items()}
+        for variant, formats in names.items()
+    }
+    sizes = render_variants(default_storage.path(name), targets)
+    # the smallest variant is already oriented and decodes quickest
+    smallest = min(VARIANTS, key=VARIANTS.get)
+    encoded = render_blurhash(targets[smallest]["jpeg"])
+
+    variants = {
+        variant: {"width": width, "height": height, **names[variant]}
+        for variant, (width, height) in sizes.items()
+    }
+    model.objects.filter(pk=pk, **{field: name}).update(
+        variants=variants, blurhash=encoded, updated_at=timezone.now()
+    )
+    return variants
+
+
+def build_blurhash(label, pk, field, name):
+    """the job for photos whose variants are rendered but have no BlurHash"""
+
+    model = apps.get_model(label)
+    encoded = render_blurhash(default_storage.path(name))
+    model.objects.filter(pk=pk, **{field: name}).update(
+        blurhash=encoded, updated_at=timezone.now()
+    )
+    return encoded
+
+
+def run_job(job, *args):
+    # a worker process is long lived, its connection is handled like a
+    # request's
+    close_old_connections()
+    try:
+        return job(*args)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    """
+    the process pool, started on first use. workers are spawned rather than
+    forked from a threaded server and set Django up before their first job.
+    """
+
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        )
+    return _executor
+
+
+def report(future):
+    if future.exception() is not None:
+        logger.error("rendering image variants failed", exc_info=future.exception())
+
+
+def attempt(job, *args):
+    try:
+        job(*args)
+    except Exception as error:
+        return error
+
+
+def run_all(job, jobs):
+    """
+    run ``job`` over every argument tuple of ``jobs`` on the pool (or inline),
+    returns the exception of each, None for those that succeeded
+    """
+
+    if not settings.IMAGE_WORKERS:
+        return [attempt(job, *args) for args in jobs]
+    executor = get_executor()
+    futures = [executor.submit(run_job, job, *args) for args in jobs]
+    return [future.exception() for future in futures]
+
+
+def submit(label, pk, field, name):
+    if not settings.IMAGE_WORKERS:
+        return build_variants(label, pk, field, name)
+    future = get_executor().submit(run_job, build_variants, label, pk, field, name)
+    future.add_done_callback(report)
+    return future
+
+
+def remember(instance, field="photo"):
+    """post_init and after every save, a deferred photo is left out"""
+
+    if field not in instance.get_deferred_fields():
+        instance._image_names = {field: getattr(instance, field).name}
+
+
+def commit(instance, field="photo"):
+    """
+    store a pending upload the way FileField.pre_save would, so its final name
+    (the content hash with a content-addressed storage) is known
+    """
+
+    if field in instance.get_deferred_fields():
+        return
+    image = getattr(instance, field)
+    if image and not image._committed:
+        image.save(image.name, image.file, save=False)
+
+
+def changed(instance, field="photo"):
+    """whether the photo was replaced since the row was read or written"""
+
+    if field in instance.get_deferred_fields():
+        return False
+    image = getattr(instance, field)
+    loaded = getattr(instance, "_image_names", {}).get(field)
+    return not image._committed or image.name != loaded
+
+
+def schedule(instance, field="photo"):
+    """
+    render the variants once the transaction saving the upload commits. the
+    placeholder a field defaults to has no variants.
+    """
+
+    name = getattr(instance, field).name
+    if not name or name == instance._meta.get_field(field).get_default():
+        return
+    args = (instance._meta.label, instance.pk, field, name)
+    transaction.on_commit(lambda: submit(*args), robust=True)
+
+
+class VariantsField(serializers.ReadOnlyField):
+    """
+    ``variants`` as urls: {variant: {"width", "height", "jpeg", "webp"}}, None
+    until the variants are rendered
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+
+        request = self.context.get("request")
+
+        def url(name):
+            url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            variant: {
+                key: url(item) if key in FORMATS else item
+                for key, item in entry.items()
+            }
+            for variant, entry in value.items()
+        }
@@ -0,0 +1,107 @@
+"""
+delivery of uploaded media and static files.
+
+django only authorises the request and resolves the path, the bytes never go
+through python: behind nginx (``settings.MEDIA_ACCEL_REDIRECT``) the response
+is an empty X-Accel-Redirect to an internal location that aliases the same
+directory, see nginx/default.conf. without nginx (local runs) the file is
+handed to a FileResponse, which the wsgi server sends with its file wrapper
+(sendfile where available).
+"""
+
+import mimetypes
+import posixpath
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    HttpResponseNotModified,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+
+
+def resolve(root, path):
+    """
+    the file ``path`` names below ``root``. hidden files and the temporary
+    files of half written uploads and variants are never served.
+    """
+
+    path = posixpath.normpath(path).lstrip("/")
+    if any(part.startswith(".") for part in path.split("/")) or path.endswith(".tmp"):
+        raise Http404("Not found")
+    try:
+        fullpath = Path(safe_join(root, path))
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    if not fullpath.is_file():
+        raise Http404("Not found")
+    return path, fullpath
+
+
+def authenticated(request):
+    """whether the api authentication (the jwt cookie) accepts the request"""
+
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            if authentication_class().authenticate(request) is not None:
+                return True
+        except exceptions.AuthenticationFailed:
+            return False
+    return False
+
+
+# a year, the longest max-age caches are expected to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def serve(request, path, root_setting, accel_prefix, private=False, immutable=None):
+    """
+    the file at ``path`` below ``settings.<root_setting>``; ``private`` files
+    need a logged in user when settings.MEDIA_AUTHENTICATED is on. files below
+    the ``immutable`` prefix never change (content-addressed blobs) and may be
+    cached forever.
+    """
+
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    private = private and settings.MEDIA_AUTHENTICATED
+    if private and not authenticated(request):
+        return HttpResponse(status=401)
+
+    path, fullpath = resolve(getattr(settings, root_setting), path)
+    content_type, encoding = mimetypes.guess_type(str(fullpath))
+    content_type = content_type or "application/octet-stream"
+
+    cache_control = None
+    if immutable and path.startswith(immutable):
+        visibility = "private" if private else "public"
+        cache_control = f"{visibility}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # nginx answers conditional and range requests itself
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = quote(f"{accel_prefix}{path}")
+    else:
+        stat = fullpath.stat()
+        if not was_modified_since(
+            request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime
+        ):
+            return HttpResponseNotModified()
+        response = FileResponse(fullpath.open("rb"), content_type=content_type)
+        response["Last-Modified"] = http_date(stat.st_mtime)
+
+    if encoding:
+        response["Content-Encoding"] = encoding
+    if cache_control:
+        response["Cache-Control"] = cache_control
+    return response
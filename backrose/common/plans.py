@@ -0,0 +1,79 @@
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """
+    how a queryset has to be shaped for one serializer: forward relations joined
+    in (select_related), collections fetched in bulk (prefetch_related, plain
+    lookups or Prefetch objects) and the columns to load (only).
+    """
+
+    def __init__(self, select_related=(), prefetch_related=(), only=()):
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        self.only = tuple(only)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def prefix_lookup(prefix, lookup):
+    if isinstance(lookup, Prefetch):
+        return Prefetch(
+            f"{prefix}__{lookup.prefetch_through}",
+            queryset=lookup.queryset,
+            to_attr=lookup.to_attr,
+        )
+    return f"{prefix}__{lookup}"
+
+
+def build_query_plan(serializer):
+    """
+    derive the QueryPlan a serializer (class or instance) needs to render without
+    extra queries. nested serializers are walked recursively: a nested object
+    becomes a select_related, a nested list becomes a Prefetch whose queryset
+    carries the child's own plan, so the whole graph loads in one query per
+    relation. paths a serializer reads outside of nested fields are declared in
+    its Meta as ``select_related`` / ``prefetch_related``.
+    """
+
+    if isinstance(serializer, type):
+        serializer = serializer()
+
+    meta = getattr(serializer, "Meta", None)
+    select_related = list(getattr(meta, "select_related", ()))
+    prefetch_related = list(getattr(meta, "prefetch_related", ()))
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+
+        source = field.source.replace(".", "__")
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            child_plan = build_query_plan(child)
+            queryset = child_plan.apply(child.Meta.model._default_manager.all())
+            prefetch_related.append(Prefetch(source, queryset=queryset))
+
+        elif isinstance(field, serializers.ModelSerializer):
+            child_plan = build_query_plan(field)
+            select_related.append(source)
+            select_related.extend(
+                prefix_lookup(source, lookup) for lookup in child_plan.select_related
+            )
+            prefetch_related.extend(
+                prefix_lookup(source, lookup) for lookup in child_plan.prefetch_related
+            )
+
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch_related.append(source)
+
+    return QueryPlan(select_related=select_related, prefetch_related=prefetch_related)
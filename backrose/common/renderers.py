@@ -0,0 +1,100 @@
+"""
+orjson backed drop-ins for DRF's JSONRenderer and JSONParser.
+
+the output is byte for byte what JSONRenderer writes with the default
+COMPACT_JSON / UNICODE_JSON settings. anything orjson does not encode natively
+(Decimal, lazy strings, querysets) and date/time values, which DRF formats
+its own way, go through DRF's JSONEncoder.default. indented or ascii output
+falls back to JSONRenderer.
+"""
+
+import csv
+import io
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+)
+
+default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=default, option=OPTIONS)
+
+        # same escapes as JSONRenderer, for output embedded in <script>
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028")
+            ret = ret.replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    one JSON document per line. streaming views hand out their own response
+    and only use this for negotiation; errors render as a single line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        return b"".join(
+            orjson.dumps(row, default=default, option=OPTIONS) + b"\n" for row in rows
+        )
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    negotiation only, like NDJSONRenderer. an error payload is written as a
+    header of its keys and one row of values.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not data:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue().encode(self.charset)
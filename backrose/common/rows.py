@@ -0,0 +1,84 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+# fields that read related objects off the instance
+NESTED_FIELDS = (serializers.BaseSerializer, serializers.ManyRelatedField)
+
+
+class RowSerializer:
+    """
+    renders queryset.values() rows exactly like ``serializer_class`` renders the
+    model instances, without building the instances or running the field
+    machinery of a ModelSerializer per row. every field is compiled once into
+    a (name, column, handler) triple; only plain model columns, forward
+    primary key relations and files are supported.
+    """
+
+    def __init__(self, serializer_class, context=None):
+        serializer = serializer_class(context=context or {})
+        self.model = serializer.Meta.model
+        self.fields = [
+            self.compile_field(field)
+            for field in serializer.fields.values()
+            if not field.write_only
+        ]
+
+    @property
+    def columns(self):
+        return [column for _, column, _ in self.fields]
+
+    def compile_field(self, field):
+        if field.source == "*" or "." in field.source:
+            raise ImproperlyConfigured(
+                f"{field.field_name}: only model columns can be rendered from rows"
+            )
+
+        model_field = self.model._meta.get_field(field.source)
+        if isinstance(field, NESTED_FIELDS) or not model_field.concrete:
+            raise ImproperlyConfigured(
+                f"{field.field_name}: nested and many-valued fields need instances"
+            )
+
+        if isinstance(field, serializers.FileField):
+            handler = self.file_handler(field, model_field.storage)
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            # the row holds the pk itself, as PKOnlyObject would
+            handler = field.pk_field.to_representation if field.pk_field else None
+        elif isinstance(field, serializers.RelatedField):
+            raise ImproperlyConfigured(
+                f"{field.field_name}: {type(field).__name__} needs model instances"
+            )
+        else:
+            handler = field.to_representation
+
+        return field.field_name, model_field.name, handler
+
+    def file_handler(self, field, storage):
+        """FileField.to_representation on the stored file name"""
+
+        use_url = getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL)
+        request = field.context.get("request")
+
+        def render(name):
+            if not name:
+                return None
+            if not use_url:
+                return name
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return render
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, handler in self.fields:
+            value = row[column]
+            if value is None or handler is None:
+                data[name] = value
+            else:
+                data[name] = handler(value)
+        return data
+
+    def render(self, rows):
+        return [self.to_representation(row) for row in rows]
@@ -0,0 +1,84 @@
+"""
+sparse fieldsets for read actions.
+
+    ?fields=id,title,sizes.height   only these fields, dotted paths prune
+                                    inside nested serializers
+    ?expand=sizes,photos            nested collections to embed, the others
+                                    are left out; ?expand= embeds none
+
+without either parameter the serializer renders in full. the query plan is
+derived from the pruned serializer, so a relation that is not rendered is not
+joined or prefetched either.
+"""
+
+from rest_framework import serializers
+
+
+def parse_paths(value):
+    return [path.strip() for path in value.split(",") if path.strip()]
+
+
+def split_paths(paths):
+    """{top level name: nested paths}, None keeps the whole field"""
+
+    tree = {}
+    for path in paths:
+        name, _, rest = path.partition(".")
+        if not rest:
+            tree[name] = None
+        elif tree.get(name, []) is not None:
+            tree.setdefault(name, []).append(rest)
+    return tree
+
+
+def is_collection(field):
+    return isinstance(field, serializers.ListSerializer)
+
+
+def prune_fields(
+    serializer, fields=None, expand=None, param="fields", expand_param="expand"
+):
+    """
+    drop fields of a serializer instance in place, fields and expand as
+    lists of paths. unknown names raise a ValidationError.
+    """
+
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    available = serializer.fields
+    tree = split_paths(fields or [])
+    expand = expand or []
+
+    errors = {}
+    unknown = [name for name in tree if name not in available]
+    if unknown:
+        errors[param] = [f"Unknown field: {name}" for name in unknown]
+    unknown = [
+        name
+        for name in expand
+        if name not in available or not is_collection(available[name])
+    ]
+    if unknown:
+        errors[expand_param] = [f"Unknown collection: {name}" for name in unknown]
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    if fields:
+        keep = set(tree) | set(expand)
+    else:
+        keep = {
+            name
+            for name, field in available.items()
+            if not is_collection(field) or name in expand
+        }
+
+    for name in list(available):
+        if name not in keep:
+            available.pop(name)
+
+    for name, nested_paths in tree.items():
+        field = available[name]
+        nested = field.child if is_collection(field) else field
+        if nested_paths and isinstance(nested, serializers.Serializer):
+            prune_fields(nested, nested_paths, param=f"{param}.{name}")
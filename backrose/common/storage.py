@@ -0,0 +1,121 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    a file system storage keeping every file under the sha256 of its content,
+    ``blobs/ab/cd/abcd....jpg``: the name a field's upload_to builds only lends
+    its extension, identical uploads end up as one file and renaming a rose
+    moves nothing. a blob's content never changes, so its urls can be cached
+    forever (see common.media).
+
+    blobs are shared between rows, delete() leaves them in place. they are
+    freed by reference count (roses.blobs) through purge().
+    """
+
+    prefix = "blobs"
+
+    def is_blob(self, name):
+        return bool(name) and name.startswith(f"{self.prefix}/")
+
+    def blob_name(self, content, name):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        hexdigest = digest.hexdigest()
+        # .jpeg, .JPG and .jpg are one extension
+        content_type, _ = mimetypes.guess_type(name)
+        extension = content_type and mimetypes.guess_extension(content_type)
+        if not extension:
+            extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            self.prefix, hexdigest[:2], hexdigest[2:4], hexdigest + extension
+        )
+
+    def get_available_name(self, name, max_length=None):
+        # only a hint for _save, which never overwrites other content
+        return name
+
+    def _save(self, name, content):
+        name = self.blob_name(content, name)
+        if self.exists(name):
+            # the reused blob counts as fresh, a collector releasing it
+            # concurrently leaves it alone (see roses.blobs)
+            self.touch(name)
+            return name
+
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(
+            directory, mode=self.directory_permissions_mode or 0o777, exist_ok=True
+        )
+        # concurrent uploads of the same content write the same bytes, the
+        # last rename wins and nobody sees a partial blob
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            os.chmod(tmp, self.file_permissions_mode or 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return name
+
+    def touch(self, name):
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def age(self, name):
+        """seconds since the blob was stored or last reused, None if it is gone"""
+
+        try:
+            return time.time() - os.path.getmtime(self.path(name))
+        except FileNotFoundError:
+            return None
+
+    def blobs(self):
+        """names of every stored blob, the files derived from them left out"""
+
+        root = self.path(self.prefix)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.count(".") <= 1 and not filename.endswith(".tmp"):
+                    path = os.path.join(directory, filename)
+                    yield os.path.relpath(path, self.location).replace(os.sep, "/")
+
+    def delete(self, name):
+        if not self.is_blob(name):
+            super().delete(name)
+
+    def purge(self, name):
+        """
+        remove a blob and the files derived from it, ``<hash>.<variant>.<ext>``,
+        unless the same content is still stored under another extension
+        """
+
+        directory, filename = os.path.split(self.path(name))
+        digest = filename.split(".")[0]
+        try:
+            siblings = os.listdir(directory)
+        except FileNotFoundError:
+            return
+
+        same_content = [s for s in siblings if s.split(".")[0] == digest]
+        blobs = [s for s in same_content if s.count(".") == 1 and s != filename]
+        doomed = [filename] if blobs else same_content
+        for sibling in doomed:
+            try:
+                os.remove(os.path.join(directory, sibling))
+            except FileNotFoundError:
+                pass
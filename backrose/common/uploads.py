@@ -0,0 +1,80 @@
+"""
+validation of uploaded images that never decodes them.
+
+Django's ImageField hands the whole upload to Pillow before anything checks
+how big it is. ImageUploadField rejects uploads over
+settings.IMAGE_UPLOAD_MAX_BYTES before reading them and reads nothing but the
+header of the rest: the format and the pixel size, capped at
+settings.IMAGE_UPLOAD_MAX_PIXELS so that no later decode (the variants
+worker, the BlurHash) can take more memory than that. uploads over
+settings.FILE_UPLOAD_MAX_MEMORY_SIZE are streamed to a temporary file by
+Django's upload handlers, a request holds no more of a photo than that.
+"""
+
+import warnings
+
+from django.conf import settings
+from PIL import Image
+from rest_framework import serializers
+
+from . import images
+
+# Pillow formats an upload may have, MPO is how it reads many camera JPEGs
+FORMATS = {"JPEG", "MPO", "PNG", "WEBP", "GIF"}
+
+
+def read_header(file):
+    """(format, (width, height)) of an image file, from its header alone"""
+
+    file.seek(0)
+    with warnings.catch_warnings():
+        # the pixel cap is checked by the caller, and lower than Pillow's
+        warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+        with Image.open(file) as image:
+            header = image.format, image.size
+    file.seek(0)
+    return header
+
+
+class ImageUploadField(serializers.ImageField):
+    """
+    an ImageField checking an upload's bytes, format and pixels without
+    decoding it. with ``max_edge`` a larger image is scaled down to that many
+    pixels on its longest side and stored as a JPEG (see images.downscale).
+    """
+
+    default_error_messages = {
+        "too_large": "Upload a file of at most {max_bytes} bytes.",
+        "too_many_pixels": "Upload an image of at most {max_pixels} pixels.",
+        "unsupported": "Upload a JPEG, PNG, WebP or GIF image.",
+    }
+
+    def __init__(self, *args, max_edge=None, **kwargs):
+        self.max_edge = max_edge
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        # the FileField checks (a named, non-empty file), not Django's
+        # ImageField
+        file = serializers.FileField.to_internal_value(self, data)
+
+        max_bytes = settings.IMAGE_UPLOAD_MAX_BYTES
+        if file.size > max_bytes:
+            self.fail("too_large", max_bytes=max_bytes)
+
+        max_pixels = settings.IMAGE_UPLOAD_MAX_PIXELS
+        try:
+            format, (width, height) = read_header(file)
+        except Image.DecompressionBombError:
+            self.fail("too_many_pixels", max_pixels=max_pixels)
+        except Exception:
+            self.fail("invalid_image")
+        if format not in FORMATS:
+            self.fail("unsupported")
+        if width * height > max_pixels:
+            self.fail("too_many_pixels", max_pixels=max_pixels)
+
+        if self.max_edge and max(width, height) > self.max_edge:
+            return images.downscale(file, self.max_edge)
+        file.content_type = Image.MIME[format]
+        return file
@@ -1,17 +1,342 @@
-from rest_framework import viewsets
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django.apps import apps
+from django.db import IntegrityError, router, transaction
+from django.db.models import prefetch_related_objects
+from django.db.models.signals import post_save, pre_save
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
+from .plans import QueryPlan, build_query_plan
+from .rows import RowSerializer
+from .sparse import parse_paths, prune_fields
+
+
+class QueryPlanMixin:
+    """
+    picks a QueryPlan for the current action from ``query_plans``; actions
+    without an entry fall back to the "default" plan, if any.
+    """
+
+    query_plans = {}
+
+    def get_query_plan(self, action=None):
+        action = action or self.action
+        return self.query_plans.get(action) or self.query_plans.get(
+            "default", QueryPlan()
+        )
+
+    def get_queryset(self):
+        return self.get_query_plan().apply(super().get_queryset())
+
+
+class SparseFieldsMixin(QueryPlanMixin):
+    """
+    applies ?fields= / ?expand= to the serializer of ``sparse_actions`` and
+    plans the queryset from the pruned serializer.
+    """
+
+    sparse_actions = ("list", "retrieve")
+
+    def get_sparse_fieldset(self):
+        """(fields, expand) from the query string, None when not sparse"""
+
+        if self.action not in self.sparse_actions:
+            return None
+
+        params = self.request.query_params
+        if "fields" not in params and "expand" not in params:
+            return None
+
+        fields = parse_paths(params.get("fields", "")) or None
+        expand = parse_paths(params["expand"]) if "expand" in params else None
+        if fields is None and expand is None:
+            return None
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is not None:
+            prune_fields(serializer, *fieldset)
+        return serializer
+
+    def get_query_plan(self, action=None):
+        if action is None and self.get_sparse_fieldset() is not None:
+            return build_query_plan(self.get_serializer())
+        return super().get_query_plan(action)
+
+
+class RowListMixin:
+    """
+    list action served from queryset.values() rows rendered by a RowSerializer
+    built from the list serializer, the output is the same as ListModelMixin's.
+    cursor pagination reads its position from the row dicts.
+    """
+
+    row_list = True
+
+    def list(self, request, *args, **kwargs):
+        if not self.row_list:
+            return super().list(request, *args, **kwargs)
+
+        serializer = RowSerializer(
+            self.get_serializer_class(), context=self.get_serializer_context()
+        )
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values(*serializer.columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.render(page))
+
+        return Response(serializer.render(rows))
+
+
+class BatchMixin:
+    """
+    list-valued writes: a list POSTed to the collection, or POST / PATCH /
+    DELETE on its ``batch/`` route. the whole batch is validated first and
+    written with one bulk query in one transaction, so either every item is
+    saved or none is. results and errors are lists in the order of the input.
+    pre_save and post_save go out for every object as save() would send them,
+    so the bookkeeping done in receivers holds for batches too.
+    """
+
+    batch_limit = 500
+
+    def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self.batch_create(request)
+        return super().create(request, *args, **kwargs)
+
+    @action(detail=False, methods=["post", "patch", "delete"])
+    def batch(self, request, *args, **kwargs):
+        handlers = {
+            "POST": self.batch_create,
+            "PATCH": self.batch_update,
+            "DELETE": self.batch_destroy,
+        }
+        return handlers[request.method](request)
+
+    def get_batch_save_kwargs(self):
+        """extra attributes set on every created object, like perform_create's"""
+        return {}
+
+    def get_batch_items(self, request):
+        return request.data
+
+    def get_batch(self, request):
+        items = self.get_batch_items(request)
+        if not isinstance(items, list) or not items:
+            raise serializers.ValidationError(
+                {"non_field_errors": ["Expected a non-empty list of items."]}
+            )
+        if len(items) > self.batch_limit:
+            raise serializers.ValidationError(
+                {"non_field_errors": [f"At most {self.batch_limit} items per batch."]}
+            )
+        return items
+
+    def get_batch_instances(self, items):
+        """
+        the objects a batch of ``{"id": ...}`` items (or bare ids) points to,
+        scoped by get_queryset. raises with per-item errors for bad ids.
+        """
+
+        ids = [item.get("id") if isinstance(item, dict) else item for item in items]
+        valid = [pk for pk in ids if isinstance(pk, int) and not isinstance(pk, bool)]
+        found = self.get_queryset().in_bulk(valid)
+
+        errors, seen = [], set()
+        for pk in ids:
+            if pk is None:
+                errors.append({"id": ["This field is required."]})
+            elif pk not in found:
+                errors.append({"id": ["Not found."]})
+            elif pk in seen:
+                errors.append({"id": ["Duplicate id in batch."]})
+            else:
+                errors.append({})
+            seen.add(pk)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [found[pk] for pk in ids]
+
+    def check_batch_unique(self, objs, exclude=()):
+        """
+        raises with per-item errors for objects that would break a unique
+        field or unique_together of their model, against the rows in the
+        table (but the ``exclude``d pks, being rewritten) and earlier items.
+        one query per unique set, sets with a null never clash.
+        """
+
+        model = type(objs[0])
+        opts = model._meta
+        unique_sets = [
+            [field]
+            for field in opts.concrete_fields
+            if field.unique and not field.primary_key
+        ]
+        unique_sets += [
+            [opts.get_field(name) for name in names] for names in opts.unique_together
+        ]
+
+        errors = [{} for _ in objs]
+        for fields in unique_sets:
+            attnames = [field.attname for field in fields]
+            keys = [tuple(getattr(obj, name) for name in attnames) for obj in objs]
+            lookup = {
+                f"{name}__in": {key[i] for key in keys if None not in key}
+                for i, name in enumerate(attnames)
+            }
+            taken = set(
+                model._default_manager.filter(**lookup)
+                .exclude(pk__in=exclude)
+                .values_list(*attnames)
+            )
+
+            label = ", ".join(field.name for field in fields)
+            error_key = fields[0].name if len(fields) == 1 else "non_field_errors"
+            seen = set()
+            for error, key in zip(errors, keys):
+                if None in key or error:
+                    continue
+                if key in taken:
+                    error[error_key] = [f"A row with this {label} already exists."]
+                elif key in seen:
+                    error[error_key] = [f"Duplicate {label} in batch."]
+                seen.add(key)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+    def batch_write(self, write, saved=(), created=False, update_fields=None):
+        """
+        ``write`` runs one bulk query, which sends no signals: for the
+        ``saved`` objects pre_save and post_save are sent around it.
+        """
+
+        signal_kwargs = {"raw": False, "update_fields": update_fields}
+        if saved:
+            signal_kwargs["using"] = router.db_for_write(type(saved[0]))
+        try:
+            with transaction.atomic():
+                for obj in saved:
+                    pre_save.send(type(obj), instance=obj, **signal_kwargs)
+                write()
+                for obj in saved:
+                    post_save.send(
+                        type(obj), instance=obj, created=created, **signal_kwargs
+                    )
+        except IntegrityError:
+            # a row written since check_batch_unique looked
+            raise serializers.ValidationError(
+                {"non_field_errors": ["The batch conflicts with another write."]}
+            )
+
+    def batch_response(self, objs, status_code=status.HTTP_200_OK):
+        prefetch_related_objects(objs, *self.get_query_plan().prefetch_related)
+        serializer = self.get_serializer(objs, many=True)
+        return Response(serializer.data, status=status_code)
+
+    def batch_create(self, request):
+        serializer = self.get_serializer(data=self.get_batch(request), many=True)
+        serializer.is_valid(raise_exception=True)
+
+        model = self.get_serializer_class().Meta.model
+        extra = self.get_batch_save_kwargs()
+        objs = [model(**{**data, **extra}) for data in serializer.validated_data]
+        self.check_batch_unique(objs)
+        self.batch_write(
+            lambda: model.objects.bulk_create(objs), saved=objs, created=True
+        )
+
+        return self.batch_response(objs, status_code=status.HTTP_201_CREATED)
+
+    def batch_update(self, request):
+        items = self.get_batch(request)
+        instances = self.get_batch_instances(items)
+
+        children = [
+            self.get_serializer(instance, data=item, partial=True)
+            for instance, item in zip(instances, items)
+        ]
+        errors = [{} if child.is_valid() else child.errors for child in children]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        fields = {"updated_at"}
+        now = timezone.now()
+        for instance, child in zip(instances, children):
+            for attr, value in child.validated_data.items():
+                setattr(instance, attr, value)
+            fields.update(child.validated_data)
+            instance.updated_at = now
+        self.check_batch_unique(instances, exclude=[obj.pk for obj in instances])
+
+        model = self.get_serializer_class().Meta.model
+        self.batch_write(
+            lambda: model.objects.bulk_update(instances, fields),
+            saved=instances,
+            update_fields=frozenset(fields),
+        )
+
+        return self.batch_response(instances)
+
+    def batch_destroy(self, request):
+        instances = self.get_batch_instances(self.get_batch(request))
+        ids = [instance.pk for instance in instances]
+
+        # queryset delete still sends post_delete per object, for the tombstones
+        self.batch_write(lambda: self.get_queryset().filter(pk__in=ids).delete())
+
+        return Response([{"id": pk, "deleted": True} for pk in ids])
+
+
+class NestedViewSet(BatchMixin, SparseFieldsMixin, viewsets.ModelViewSet):
+    """
+    collections under /roses/{rose_pk}/. rows are filtered on rose_id, so a
+    row found there proves its rose exists and reads need no parent lookup.
+    the rose itself is fetched at most once per request: for writes that set
+    it, and to tell a missing rose from an empty or unmatched collection.
+    """
 
-class NestedViewSet(viewsets.ModelViewSet):
     def get_rose(self):
-        Rose = apps.get_model("roses", "Rose")
-        return get_object_or_404(Rose, pk=self.kwargs["rose_pk"])
+        if not hasattr(self, "_rose"):
+            Rose = apps.get_model("roses", "Rose")
+            self._rose = get_object_or_404(Rose, pk=self.kwargs["rose_pk"])
+        return self._rose
 
     def get_queryset(self):
-        rose = self.get_rose()
-        return self.queryset.filter(rose=rose)
+        return super().get_queryset().filter(rose_id=self.kwargs["rose_pk"])
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if not response.data:
+            self.get_rose()
+        return response
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            self.get_rose()
+            raise
+
+    def get_batch_instances(self, items):
+        try:
+            return super().get_batch_instances(items)
+        except serializers.ValidationError:
+            self.get_rose()
+            raise
 
     def perform_create(self, serializer):
         rose = self.get_rose()
         serializer.save(rose=rose)
+
+    def get_batch_save_kwargs(self):
+        return {"rose": self.get_rose()}
@@ -2,6 +2,7 @@ import pytest
 from django.conf import settings
 from django.http import HttpRequest
 from django.middleware.csrf import get_token
+from django.test import override_settings
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -9,6 +10,38 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from userprofile.models import User, Profile
 
 
+@pytest.fixture(scope="session", autouse=True)
+def locmem_cache():
+    """keep the test run's cache in memory instead of the shared file cache"""
+
+    with override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    ):
+        yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def inline_image_variants():
+    """
+    render image variants in the test process: spawned workers read the
+    settings module and would write to the real database
+    """
+
+    with override_settings(IMAGE_WORKERS=0):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(locmem_cache):
+    """cache entries must not leak between tests"""
+
+    # imported here: pytest inspects conftest globals, which would open the
+    # file based cache before the override is in place
+    from django.core.cache import cache
+
+    cache.clear()
+
+
 @pytest.fixture
 def user_data():
     """fixture with user data"""
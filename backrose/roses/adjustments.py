@@ -0,0 +1,59 @@
+"""
+versioned server-side cache of the /adjustments/ bundle.
+
+the payload is stored under the current version number; any write to the
+reference data bumps the version (see roses.signals), which orphans the old
+entry. the ETag is a hash of the rendered payload, so it stays correct even if
+the cache is wiped and versions start over.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from common.renderers import ORJSONRenderer
+
+VERSION_KEY = "adjustments:version"
+
+PAYLOAD_TIMEOUT = 60 * 60 * 24
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # never restart from 1: entries of an earlier counter may still be cached
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _increment():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        get_version()
+
+
+def bump_version():
+    """
+    invalidate now, so the writing request reads its own changes, and again on
+    commit, so a bundle rebuilt from not yet committed data is dropped too.
+    """
+
+    _increment()
+    transaction.on_commit(_increment)
+
+
+def get_adjustments(build):
+    """(etag, data) for the current version, calling build() on a miss"""
+
+    key = f"adjustments:{get_version()}"
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        digest = hashlib.sha256(ORJSONRenderer().render(data)).hexdigest()
+        entry = (f'"{digest[:32]}"', data)
+        cache.set(key, entry, PAYLOAD_TIMEOUT)
+    return entry
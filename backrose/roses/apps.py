@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class RosesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "roses"
+
+    def ready(self):
+        from . import search, signals  # noqa: F401
+
+        post_migrate.connect(search.install_handler, sender=self)
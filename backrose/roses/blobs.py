@@ -0,0 +1,170 @@
+"""
+reference counts of the content-addressed media files, see
+common.storage.ContentAddressedStorage.
+
+every FILE_FIELDS row naming a blob holds one reference on its Blob row.
+signals keep Blob.refs in step with single saves and deletes through F()
+updates, so a file shared by several roses stays until the last of them lets
+go; then the blob and its variants are purged once the transaction commits,
+unless the file was stored or reused within settings.BLOB_GRACE_SECONDS and
+may be in use by an upload in flight: sweep() removes it later.
+bulk_create and queryset.update() send no signals, code using them calls
+recount() afterwards; the collect_blobs command repairs drift and removes
+files nothing refers to.
+"""
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from userprofile.models import Profile
+
+from .models import Blob, Rose, RosePhoto
+
+# (model, file field) whose names count as references, every field stored in
+# the default storage belongs here: a blob nothing here names gets purged
+FILE_FIELDS = [(Rose, "photo"), (RosePhoto, "photo"), (Profile, "image")]
+
+UPSERT_SQL = f"""
+    INSERT INTO {Blob._meta.db_table} (name, refs) VALUES (%s, %s)
+    ON CONFLICT (name) DO UPDATE SET refs = {Blob._meta.db_table}.refs + excluded.refs
+"""
+
+
+def get_storage(model, field="photo"):
+    return model._meta.get_field(field).storage
+
+
+def blob_name(model, name, field="photo"):
+    """``name`` if it is a blob of the field's storage, else None"""
+
+    is_blob = getattr(get_storage(model, field), "is_blob", None)
+    return name if is_blob is not None and is_blob(name) else None
+
+
+def referenced(name):
+    return any(
+        model.objects.filter(**{field: name}).exists() for model, field in FILE_FIELDS
+    )
+
+
+def collect(storage, name):
+    """
+    release a blob nothing refers to any more. the Blob row is locked and the
+    columns checked again before it goes; an upload reusing the file touches
+    it first, so a blob used within settings.BLOB_GRACE_SECONDS keeps its file
+    for sweep() to judge later.
+    """
+
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(name=name, refs=0).first()
+        if blob is None or referenced(name):
+            return
+        blob.delete()
+        age = storage.age(name)
+        if age is not None and age >= settings.BLOB_GRACE_SECONDS:
+            storage.purge(name)
+
+
+def adjust(storage, name, delta):
+    if name is None or not delta:
+        return
+
+    if delta < 0:
+        Blob.objects.filter(name=name, refs__gte=-delta).update(refs=F("refs") + delta)
+        transaction.on_commit(lambda: collect(storage, name))
+    else:
+        # one upsert whether the blob is new or shared (sqlite 3.24+, postgres)
+        with connection.cursor() as cursor:
+            cursor.execute(UPSERT_SQL, [name, delta])
+
+
+def remember(instance, field="photo"):
+    """post_init and after every save, a deferred file is left out"""
+
+    if field not in instance.get_deferred_fields():
+        name = getattr(instance, field).name
+        instance._blob = blob_name(type(instance), name, field)
+
+
+def saved(instance, created, field="photo"):
+    if field in instance.get_deferred_fields():
+        return
+
+    storage = get_storage(type(instance), field)
+    current = blob_name(type(instance), getattr(instance, field).name, field)
+    # a file deferred at load time and assigned later has no known previous
+    # blob, that reference is left to the next recount
+    before = None if created else getattr(instance, "_blob", None)
+    if current != before:
+        adjust(storage, current, 1)
+        adjust(storage, before, -1)
+    instance._blob = current
+
+
+def deleted(instance, field="photo"):
+    storage = get_storage(type(instance), field)
+    adjust(storage, getattr(instance, "_blob", None), -1)
+
+
+def count_references():
+    """{blob name: references} from the FILE_FIELDS columns"""
+
+    counts = Counter()
+    for model, field in FILE_FIELDS:
+        prefix = getattr(get_storage(model, field), "prefix", None)
+        if prefix is None:
+            continue
+        counts.update(
+            model.objects.filter(**{f"{field}__startswith": f"{prefix}/"})
+            .values_list(field, flat=True)
+            .iterator()
+        )
+    return counts
+
+
+def recount():
+    """
+    bring every Blob row in line with the FILE_FIELDS columns, blobs nothing
+    refers to are purged once the transaction commits. returns the number of
+    repaired rows and of released blobs.
+    """
+
+    storage = get_storage(*FILE_FIELDS[0])
+    actual = count_references()
+    stored = dict(Blob.objects.values_list("name", "refs"))
+
+    drifted = [
+        Blob(name=name, refs=refs)
+        for name, refs in actual.items()
+        if stored.get(name) != refs
+    ]
+    Blob.objects.bulk_create(
+        drifted, update_conflicts=True, unique_fields=["name"], update_fields=["refs"]
+    )
+
+    unused = [name for name in stored if name not in actual]
+    Blob.objects.filter(name__in=unused).update(refs=0)
+    for name in unused:
+        transaction.on_commit(lambda name=name: collect(storage, name))
+    return len(drifted), len(unused)
+
+
+def sweep(storage, grace):
+    """
+    purge blob files no row refers to that are older than ``grace`` seconds:
+    uploads whose row never got saved. younger files may belong to an upload
+    still in flight, blobs with a Blob row are left to collect().
+    """
+
+    used = set(count_references())
+    used.update(Blob.objects.values_list("name", flat=True).iterator())
+    purged = 0
+    for name in storage.blobs():
+        # the age is read last, an upload reusing the file touches it
+        if name not in used and (storage.age(name) or 0) >= grace:
+            storage.purge(name)
+            purged += 1
+    return purged
@@ -0,0 +1,95 @@
+"""
+denormalised rose counts on Group and Breeder.
+
+signals keep Group.rose_count and Breeder.rose_count in step with single
+rose saves and deletes through F() updates, so concurrent writers never lose
+an increment. bulk_create and queryset.update() send no signals, code using
+them calls recount() afterwards; the recount_roses command repairs drift.
+"""
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Group, Breeder, Rose
+
+# (counted model, foreign key on Rose)
+COUNTERS = [(Group, "group_id"), (Breeder, "breeder_id")]
+
+
+def adjust(model, pk, delta):
+    if pk is None or not delta:
+        return
+    model.objects.filter(pk=pk).update(
+        rose_count=F("rose_count") + delta, updated_at=timezone.now()
+    )
+
+
+def loaded_values(rose):
+    """counted foreign keys as the row was last read or written"""
+
+    return getattr(rose, "_counted", {})
+
+
+def remember(rose):
+    """post_init and after every save, deferred keys are left out"""
+
+    rose._counted = {
+        field: getattr(rose, field)
+        for _, field in COUNTERS
+        if field not in rose.get_deferred_fields()
+    }
+
+
+def rose_saved(rose, created):
+    """whether a count moved"""
+
+    if created:
+        for model, field in COUNTERS:
+            adjust(model, getattr(rose, field), 1)
+        remember(rose)
+        return True
+
+    before = loaded_values(rose)
+    moved = False
+    for model, field in COUNTERS:
+        # a key deferred at load time and assigned later has no known previous
+        # value, that move is left to the next recount
+        if field in before and before[field] != getattr(rose, field):
+            adjust(model, before[field], -1)
+            adjust(model, getattr(rose, field), 1)
+            moved = True
+    remember(rose)
+    return moved
+
+
+def rose_deleted(rose):
+    before = loaded_values(rose)
+    for model, field in COUNTERS:
+        adjust(model, before.get(field), -1)
+
+
+def count_expression(field):
+    counts = (
+        Rose.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def recount():
+    """
+    recompute every counter in one UPDATE per model, touching only the rows
+    that drifted. returns the number of repaired rows per model label.
+    """
+
+    repaired = {}
+    for model, field in COUNTERS:
+        actual = count_expression(field)
+        repaired[model._meta.label] = model.objects.exclude(rose_count=actual).update(
+            rose_count=actual, updated_at=timezone.now()
+        )
+    return repaired
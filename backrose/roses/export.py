@@ -0,0 +1,86 @@
+"""
+streaming export of the rose catalogue, see RoseViewSet.export.
+
+roses are read in keyset chunks of ``chunk_size`` (id > last id seen), each
+chunk with its own prefetch of the included collections, and rendered one by
+one, so memory stays flat however big the catalogue is.
+"""
+
+import csv
+
+import orjson
+from rest_framework import serializers
+
+from common.renderers import OPTIONS, default
+
+CHUNK_SIZE = 500
+
+
+def iter_chunks(queryset, plan, chunk_size=CHUNK_SIZE):
+    queryset = queryset.order_by("pk")
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        roses = list(plan.apply(chunk)[:chunk_size])
+        if roses:
+            yield roses
+        if len(roses) < chunk_size:
+            return
+        last = roses[-1].pk
+
+
+def iter_rows(queryset, serializer, plan, chunk_size=CHUNK_SIZE):
+    for roses in iter_chunks(queryset, plan, chunk_size):
+        for rose in roses:
+            yield serializer.to_representation(rose)
+
+
+def csv_columns(serializer):
+    """nested objects are spread over dotted columns, collections stay one cell"""
+
+    columns = []
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.Serializer):
+            columns.extend(f"{name}.{nested}" for nested in field.fields)
+        else:
+            columns.append(name)
+    return columns
+
+
+def csv_cell(value):
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value, default=default, option=OPTIONS).decode()
+    return value
+
+
+def flatten(row, nested=()):
+    """spreads the ``nested`` objects, other dicts (variants) stay one cell"""
+
+    flat = {}
+    for name, value in row.items():
+        if name in nested and isinstance(value, dict):
+            for key, nested_value in value.items():
+                flat[f"{name}.{key}"] = csv_cell(nested_value)
+        else:
+            flat[name] = csv_cell(value)
+    return flat
+
+
+class Echo:
+    """file-like sink for csv.writer that hands the written line back"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, columns):
+    writer = csv.DictWriter(Echo(), fieldnames=columns, extrasaction="ignore")
+    nested = {column.split(".")[0] for column in columns if "." in column}
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(flatten(row, nested))
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield orjson.dumps(row, default=default, option=OPTIONS) + b"\n"
@@ -1,6 +1,7 @@
 import django_filters as filters
 from django.db.models import Q
 
+from . import search
 from .models import Rose
 
 
@@ -10,6 +11,9 @@ class RoseFilter(filters.FilterSet):
     ordering = filters.OrderingFilter(fields=("title", "id"))
 
     def search_filter(self, queryset, name, value):
+        if search.is_available(queryset.db):
+            return search.search_roses(queryset, value)
+
         return queryset.filter(
             Q(title__iregex=value)
             | Q(title_eng__iregex=value)
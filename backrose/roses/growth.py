@@ -0,0 +1,341 @@
+"""
+growth statistics over the Size measurements of a rose or a whole group, see
+RoseViewSet.growth and GroupViewSet.growth.
+
+the measurements are loaded with one query into arrays sorted by (rose, date)
+and every statistic is computed per rose segment in one vectorised pass:
+growth and average rate, least squares slope, seasonal deltas and monthly
+percentile bands. series are downsampled with LTTB (largest triangle three
+buckets) so a chart gets at most ``points`` points that keep the shape of the
+curve. rates and slopes are per 30 days, undated measurements are left out.
+
+a group is paged by rose id: one page loads the measurements of at most
+``page_size`` measured roses, its seasons and bands cover those roses.
+"""
+
+import numpy as np
+from django.core import signing
+
+from .models import Size
+
+MEASURES = ("height", "width")
+
+PERIOD = 30
+
+BANDS = (10, 50, 90)
+
+POINTS = 200
+MIN_POINTS = 3
+MAX_POINTS = 1000
+
+SEASONS = ("winter", "spring", "summer", "autumn")
+
+CURSOR_SALT = "roses.growth"
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(rose_id):
+    return signing.dumps(rose_id, salt=CURSOR_SALT)
+
+
+def decode_cursor(cursor):
+    try:
+        return int(signing.loads(cursor, salt=CURSOR_SALT))
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+
+
+class Series:
+    """Size rows as arrays, sorted by rose and date"""
+
+    def __init__(self, rows):
+        self.rows = rows = list(rows)
+        self.rose = np.fromiter((row[0] for row in rows), dtype=np.int64)
+        self.day = np.array([row[1] for row in rows], dtype="datetime64[D]")
+        self.values = {
+            name: np.fromiter((row[i] for row in rows), dtype=np.float64)
+            for i, name in enumerate(MEASURES, start=2)
+        }
+
+        # segments: one run of rows per rose
+        edges = np.flatnonzero(self.rose[1:] != self.rose[:-1]) + 1
+        if len(rows):
+            self.starts = np.r_[0, edges]
+            self.ends = np.r_[edges, len(rows)] - 1
+        else:
+            self.starts = self.ends = edges
+        self.counts = self.ends - self.starts + 1
+
+    @classmethod
+    def load(cls, queryset):
+        return cls(
+            queryset.exclude(date_added=None)
+            .order_by("rose_id", "date_added", "id")
+            .values_list("rose_id", "date_added", *MEASURES)
+        )
+
+    def __len__(self):
+        return len(self.rose)
+
+    @property
+    def roses(self):
+        return self.rose[self.starts]
+
+    def offsets(self):
+        """days since the first measurement of the same rose"""
+        first = np.repeat(self.day[self.starts], self.counts)
+        return (self.day - first).astype(np.float64)
+
+
+def as_list(array, digits=3):
+    """json-ready floats, nan (an undefined rate or slope) as None"""
+    return [None if np.isnan(v) else v for v in np.round(array, digits).tolist()]
+
+
+def as_dates(days):
+    return np.datetime_as_string(days, unit="D").tolist()
+
+
+def per_segment(series, values):
+    """growth, average rate and regression slope of every rose"""
+
+    starts, ends, n = series.starts, series.ends, series.counts.astype(np.float64)
+    x = series.offsets()
+
+    growth = values[ends] - values[starts]
+    span = x[ends]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(span > 0, growth / span * PERIOD, np.nan)
+
+        sx = np.add.reduceat(x, starts)
+        sy = np.add.reduceat(values, starts)
+        sxx = np.add.reduceat(x * x, starts)
+        sxy = np.add.reduceat(x * values, starts)
+        denominator = n * sxx - sx * sx
+        slope = np.where(
+            denominator > 0, (n * sxy - sx * sy) / denominator * PERIOD, np.nan
+        )
+
+    return {
+        "first": values[starts],
+        "last": values[ends],
+        "growth": growth,
+        "rate": rate,
+        "slope": slope,
+    }
+
+
+def seasons(series):
+    """
+    (season labels, {measure: delta per season, averaged over the roses}).
+    a delta runs from the last measurement of the previous season (or the
+    first measurement) to the last one of the season, so a rose's deltas add
+    up to its growth. december counts towards the next year's winter.
+    """
+
+    months = series.day.astype("datetime64[M]").astype(np.int64)
+    month = months % 12
+    season = (month + 1) % 12 // 3
+    year = 1970 + months // 12 + (month == 11)
+    key = year * 4 + season
+
+    # runs of one season of one rose, rows are sorted by rose and date
+    change = (key[1:] != key[:-1]) | (series.rose[1:] != series.rose[:-1])
+    run_ends = np.r_[np.flatnonzero(change), len(series) - 1]
+    run_rose = series.rose[run_ends]
+    first_run = np.r_[True, run_rose[1:] != run_rose[:-1]]
+
+    labels, inverse = np.unique(key[run_ends], return_inverse=True)
+    counts = np.bincount(inverse)
+
+    deltas = {}
+    for name, values in series.values.items():
+        end = values[run_ends]
+        previous = np.r_[np.nan, end[:-1]]
+        rose_first = values[series.starts][np.cumsum(first_run) - 1]
+        delta = end - np.where(first_run, rose_first, previous)
+        deltas[name] = np.bincount(inverse, weights=delta) / counts
+
+    names = [f"{label // 4}-{SEASONS[label % 4]}" for label in labels.tolist()]
+    return names, deltas
+
+
+def bands(series, percentiles=BANDS):
+    """
+    (month starts, {measure: [[p10, p50, p90], ...]}), the percentiles of the
+    measurements taken in each month, linearly interpolated like np.percentile
+    """
+
+    months = series.day.astype("datetime64[M]")
+    labels, inverse = np.unique(months, return_inverse=True)
+    counts = np.bincount(inverse)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    q = np.asarray(percentiles, dtype=np.float64) / 100
+
+    position = starts[:, None] + q[None, :] * (counts[:, None] - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, (starts + counts - 1)[:, None])
+    fraction = position - lower
+
+    result = {}
+    for name, values in series.values.items():
+        ordered = values[np.lexsort((values, inverse))]
+        low, high = ordered[lower], ordered[upper]
+        result[name] = low + (high - low) * fraction
+    return labels.astype("datetime64[D]"), result
+
+
+def lttb(x, y, threshold):
+    """indices of the points LTTB keeps out of x, y (x sorted)"""
+
+    n = len(x)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+
+    # first and last points stay, the rest is cut into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            following = slice(edges[i + 1], edges[i + 2])
+            next_x, next_y = x[following].mean(), y[following].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        # the point making the largest triangle with the previous kept point
+        # and the average of the next bucket
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        keep[i + 1] = previous
+    return keep
+
+
+def downsample(days, values, points):
+    x = (days - days[0]).astype(np.float64)
+    keep = lttb(x, values, points)
+    return [list(point) for point in zip(as_dates(days[keep]), as_list(values[keep]))]
+
+
+def band_payload(series, points):
+    months, values = bands(series)
+    # downsample on the median, the other percentiles follow its points
+    x = (months - months[0]).astype(np.float64)
+    keep = lttb(x, values["height"][:, 1], points)
+    labels = as_dates(months[keep])
+    columns = {
+        name: [as_list(row) for row in band[keep]] for name, band in values.items()
+    }
+    return [
+        {"month": label, **{name: columns[name][i] for name in MEASURES}}
+        for i, label in enumerate(labels)
+    ]
+
+
+def season_payload(series):
+    names, deltas = seasons(series)
+    columns = {name: as_list(delta) for name, delta in deltas.items()}
+    return [
+        {"season": label, **{name: columns[name][i] for name in MEASURES}}
+        for i, label in enumerate(names)
+    ]
+
+
+def rose_growth(rose_id, points=POINTS):
+    series = Series.load(Size.objects.filter(rose_id=rose_id))
+
+    result = {"rose": rose_id, "count": len(series)}
+    if not len(series):
+        return {
+            **result,
+            "first": None,
+            "last": None,
+            **{name: None for name in MEASURES},
+            "seasons": [],
+            "bands": [],
+        }
+
+    result["first"], result["last"] = as_dates(series.day[[0, -1]])
+    for name, values in series.values.items():
+        stats = per_segment(series, values)
+        result[name] = {key: as_list(value)[0] for key, value in stats.items()} | {
+            "series": downsample(series.day, values, points)
+        }
+    result["seasons"] = season_payload(series)
+    result["bands"] = band_payload(series, points)
+    return result
+
+
+def group_page(group_id, after, size):
+    """
+    measurements of the first size + 1 measured roses past the cursor in one
+    query, the rose ids come from a limited subquery
+    """
+
+    measured = Size.objects.filter(rose__group_id=group_id).exclude(date_added=None)
+    if after is not None:
+        measured = measured.filter(rose_id__gt=after)
+    roses = measured.order_by("rose_id").values("rose_id").distinct()[: size + 1]
+    return Size.objects.filter(rose_id__in=roses)
+
+
+def group_growth(group_id, points=POINTS, cursor=None, size=PAGE_SIZE):
+    """(growth of one page of the group's roses, cursor of the next page or None)"""
+
+    after = decode_cursor(cursor) if cursor else None
+    series = Series.load(group_page(group_id, after, size))
+
+    next_cursor = None
+    if len(series.starts) > size:
+        # the extra rose only tells there is a next page
+        series = Series(series.rows[: series.starts[size]])
+        next_cursor = encode_cursor(int(series.rose[-1]))
+
+    result = {"group": group_id, "count": len(series)}
+    if not len(series):
+        return {**result, "roses": [], "seasons": [], "bands": []}, next_cursor
+
+    stats = {name: per_segment(series, v) for name, v in series.values.items()}
+    columns = {
+        name: {key: as_list(value) for key, value in measure.items()}
+        for name, measure in stats.items()
+    }
+    roses = [
+        {
+            "id": rose,
+            "count": count,
+            "first": first,
+            "last": last,
+            **{
+                name: {key: column[i] for key, column in columns[name].items()}
+                for name in MEASURES
+            },
+        }
+        for i, (rose, count, first, last) in enumerate(
+            zip(
+                series.roses.tolist(),
+                series.counts.tolist(),
+                as_dates(series.day[series.starts]),
+                as_dates(series.day[series.ends]),
+            )
+        )
+    ]
+
+    return {
+        **result,
+        "roses": roses,
+        "seasons": season_payload(series),
+        "bands": band_payload(series, points),
+    }, next_cursor
@@ -0,0 +1,504 @@
+"""
+bulk import of roses from CSV or NDJSON, see the import_roses command and
+RoseViewSet.import_catalogue.
+
+rows take the shape the export writes: group and breeder by name (or as the
+exported object), pesticides / fungicides as lists of product names or of
+exported entries with their pests / fungi. other columns are ignored. names
+are resolved through in-memory maps filled with one query per batch, missing
+ones are created in bulk. roses are upserted by title, batch by batch, with a
+single bulk_create(update_conflicts=True); an upserted rose takes every
+imported field from its row. invalid rows are reported with their number and
+skipped, the rest of the batch goes in.
+"""
+
+import csv
+import io
+from itertools import islice
+
+import orjson
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from pytils.translit import slugify
+from rest_framework import serializers
+
+from . import adjustments, counters
+from .models import (
+    Group,
+    Breeder,
+    Rose,
+    Pest,
+    Fungus,
+    Pesticide,
+    Fungicide,
+    RosePesticide,
+    RoseFungicide,
+)
+
+FORMATS = ("csv", "ndjson")
+
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+BATCH_SIZE = 500
+
+# upserted rows take these from the import, created_at and photo are kept
+UPDATE_FIELDS = [
+    "title_eng",
+    "slug",
+    "description",
+    "landing_date",
+    "observation",
+    "susceptibility",
+    "const_width",
+    "const_height",
+    "group",
+    "breeder",
+    "updated_at",
+]
+
+
+class TreatmentSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    targets = serializers.ListField(
+        child=serializers.CharField(), required=False, default=list
+    )
+    date_added = serializers.DateField(required=False, allow_null=True, default=None)
+
+
+class RoseRowSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255)
+    title_eng = serializers.CharField(max_length=255)
+    group = serializers.CharField(max_length=255)
+    breeder = serializers.CharField(max_length=255)
+    description = serializers.CharField(
+        required=False, allow_blank=True, allow_null=True, default=None
+    )
+    landing_date = serializers.DateField(required=False, allow_null=True, default=None)
+    observation = serializers.CharField(
+        required=False, allow_blank=True, allow_null=True, default=None
+    )
+    susceptibility = serializers.CharField(
+        max_length=255, required=False, allow_blank=True, allow_null=True, default=None
+    )
+    const_width = serializers.DecimalField(
+        max_digits=6, decimal_places=2, required=False, allow_null=True, default=None
+    )
+    const_height = serializers.DecimalField(
+        max_digits=6, decimal_places=2, required=False, allow_null=True, default=None
+    )
+    pesticides = TreatmentSerializer(many=True, required=False, default=list)
+    fungicides = TreatmentSerializer(many=True, required=False, default=list)
+
+
+# (row key, product key in exported entries, product m2m to its targets,
+#  product model, target model, link model)
+TREATMENTS = [
+    ("pesticides", "pesticide", "pests", Pesticide, Pest, RosePesticide),
+    ("fungicides", "fungicide", "fungi", Fungicide, Fungus, RoseFungicide),
+]
+
+
+def guess_format(filename):
+    for extension, format in EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return format
+    return None
+
+
+def read_rows(stream, format):
+    """(row number, row, parse error) for every record of a binary stream"""
+
+    if format == "csv":
+        yield from read_csv(stream)
+        return
+
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, row, None
+
+
+def read_csv(stream):
+    # bytes that are not UTF-8 come through as lone surrogates, so a record
+    # with some fails on its own instead of the whole upload
+    text = io.TextIOWrapper(
+        stream, encoding="utf-8-sig", errors="surrogateescape", newline=""
+    )
+    reader = csv.DictReader(text)
+    number = 0
+    while True:
+        number += 1
+        try:
+            record = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            yield number, None, f"Invalid CSV: {e}"
+            continue
+        if not is_utf8(record):
+            yield number, None, "Invalid CSV: not UTF-8 encoded"
+            continue
+        yield number, from_csv(record), None
+    text.detach()
+
+
+def is_utf8(record):
+    # the header is checked with every record, extra cells are ignored anyway
+    cells = [cell for item in record.items() for cell in item]
+    try:
+        "".join(cell for cell in cells if isinstance(cell, str)).encode()
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def from_csv(record):
+    """
+    undo the export's flattening: dotted columns become nested objects,
+    collections are JSON cells (or ;-separated names), empty cells are null.
+    """
+
+    row = {}
+    for column, value in record.items():
+        if column is None:
+            continue
+        value = value or None
+        if value and column in ("pesticides", "fungicides"):
+            if value.lstrip().startswith("["):
+                try:
+                    value = orjson.loads(value)
+                except orjson.JSONDecodeError:
+                    pass
+            else:
+                value = [name.strip() for name in value.split(";") if name.strip()]
+
+        name, _, nested = column.partition(".")
+        if nested:
+            if not isinstance(row.get(name), dict):
+                row[name] = {}
+            row[name][nested] = value
+        else:
+            row[name] = value
+    return row
+
+
+def named(value):
+    return value.get("name") if isinstance(value, dict) else value
+
+
+def normalize_treatment(entry, product_key, target_key):
+    if not isinstance(entry, dict):
+        return {"name": entry}
+
+    product = entry.get(product_key)
+    source = product if isinstance(product, dict) else entry
+    return {
+        "name": named(product) if product is not None else entry.get("name"),
+        "targets": [named(target) for target in source.get(target_key) or []],
+        "date_added": entry.get("date_added"),
+    }
+
+
+def normalize_row(row):
+    row = dict(row)
+    for key in ("group", "breeder"):
+        row[key] = named(row.get(key))
+    for key, product_key, target_key, *_ in TREATMENTS:
+        entries = row.get(key)
+        if entries is None:
+            row.pop(key, None)
+        elif isinstance(entries, list):
+            row[key] = [
+                normalize_treatment(entry, product_key, target_key) for entry in entries
+            ]
+    return row
+
+
+class NameMap:
+    """name -> id of a reference model, missing names created in bulk"""
+
+    def __init__(self, model, create_missing=True, slugged=False):
+        self.model = model
+        self.create_missing = create_missing
+        self.slugged = slugged
+        self.ids = {}
+        self.created = 0
+
+    def resolve(self, names):
+        missing = set(names) - self.ids.keys()
+        if not missing:
+            return
+
+        # names are not unique for every model, the oldest row wins
+        existing = (
+            self.model.objects.filter(name__in=missing)
+            .order_by("pk")
+            .values_list("name", "pk")
+        )
+        for name, pk in existing:
+            self.ids.setdefault(name, pk)
+
+        missing -= self.ids.keys()
+        if missing and self.create_missing:
+            objects = [self.build(name) for name in sorted(missing)]
+            for obj in self.model.objects.bulk_create(objects):
+                self.ids[obj.name] = obj.pk
+            self.created += len(objects)
+
+    def build(self, name):
+        if self.slugged:
+            return self.model(name=name, slug=slugify(name))
+        return self.model(name=name)
+
+    def get(self, name):
+        return self.ids.get(name)
+
+
+class RoseImporter:
+    def __init__(self, batch_size=BATCH_SIZE, create_missing=True):
+        self.batch_size = batch_size
+        self.maps = {
+            "group": NameMap(Group, create_missing, slugged=True),
+            "breeder": NameMap(Breeder, create_missing, slugged=True),
+        }
+        for key, _, targets, product_model, target_model, _ in TREATMENTS:
+            self.maps[key] = NameMap(product_model, create_missing)
+            self.maps[targets] = NameMap(target_model, create_missing)
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    @property
+    def result(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "references": {
+                name_map.model._meta.label: name_map.created
+                for name_map in self.maps.values()
+                if name_map.created
+            },
+            "errors": self.errors,
+        }
+
+    def run(self, rows):
+        """rows as read_rows yields them"""
+
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            with transaction.atomic():
+                self.import_batch(batch)
+
+        if self.created or self.updated:
+            # bulk_create sends no signals
+            counters.recount()
+            adjustments.bump_version()
+        return self.result
+
+    def error(self, number, errors):
+        self.errors.append({"row": number, "errors": errors})
+
+    def import_batch(self, batch):
+        valid = []
+        for number, row, parse_error in batch:
+            if parse_error:
+                self.error(number, {"non_field_errors": [parse_error]})
+                continue
+            serializer = RoseRowSerializer(data=normalize_row(row))
+            if serializer.is_valid():
+                valid.append((number, serializer.validated_data))
+            else:
+                self.error(number, serializer.errors)
+
+        valid = self.check_conflicts(valid)
+        valid = self.resolve_names(valid)
+        if not valid:
+            return
+
+        roses = self.upsert_roses(valid)
+        self.upsert_treatments(roses)
+
+    def check_conflicts(self, rows):
+        """
+        an upsert matches on title only; a title_eng or slug already taken by
+        another rose, in the database or earlier in the batch, fails the row.
+        """
+
+        titles = {data["title"] for _, data in rows}
+        engs = {data["title_eng"] for _, data in rows}
+        slugs = {slugify(title) for title in titles}
+        owners = {"title_eng": {}, "slug": {}}
+        existing = Rose.objects.filter(
+            Q(title_eng__in=engs) | Q(slug__in=slugs)
+        ).values_list("title", "title_eng", "slug")
+        for title, eng, slug in existing:
+            owners["title_eng"][eng] = title
+            owners["slug"][slug] = title
+
+        seen = set()
+        checked = []
+        for number, data in rows:
+            data["slug"] = slugify(data["title"])
+            if data["title"] in seen:
+                self.error(number, {"title": ["Duplicate title in this import."]})
+                continue
+
+            clashes = {
+                field: [f"Already used by rose {owner!r}."]
+                for field, value in [
+                    ("title_eng", data["title_eng"]),
+                    ("slug", data["slug"]),
+                ]
+                if (owner := owners[field].get(value, data["title"])) != data["title"]
+            }
+            if clashes:
+                self.error(number, clashes)
+                continue
+
+            seen.add(data["title"])
+            owners["title_eng"][data["title_eng"]] = data["title"]
+            owners["slug"][data["slug"]] = data["title"]
+            checked.append((number, data))
+        return checked
+
+    def resolve_names(self, rows):
+        names = {key: set() for key in self.maps}
+        for _, data in rows:
+            names["group"].add(data["group"])
+            names["breeder"].add(data["breeder"])
+            for key, _, targets, *_ in TREATMENTS:
+                for entry in data[key]:
+                    names[key].add(entry["name"])
+                    names[targets].update(entry["targets"])
+
+        for key, name_map in self.maps.items():
+            name_map.resolve(names[key])
+
+        resolved = []
+        for number, data in rows:
+            missing = {
+                key: [f"Unknown {key} {data[key]!r}."]
+                for key in ("group", "breeder")
+                if self.maps[key].get(data[key]) is None
+            }
+            for key, _, targets, *_ in TREATMENTS:
+                unknown = [
+                    f"Unknown {map_key} {name!r}."
+                    for entry in data[key]
+                    for map_key, names in [
+                        (key, [entry["name"]]),
+                        (targets, entry["targets"]),
+                    ]
+                    for name in names
+                    if self.maps[map_key].get(name) is None
+                ]
+                if unknown:
+                    missing[key] = unknown
+            if missing:
+                self.error(number, missing)
+            else:
+                resolved.append((number, data))
+        return resolved
+
+    def build_rose(self, data):
+        return Rose(
+            title=data["title"],
+            title_eng=data["title_eng"],
+            slug=data["slug"],
+            description=data["description"],
+            landing_date=data["landing_date"],
+            observation=data["observation"],
+            susceptibility=data["susceptibility"],
+            const_width=data["const_width"],
+            const_height=data["const_height"],
+            group_id=self.maps["group"].get(data["group"]),
+            breeder_id=self.maps["breeder"].get(data["breeder"]),
+        )
+
+    def upsert_roses(self, rows):
+        """[(rose, row data)] of the rows that made it in"""
+
+        titles = [data["title"] for _, data in rows]
+        existing = set(
+            Rose.objects.filter(title__in=titles).values_list("title", flat=True)
+        )
+
+        try:
+            with transaction.atomic():
+                roses = self.bulk_upsert([self.build_rose(data) for _, data in rows])
+            saved = list(zip(roses, (data for _, data in rows)))
+        except IntegrityError:
+            # a conflict the checks did not see (a concurrent writer): find
+            # the offending rows one by one
+            saved = []
+            for number, data in rows:
+                try:
+                    with transaction.atomic():
+                        (rose,) = self.bulk_upsert([self.build_rose(data)])
+                except IntegrityError as e:
+                    self.error(number, {"non_field_errors": [str(e)]})
+                else:
+                    saved.append((rose, data))
+
+        for rose, data in saved:
+            if rose.title in existing:
+                self.updated += 1
+            else:
+                self.created += 1
+        return saved
+
+    def bulk_upsert(self, roses):
+        return Rose.objects.bulk_create(
+            roses,
+            update_conflicts=True,
+            unique_fields=["title"],
+            update_fields=UPDATE_FIELDS,
+        )
+
+    def upsert_treatments(self, saved):
+        now = timezone.now()
+        for key, product_key, targets, product_model, _, link_model in TREATMENTS:
+            product_map, target_map = self.maps[key], self.maps[targets]
+            relation = getattr(product_model, targets)
+            product_field = f"{relation.field.m2m_field_name()}_id"
+            target_field = f"{relation.field.m2m_reverse_field_name()}_id"
+
+            # one link per (rose, product), the last entry wins
+            links, target_links = {}, {}
+            for rose, data in saved:
+                for entry in data[key]:
+                    product_id = product_map.get(entry["name"])
+                    links[rose.pk, product_id] = link_model(
+                        rose_id=rose.pk,
+                        date_added=entry["date_added"],
+                        **{f"{product_key}_id": product_id},
+                    )
+                    for name in entry["targets"]:
+                        target_id = target_map.get(name)
+                        target_links[product_id, target_id] = relation.through(
+                            **{product_field: product_id, target_field: target_id}
+                        )
+
+            link_model.objects.bulk_create(
+                links.values(),
+                update_conflicts=True,
+                unique_fields=["rose", product_key],
+                update_fields=["date_added", "updated_at"],
+            )
+            if target_links:
+                relation.through.objects.bulk_create(
+                    target_links.values(), ignore_conflicts=True
+                )
+                # no m2m_changed either, move the products for delta sync
+                product_model.objects.filter(
+                    pk__in={product_id for product_id, _ in target_links}
+                ).update(updated_at=now)
@@ -0,0 +1,104 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from common.renderers import ORJSONParser, ORJSONRenderer
+from roses.models import Breeder, Group, Rose, Size, Feeding
+from roses.serializers import RoseSerializer
+from roses.views import RoseViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer/JSONParser with the orjson ones on a rose "
+        "detail payload. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Sizes and feedings")
+        parser.add_argument("--repeat", type=int, default=50, help="Best of N runs")
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+
+        with transaction.atomic():
+            data = RoseSerializer(self.build_rose(rows)).data
+            transaction.set_rollback(True)
+
+        results = []
+        for name, renderer, parser in [
+            ("json", JSONRenderer(), JSONParser()),
+            ("orjson", ORJSONRenderer(), ORJSONParser()),
+        ]:
+            body = renderer.render(data)
+            results.append(
+                (
+                    name,
+                    body,
+                    self.measure(lambda: renderer.render(data), repeat),
+                    self.measure(lambda: parser.parse(BytesIO(body)), repeat),
+                )
+            )
+
+        (_, before, *_), (_, after, *_) = results
+        if before != after:
+            raise CommandError("renderers disagree")
+
+        self.stdout.write(f"payload {len(before)} bytes, {rows} sizes and feedings")
+        self.stdout.write(f"{'':<8}{'render ms':>12}{'parse ms':>12}")
+        for name, _, render, parse in results:
+            self.stdout.write(f"{name:<8}{render * 1000:>12.3f}{parse * 1000:>12.3f}")
+
+        speedups = [results[0][i] / results[1][i] for i in (2, 3)]
+        self.stdout.write(
+            self.style.SUCCESS("render x{:.1f}, parse x{:.1f}".format(*speedups))
+        )
+
+    def build_rose(self, rows):
+        group = Group.objects.create(name="bench json group")
+        breeder = Breeder.objects.create(name="bench json breeder")
+        rose = Rose.objects.create(
+            title="bench json rose",
+            title_eng="bench json rose",
+            const_width=Decimal("12.50"),
+            const_height=Decimal("80.25"),
+            landing_date=date(2020, 4, 1),
+            group=group,
+            breeder=breeder,
+        )
+        start = date(2020, 4, 1)
+        Size.objects.bulk_create(
+            Size(
+                rose=rose,
+                height=Decimal(i % 250) + Decimal("0.25"),
+                width=Decimal(i % 200) + Decimal("0.75"),
+                date_added=start + timedelta(days=i),
+            )
+            for i in range(rows)
+        )
+        Feeding.objects.bulk_create(
+            Feeding(
+                rose=rose,
+                basal="complex NPK",
+                basal_time=start + timedelta(days=i),
+                leaf="nitrogen",
+                leaf_time=start + timedelta(days=i + 3),
+            )
+            for i in range(rows)
+        )
+        return RoseViewSet.query_plans["retrieve"].apply(Rose.objects).get(pk=rose.pk)
+
+    def measure(self, run, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
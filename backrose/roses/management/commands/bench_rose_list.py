@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from common import RowSerializer
+from roses.models import Rose
+from roses.seeding import CatalogueSeeder
+from roses.serializers import RoseListSerializer
+from roses.views import RoseViewSet
+
+CHILD_ROWS = [
+    "sizes",
+    "feedings",
+    "foliages",
+    "photos",
+    "videos",
+    "pesticides",
+    "fungicides",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows per second of the rose list rendered from model instances "
+        "and from values() rows. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000, help="Page size")
+        parser.add_argument("--repeat", type=int, default=5, help="Best of N runs")
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+
+        with transaction.atomic():
+            missing = rows - Rose.objects.count()
+            if missing > 0:
+                # the list renders no child rows
+                per_rose = dict.fromkeys(CHILD_ROWS, 0)
+                CatalogueSeeder(
+                    roses=missing, per_rose=per_rose, prefix="bench", batch_size=2000
+                ).run()
+
+            request = APIRequestFactory().get("/api/roses/")
+            context = {"request": request}
+            queryset = RoseViewSet.query_plans["list"].apply(
+                Rose.objects.order_by("id")
+            )
+            row_serializer = RowSerializer(RoseListSerializer, context=context)
+            rows_queryset = Rose.objects.order_by("id").values(*row_serializer.columns)
+
+            def instances():
+                page = list(queryset[:rows])
+                return RoseListSerializer(page, many=True, context=context).data
+
+            def values_rows():
+                return row_serializer.render(rows_queryset[:rows])
+
+            renderer = JSONRenderer()
+            if renderer.render(instances()) != renderer.render(values_rows()):
+                raise CommandError("renderers disagree")
+
+            before = self.measure(instances, repeat)
+            after = self.measure(values_rows, repeat)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'path':<12}{'seconds':>10}{'rows/s':>12}")
+        for name, seconds in [("instances", before), ("values", after)]:
+            self.stdout.write(f"{name:<12}{seconds:>10.4f}{rows / seconds:>12.0f}")
+        self.stdout.write(self.style.SUCCESS(f"speedup x{before / after:.2f}"))
+
+    def measure(self, render, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+import numpy as np
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from common.uploads import ImageUploadField
+from userprofile.serializers import PROFILE_IMAGE_EDGE
+
+CHUNK_SIZE = 64 * 1024
+
+
+def decode(upload):
+    # what a plain Pillow load of the upload costs
+    with Image.open(upload) as image:
+        image.load()
+
+
+def validate(upload):
+    ImageUploadField().to_internal_value(upload)
+
+
+def downscale(upload):
+    ImageUploadField(max_edge=PROFILE_IMAGE_EDGE).to_internal_value(upload)
+
+
+STAGES = {"decode": decode, "validate": validate, "downscale": downscale}
+
+
+def receive(source):
+    """the upload as Django's handlers leave it, streamed to a temporary file"""
+
+    size = os.path.getsize(source)
+    upload = TemporaryUploadedFile("camera.jpg", "image/jpeg", size, None)
+    with open(source, "rb") as file:
+        shutil.copyfileobj(file, upload, CHUNK_SIZE)
+    upload.seek(0)
+    return upload
+
+
+def handle_upload(stage, source):
+    upload = receive(source)
+    try:
+        STAGES[stage](upload)
+    finally:
+        upload.close()
+
+
+def memory():
+    """(resident, peak resident) bytes of this process, from linux's /proc"""
+
+    with open("/proc/self/status") as status:
+        fields = dict(line.split(":", 1) for line in status)
+    return tuple(int(fields[key].split()[0]) * 1024 for key in ("VmRSS", "VmHWM"))
+
+
+def run_stage(stage, source, concurrency):
+    """
+    in a fresh process: ``concurrency`` uploads through ``stage`` at once,
+    returns how far the resident memory peaked above where it started, in
+    bytes, and the seconds
+    """
+
+    # start the peak over at the current resident size
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    before, _ = memory()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        futures = [
+            executor.submit(handle_upload, stage, source) for _ in range(concurrency)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    _, peak = memory()
+    return peak - before, elapsed
+
+
+def camera_photo(path, megapixels):
+    """a JPEG of about ``megapixels`` with some texture, at camera quality"""
+
+    width = int((megapixels * 1_000_000 * 3 / 2) ** 0.5)
+    height = width * 2 // 3
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[..., 0] = x
+    pixels[..., 1] = y
+    pixels[..., 2] = rng.integers(96, 160, (height, width), dtype=np.uint8)
+    Image.fromarray(pixels).save(path, format="JPEG", quality=90)
+    return width, height
+
+
+class Command(BaseCommand):
+    help = (
+        "Peak memory of concurrent large photo uploads: a full Pillow decode, "
+        "the header-only validation and the draft mode downscale of profile "
+        "pictures. Every stage runs in a fresh process, linux only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--megapixels", type=float, default=40, help="Size of the photo"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=8, help="Uploads at once"
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        context = multiprocessing.get_context("spawn")
+
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "camera.jpg")
+            width, height = camera_photo(source, options["megapixels"])
+            size = os.path.getsize(source)
+            self.stdout.write(
+                f"{concurrency} uploads of {width}x{height} "
+                f"({size / 2**20:.1f} MiB) at once"
+            )
+
+            results = {}
+            for stage in STAGES:
+                with ProcessPoolExecutor(
+                    1, mp_context=context, initializer=django.setup
+                ) as executor:
+                    future = executor.submit(run_stage, stage, source, concurrency)
+                    results[stage] = future.result()
+
+        self.stdout.write(
+            f"{'stage':<12}{'peak MiB':>10}{'per upload':>12}{'seconds':>10}"
+        )
+        for stage, (growth, seconds) in results.items():
+            self.stdout.write(
+                f"{stage:<12}{growth / 2**20:>10.1f}"
+                f"{growth / concurrency / 2**20:>12.1f}{seconds:>10.2f}"
+            )
+        decoded = results["decode"][0]
+        for stage in ("validate", "downscale"):
+            # below a mebibyte is noise
+            saved = decoded / max(results[stage][0], 2**20)
+            self.stdout.write(
+                self.style.SUCCESS(f"{stage} peaks x{saved:.0f} lower than decode")
+            )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from common import images
+
+from .build_image_variants import photo_jobs, report
+
+
+class Command(BaseCommand):
+    help = "Compute the BlurHash placeholders of rose photos that have none"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Compute the BlurHash of every photo again",
+        )
+
+    def handle(self, *args, **options):
+        filters = {} if options["all"] else {"blurhash": ""}
+        jobs = photo_jobs(**filters)
+        errors = images.run_all(images.build_blurhash, jobs)
+
+        computed = report(self, jobs, errors)
+        self.stdout.write(self.style.SUCCESS(f"Computed {computed} BlurHashes"))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from common import images
+from roses.models import Rose, RosePhoto
+
+
+def photo_jobs(**filters):
+    """(label, pk, field, name) of every uploaded rose photo matching filters"""
+
+    jobs = []
+    for model in (Rose, RosePhoto):
+        queryset = model.objects.exclude(photo="").filter(**filters)
+        default = model._meta.get_field("photo").get_default()
+        if default:
+            queryset = queryset.exclude(photo=default)
+        jobs.extend(
+            (model._meta.label, pk, "photo", name)
+            for pk, name in queryset.values_list("pk", "photo").iterator()
+        )
+    return jobs
+
+
+def report(command, jobs, errors):
+    for (label, pk, _, name), error in zip(jobs, errors):
+        if error is not None:
+            command.stderr.write(f"{label} {pk} ({name}): {error}")
+    return sum(error is None for error in errors)
+
+
+class Command(BaseCommand):
+    help = "Render the resized variants of rose photos uploaded without them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Render the variants of every photo again",
+        )
+
+    def handle(self, *args, **options):
+        filters = {} if options["all"] else {"variants__isnull": True}
+        jobs = photo_jobs(**filters)
+        errors = images.run_all(images.build_variants, jobs)
+
+        rendered = report(self, jobs, errors)
+        self.stdout.write(self.style.SUCCESS(f"Rendered variants of {rendered} photos"))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from roses import blobs
+
+
+class Command(BaseCommand):
+    help = "Recount the references of stored media blobs and remove unused files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=settings.BLOB_GRACE_SECONDS,
+            help="Seconds an unreferenced file is kept, uploads may be in flight",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired, released = blobs.recount()
+        purged = blobs.sweep(blobs.get_storage(*blobs.FILE_FIELDS[0]), options["grace"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Repaired {repaired} blob counts, released {released} blobs, "
+                f"removed {purged} unreferenced files"
+            )
+        )
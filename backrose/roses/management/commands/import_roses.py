@@ -0,0 +1,64 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from roses.importer import BATCH_SIZE, FORMATS, RoseImporter, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import roses from a CSV or NDJSON file, upserting by title"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, - for stdin")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Input format (default: from the file extension)",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--no-create",
+            action="store_true",
+            help="Fail rows naming unknown groups, breeders or products",
+        )
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            default=20,
+            help="Row errors to print (default: 20)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or guess_format(path)
+        if format is None:
+            raise CommandError("Cannot tell the format from the path, pass --format")
+
+        importer = RoseImporter(
+            batch_size=options["batch_size"], create_missing=not options["no_create"]
+        )
+
+        started = time.perf_counter()
+        if path == "-":
+            result = importer.run(read_rows(sys.stdin.buffer, format))
+        else:
+            try:
+                stream = open(path, "rb")
+            except OSError as e:
+                raise CommandError(str(e))
+            with stream:
+                result = importer.run(read_rows(stream, format))
+        elapsed = time.perf_counter() - started
+
+        for error in result["errors"][: options["max_errors"]]:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+
+        for label, count in result["references"].items():
+            self.stdout.write(f"created {count} {label}")
+        summary = (
+            f"Imported {result['created']} new and {result['updated']} updated roses "
+            f"in {elapsed:.1f}s, {len(result['errors'])} rows failed"
+        )
+        style = self.style.WARNING if result["errors"] else self.style.SUCCESS
+        self.stdout.write(style(summary))
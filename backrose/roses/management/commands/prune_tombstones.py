@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from roses import sync
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than the retention window"
+
+    def handle(self, *args, **options):
+        pruned = sync.prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} tombstones"))
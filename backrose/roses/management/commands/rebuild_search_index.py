@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from roses import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of roses from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database to rebuild the index in",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+
+        if not search.is_available(using):
+            raise CommandError("Full-text search index requires an sqlite database")
+
+        with transaction.atomic(using=using):
+            indexed = search.rebuild(using)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} roses"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from roses import adjustments, counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored rose counts of groups and breeders"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = counters.recount()
+            adjustments.bump_version()
+
+        for label, count in repaired.items():
+            self.stdout.write(self.style.SUCCESS(f"Repaired {count} {label} counts"))
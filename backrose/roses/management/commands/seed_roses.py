@@ -0,0 +1,104 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from roses.models import Rose
+from roses.seeding import DISTRIBUTIONS, POPULARITIES, CatalogueSeeder
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic rose catalogue with bulk inserts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--roses", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=10)
+        parser.add_argument("--breeders", type=int, default=50)
+        parser.add_argument("--pests", type=int, default=30)
+        parser.add_argument("--fungi", type=int, default=30)
+        parser.add_argument("--pesticides", type=int, default=20)
+        parser.add_argument("--fungicides", type=int, default=20)
+        for key, mean in [
+            ("sizes", 4),
+            ("feedings", 3),
+            ("foliages", 2),
+            ("photos", 1),
+            ("videos", 0),
+            ("pesticides", 2),
+            ("fungicides", 2),
+        ]:
+            parser.add_argument(
+                f"--{key}-per-rose",
+                type=float,
+                default=mean,
+                help=f"Mean number of {key} per rose (default: {mean})",
+            )
+        parser.add_argument(
+            "--distribution",
+            choices=DISTRIBUTIONS,
+            default="poisson",
+            help="How per-rose child counts spread around their mean",
+        )
+        parser.add_argument(
+            "--popularity",
+            choices=POPULARITIES,
+            default="zipf",
+            help="How roses spread over groups/breeders and treatments over products",
+        )
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=0,
+            help="Render this many placeholder photos with Pillow (default: none)",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix",
+            default="seed",
+            help="Prefix of every generated name, must not be in use yet",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if Rose.objects.filter(slug__startswith=f"{prefix}-rose-").exists():
+            raise CommandError(
+                f'Roses with prefix "{prefix}" already exist, pass another --prefix'
+            )
+
+        seeder = CatalogueSeeder(
+            roses=options["roses"],
+            groups=options["groups"],
+            breeders=options["breeders"],
+            pests=options["pests"],
+            fungi=options["fungi"],
+            pesticides=options["pesticides"],
+            fungicides=options["fungicides"],
+            per_rose={
+                key: options[f"{key}_per_rose"]
+                for key in [
+                    "sizes",
+                    "feedings",
+                    "foliages",
+                    "photos",
+                    "videos",
+                    "pesticides",
+                    "fungicides",
+                ]
+            },
+            distribution=options["distribution"],
+            popularity=options["popularity"],
+            images=options["images"],
+            seed=options["seed"],
+            prefix=prefix,
+            batch_size=options["batch_size"],
+        )
+
+        started = time.perf_counter()
+        created = seeder.run()
+        elapsed = time.perf_counter() - started
+
+        for label, count in created.items():
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded {sum(created.values())} rows in {elapsed:.1f}s")
+        )
@@ -0,0 +1,53 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+import roses.search
+
+
+def create_index(apps, schema_editor):
+    roses.search.install(schema_editor.connection.alias)
+    roses.search.rebuild(schema_editor.connection.alias)
+
+
+def drop_index(apps, schema_editor):
+    roses.search.uninstall(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("roses", "0008_alter_rose_breeder_alter_rose_group"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoseSearchIndex",
+            fields=[
+                (
+                    "rose",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="roses.rose",
+                    ),
+                ),
+                (
+                    "document",
+                    roses.search.FullTextField(db_column="roses_rose_fts"),
+                ),
+                ("title", models.TextField()),
+                ("title_eng", models.TextField()),
+                ("breeder", models.TextField()),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "roses_rose_fts",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+import roses.search
+
+
+def drop_search_triggers(apps, schema_editor):
+    roses.search.drop_triggers(schema_editor.connection.alias)
+
+
+def install_search_triggers(apps, schema_editor):
+    roses.search.install(schema_editor.connection.alias)
+
+
+def count_roses(apps, schema_editor):
+    Rose = apps.get_model("roses", "Rose")
+    for name, field in [("Group", "group"), ("Breeder", "breeder")]:
+        counts = (
+            Rose.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        apps.get_model("roses", name).objects.update(
+            rose_count=Coalesce(Subquery(counts), Value(0))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("roses", "0010_change_tracking"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, install_search_triggers),
+        migrations.AddField(
+            model_name="breeder",
+            name="rose_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="group",
+            name="rose_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(install_search_triggers, drop_search_triggers),
+        migrations.RunPython(count_roses, migrations.RunPython.noop),
+    ]
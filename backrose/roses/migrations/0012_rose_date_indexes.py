@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("roses", "0011_rose_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="feeding",
+            index=models.Index(
+                fields=["rose", "basal_time"], name="feeding_rose_basal_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feeding",
+            index=models.Index(
+                fields=["rose", "leaf_time"], name="feeding_rose_leaf_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="foliage",
+            index=models.Index(
+                fields=["rose", "foliage_time"], name="foliage_rose_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rosefungicide",
+            index=models.Index(
+                fields=["rose", "date_added"], name="rosefungicide_rose_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rosepesticide",
+            index=models.Index(
+                fields=["rose", "date_added"], name="rosepesticide_rose_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="size",
+            index=models.Index(
+                fields=["rose", "date_added"], name="size_rose_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("roses", "0012_rose_date_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rose",
+            name="variants",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="rosephoto",
+            name="variants",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("roses", "0013_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Blob",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("refs", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+import roses.search
+
+
+def drop_search_triggers(apps, schema_editor):
+    roses.search.drop_triggers(schema_editor.connection.alias)
+
+
+def install_search_triggers(apps, schema_editor):
+    roses.search.install(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("roses", "0014_blob"),
+    ]
+
+    operations = [
+        # sqlite rebuilds roses_rose for a column with a default
+        migrations.RunPython(drop_search_triggers, install_search_triggers),
+        migrations.AddField(
+            model_name="rose",
+            name="blurhash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="rosephoto",
+            name="blurhash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(install_search_triggers, drop_search_triggers),
+    ]
@@ -1,13 +1,28 @@
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from pytils.translit import slugify
 
 from common.utils import get_filename
 
+from .search import FTS_TABLE, FullTextField
 
-class Group(models.Model):
+
+class TrackedModel(models.Model):
+    """change tracking for delta sync, deletions are recorded as Tombstones"""
+
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        abstract = True
+
+
+class Group(TrackedModel):
     name = models.CharField(max_length=255, unique=True)
     slug = models.SlugField(max_length=255, unique=True, db_index=True)
+    # maintained by roses.counters
+    rose_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -20,9 +35,10 @@ class Group(models.Model):
         return reverse("group", kwargs={"group_slug": self.slug})
 
 
-class Breeder(models.Model):
+class Breeder(TrackedModel):
     name = models.CharField(max_length=255, unique=True)
     slug = models.SlugField(unique=True)
+    rose_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -32,21 +48,21 @@ class Breeder(models.Model):
         super(Breeder, self).save(*args, **kwargs)
 
 
-class Pest(models.Model):
+class Pest(TrackedModel):
     name = models.TextField(unique=True)
 
     def __str__(self):
         return self.name
 
 
-class Fungus(models.Model):
+class Fungus(TrackedModel):
     name = models.TextField(unique=True)
 
     def __str__(self):
         return self.name
 
 
-class Pesticide(models.Model):
+class Pesticide(TrackedModel):
     name = models.CharField(max_length=255)
     pests = models.ManyToManyField("Pest", related_name="pesticides")
     roses = models.ManyToManyField(
@@ -57,7 +73,7 @@ class Pesticide(models.Model):
         return self.name
 
 
-class Fungicide(models.Model):
+class Fungicide(TrackedModel):
     name = models.CharField(max_length=255)
     fungi = models.ManyToManyField("Fungus", related_name="fungicides")
     roses = models.ManyToManyField(
@@ -68,7 +84,7 @@ class Fungicide(models.Model):
         return self.name
 
 
-class RosePesticide(models.Model):
+class RosePesticide(TrackedModel):
     rose = models.ForeignKey(
         "Rose", on_delete=models.CASCADE, related_name="rosepesticides"
     )
@@ -77,9 +93,14 @@ class RosePesticide(models.Model):
 
     class Meta:
         unique_together = ["rose", "pesticide"]
+        indexes = [
+            models.Index(
+                fields=["rose", "date_added"], name="rosepesticide_rose_date_idx"
+            )
+        ]
 
 
-class RoseFungicide(models.Model):
+class RoseFungicide(TrackedModel):
     rose = models.ForeignKey(
         "Rose", on_delete=models.CASCADE, related_name="rosefungicides"
     )
@@ -88,49 +109,75 @@ class RoseFungicide(models.Model):
 
     class Meta:
         unique_together = ["rose", "fungicide"]
+        indexes = [
+            models.Index(
+                fields=["rose", "date_added"], name="rosefungicide_rose_date_idx"
+            )
+        ]
 
 
-class Size(models.Model):
+class Size(TrackedModel):
     rose = models.ForeignKey("Rose", on_delete=models.CASCADE, related_name="sizes")
     height = models.DecimalField(max_digits=5, decimal_places=2)
     width = models.DecimalField(max_digits=5, decimal_places=2)
     date_added = models.DateField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["rose", "date_added"], name="size_rose_date_idx")
+        ]
+
 
-class Feeding(models.Model):
+class Feeding(TrackedModel):
     rose = models.ForeignKey("Rose", on_delete=models.CASCADE, related_name="feedings")
     basal = models.CharField(max_length=255)
     basal_time = models.DateField(blank=True, null=True)
     leaf = models.CharField(max_length=255)
     leaf_time = models.DateField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["rose", "basal_time"], name="feeding_rose_basal_idx"),
+            models.Index(fields=["rose", "leaf_time"], name="feeding_rose_leaf_idx"),
+        ]
+
 
-class RosePhoto(models.Model):
+class RosePhoto(TrackedModel):
     rose = models.ForeignKey(
         "Rose", on_delete=models.CASCADE, related_name="rosephotos"
     )
     descr = models.TextField(blank=True, null=True)
     year = models.IntegerField(blank=True, null=True)
     photo = models.ImageField(upload_to=get_filename)
+    # resized copies of photo and its blurred placeholder, see common.images
+    variants = models.JSONField(blank=True, null=True, editable=False)
+    blurhash = models.CharField(max_length=64, blank=True, editable=False)
 
 
-class Video(models.Model):
+class Video(TrackedModel):
     rose = models.ForeignKey("Rose", on_delete=models.CASCADE, related_name="videos")
     descr = models.CharField(max_length=255, blank=True, null=True)
     video = models.URLField()
 
 
-class Foliage(models.Model):
+class Foliage(TrackedModel):
     rose = models.ForeignKey("Rose", on_delete=models.CASCADE, related_name="foliages")
     foliage = models.TextField()
     foliage_time = models.DateField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["rose", "foliage_time"], name="foliage_rose_time_idx")
+        ]
 
-class Rose(models.Model):
+
+class Rose(TrackedModel):
     title = models.CharField(max_length=255, unique=True)
     title_eng = models.CharField(max_length=255, unique=True)
     slug = models.SlugField(max_length=255, unique=True, db_index=True)
     photo = models.ImageField(upload_to=get_filename, default="images/cap_rose.png")
+    variants = models.JSONField(blank=True, null=True, editable=False)
+    blurhash = models.CharField(max_length=64, blank=True, editable=False)
     description = models.TextField(blank=True, null=True)
     landing_date = models.DateField(blank=True, null=True)
     observation = models.TextField(blank=True, null=True)
@@ -154,3 +201,46 @@ class Rose(models.Model):
 
     def get_absolute_url(self):
         return reverse("single_rose", kwargs={"rose_slug": self.slug})
+
+
+class Tombstone(models.Model):
+    """a deleted TrackedModel row, so sync clients can drop it from their replica"""
+
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
+
+
+class Blob(models.Model):
+    """a content-addressed media file and how many rows use it (see roses.blobs)"""
+
+    name = models.CharField(max_length=255, primary_key=True)
+    refs = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.refs})"
+
+
+class RoseSearchIndex(models.Model):
+    """read-only mapping of the fts5 index, filled by triggers (see roses.search)"""
+
+    rose = models.OneToOneField(
+        Rose,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search_index",
+    )
+    document = FullTextField(db_column=FTS_TABLE)
+    title = models.TextField()
+    title_eng = models.TextField()
+    breeder = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = FTS_TABLE
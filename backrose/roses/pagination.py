@@ -1,7 +1,78 @@
-from rest_framework.pagination import PageNumberPagination
+from django_filters import OrderingFilter
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RoseCursorPagination(CursorPagination):
+    """
+    keyset pagination: every page is an indexed range scan past the cursor
+    position, with no COUNT(*) and no OFFSET.
+    """
+
+    page_size = 9
+    page_size_query_param = "page_size"
+    max_page_size = 18
+    ordering = "id"
+
+    def get_ordering(self, request, queryset, view):
+        """
+        reuse the ?ordering= choices of the view's filterset. only the first
+        field is kept, the cursor position is built from it and it has to be
+        unique (title and id both are).
+        """
+
+        ordering_filter = self.get_ordering_filter(view)
+        if ordering_filter is None:
+            return (self.ordering,)
+
+        params = request.query_params.get(ordering_filter.field_name, "")
+        for param in params.split(","):
+            param = param.strip()
+            descending = param.startswith("-")
+            field = ordering_filter.param_map.get(param.lstrip("-"))
+            if field:
+                return (f"-{field}" if descending else field,)
+
+        return (self.ordering,)
+
+    def get_ordering_filter(self, view):
+        filterset_class = getattr(view, "filterset_class", None)
+        if filterset_class is None:
+            return None
+
+        for filter_ in filterset_class.base_filters.values():
+            if isinstance(filter_, OrderingFilter):
+                return filter_
+        return None
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    page number pagination by default, ?pagination=cursor switches to
+    RoseCursorPagination. links of a cursor page carry a ?cursor= token,
+    which selects cursor mode on its own.
+    """
+
     page_size = 9
     page_size_query_param = "page_size"
     max_page_size = 18
+    mode_query_param = "pagination"
+    cursor_pagination_class = RoseCursorPagination
+
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
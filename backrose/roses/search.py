@@ -0,0 +1,188 @@
+"""
+full-text search over roses backed by an sqlite fts5 index.
+
+the index lives in the ``roses_rose_fts`` virtual table, one row per rose with
+rowid equal to the rose id. triggers on ``roses_rose`` and ``roses_breeder``
+keep it in sync, so bulk_create / queryset.update are covered as well.
+"""
+
+import re
+
+from django.db import connections, models
+
+FTS_TABLE = "roses_rose_fts"
+
+# bm25 weights for (title, title_eng, breeder): a hit in the title outranks
+# a rose that only matches through its breeder
+RANK_FUNCTION = "bm25(10.0, 10.0, 1.0)"
+
+TOKEN_RE = re.compile(r"\w+")
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, title_eng, breeder,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_rose_ai AFTER INSERT ON roses_rose
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, title_eng, breeder)
+        VALUES (
+            new.id,
+            new.title,
+            new.title_eng,
+            (SELECT name FROM roses_breeder WHERE id = new.breeder_id)
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_rose_au
+    AFTER UPDATE OF title, title_eng, breeder_id ON roses_rose
+    BEGIN
+        UPDATE {FTS_TABLE} SET
+            title = new.title,
+            title_eng = new.title_eng,
+            breeder = (SELECT name FROM roses_breeder WHERE id = new.breeder_id)
+        WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_rose_ad AFTER DELETE ON roses_rose
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_breeder_au
+    AFTER UPDATE OF name ON roses_breeder
+    BEGIN
+        UPDATE {FTS_TABLE} SET breeder = new.name
+        WHERE rowid IN (SELECT id FROM roses_rose WHERE breeder_id = new.id);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', '{RANK_FUNCTION}')",
+]
+
+DROP_TRIGGERS_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_rose_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_rose_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_rose_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_breeder_au",
+]
+
+DROP_SQL = [*DROP_TRIGGERS_SQL, f"DROP TABLE IF EXISTS {FTS_TABLE}"]
+
+REBUILD_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, title, title_eng, breeder)
+    SELECT roses_rose.id, roses_rose.title, roses_rose.title_eng, roses_breeder.name
+    FROM roses_rose
+    INNER JOIN roses_breeder ON roses_breeder.id = roses_rose.breeder_id
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')",
+]
+
+
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class FullTextField(models.TextField):
+    """hidden fts5 column named after the table, the left side of MATCH"""
+
+
+FullTextField.register_lookup(Match)
+
+
+def is_available(using="default"):
+    return connections[using].vendor == "sqlite"
+
+
+def install(using="default"):
+    """create the index and its triggers, safe to call repeatedly"""
+
+    if not is_available(using):
+        return
+
+    with connections[using].cursor() as cursor:
+        for statement in CREATE_SQL:
+            cursor.execute(statement)
+
+
+def uninstall(using="default"):
+    if not is_available(using):
+        return
+
+    with connections[using].cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+def drop_triggers(using="default"):
+    """
+    migrations that remake roses_rose or roses_breeder on sqlite run with the
+    triggers dropped, they reference tables that briefly do not exist.
+    """
+
+    if not is_available(using):
+        return
+
+    with connections[using].cursor() as cursor:
+        for statement in DROP_TRIGGERS_SQL:
+            cursor.execute(statement)
+
+
+def rebuild(using="default"):
+    """repopulate the index from scratch and return the number of indexed roses"""
+
+    install(using)
+
+    with connections[using].cursor() as cursor:
+        for statement in REBUILD_SQL:
+            cursor.execute(statement)
+        cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def build_match_query(value):
+    """
+    turn user input into an fts5 query: every word becomes a quoted prefix
+    term, so "fan ro" matches "fancy rose" while the user is still typing.
+    """
+
+    return " ".join(f'"{token}"*' for token in TOKEN_RE.findall(value))
+
+
+def search_roses(queryset, value):
+    """filter a rose queryset through the index, best matches first"""
+
+    match_query = build_match_query(value)
+    if not match_query:
+        return queryset.none()
+
+    return queryset.filter(search_index__document__match=match_query).order_by(
+        "search_index__rank", "id"
+    )
+
+
+def install_handler(sender, using="default", **kwargs):
+    """
+    post_migrate receiver. sqlite migrations that remake roses_rose drop its
+    triggers along with the old table, so they are put back after every migrate.
+    """
+
+    if not is_available(using):
+        return
+
+    connection = connections[using]
+    if FTS_TABLE in connection.introspection.table_names(include_views=True):
+        install(using)
@@ -0,0 +1,398 @@
+"""
+synthetic rose catalogues for local performance work, see the seed_roses command.
+
+everything is written with bulk_create in batches, roses and their child rows
+are generated batch by batch so memory stays flat for millions of rows.
+"""
+
+import itertools
+import math
+import os
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import adjustments, blobs, counters
+from .models import (
+    Group,
+    Breeder,
+    Rose,
+    Pest,
+    Pesticide,
+    RosePesticide,
+    Fungus,
+    Fungicide,
+    RoseFungicide,
+    Size,
+    Feeding,
+    RosePhoto,
+    Video,
+    Foliage,
+)
+
+DEFAULT_PHOTO = "images/cap_rose.png"
+
+# fixed so that a seed gives the same catalogue whatever the day
+START_DATE = date(2015, 1, 1)
+END_DATE = date(2024, 12, 31)
+
+DISTRIBUTIONS = ("fixed", "uniform", "poisson")
+
+POPULARITIES = ("uniform", "zipf")
+
+ADJECTIVES = [
+    "Crimson",
+    "Golden",
+    "Velvet",
+    "Silver",
+    "Morning",
+    "Wild",
+    "Royal",
+    "Ivory",
+    "Scarlet",
+    "Amber",
+    "Midnight",
+    "Sweet",
+]
+
+NOUNS = [
+    "Dawn",
+    "Glory",
+    "Whisper",
+    "Charm",
+    "Cascade",
+    "Jubilee",
+    "Romance",
+    "Meadow",
+    "Dream",
+    "Legacy",
+    "Sonata",
+    "Blush",
+]
+
+GROUPS = [
+    "Hybrid Tea",
+    "Floribunda",
+    "Grandiflora",
+    "Climber",
+    "Rambler",
+    "Shrub",
+    "English",
+    "Miniature",
+    "Ground Cover",
+    "Polyantha",
+]
+
+FEEDINGS = ["nitrogen", "potassium", "phosphorus", "compost tea", "complex NPK"]
+
+FOLIAGES = ["healthy", "black spot", "chlorosis", "powdery mildew", "leaf drop"]
+
+PLACEHOLDER_COLORS = [
+    (178, 34, 52),
+    (255, 182, 193),
+    (255, 215, 0),
+    (255, 255, 240),
+    (199, 21, 133),
+    (255, 127, 80),
+]
+
+
+class CatalogueSeeder:
+    """
+    counts are the number of reference rows to create, per_rose the mean
+    number of child rows of each kind a rose gets. distribution decides how
+    the per-rose counts spread around that mean, popularity how roses and
+    treatments are spread over groups, breeders and products.
+    """
+
+    def __init__(
+        self,
+        roses=1000,
+        groups=10,
+        breeders=50,
+        pests=30,
+        fungi=30,
+        pesticides=20,
+        fungicides=20,
+        per_rose=None,
+        distribution="poisson",
+        popularity="zipf",
+        images=0,
+        seed=0,
+        prefix="seed",
+        batch_size=1000,
+        start_date=START_DATE,
+        end_date=END_DATE,
+    ):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"unknown distribution {distribution!r}")
+        if popularity not in POPULARITIES:
+            raise ValueError(f"unknown popularity {popularity!r}")
+
+        self.roses = roses
+        self.counts = {
+            "groups": groups,
+            "breeders": breeders,
+            "pests": pests,
+            "fungi": fungi,
+            "pesticides": pesticides,
+            "fungicides": fungicides,
+        }
+        self.per_rose = {
+            "sizes": 4,
+            "feedings": 3,
+            "foliages": 2,
+            "photos": 1,
+            "videos": 0,
+            "pesticides": 2,
+            "fungicides": 2,
+            **(per_rose or {}),
+        }
+        self.distribution = distribution
+        self.popularity = popularity
+        self.images = images
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.start_date = start_date
+        self.end_date = end_date
+        self.rng = random.Random(seed)
+        self.created = {}
+        self.cum_weights = {}
+
+    def run(self):
+        with transaction.atomic():
+            photos = self.create_placeholders()
+            groups = self.create_named(Group, "groups", GROUPS, slugged=True)
+            breeders = self.create_named(Breeder, "breeders", [], slugged=True)
+            pests = self.create_named(Pest, "pests", [])
+            fungi = self.create_named(Fungus, "fungi", [])
+            pesticides = self.create_products(Pesticide, "pesticides", "pests", pests)
+            fungicides = self.create_products(Fungicide, "fungicides", "fungi", fungi)
+
+            for start in range(0, self.roses, self.batch_size):
+                stop = min(start + self.batch_size, self.roses)
+                roses = self.create_roses(start, stop, groups, breeders, photos)
+                self.create_children(roses, pesticides, fungicides, photos)
+
+            # bulk_create sends no signals
+            counters.recount()
+            blobs.recount()
+            adjustments.bump_version()
+
+        return self.created
+
+    # reference data
+
+    def create_named(self, model, key, names, slugged=False):
+        objects = []
+        for i in range(self.counts[key]):
+            base = names[i % len(names)] if names else model.__name__
+            name = f"{self.prefix} {base} {i}"
+            extra = {"slug": f"{self.prefix}-{key}-{i}"} if slugged else {}
+            objects.append(model(name=name, **extra))
+
+        return self.bulk_create(model, objects)
+
+    def create_products(self, model, key, relation, targets):
+        products = self.bulk_create(
+            model,
+            [
+                model(name=f"{self.prefix} {model.__name__} {i}")
+                for i in range(self.counts[key])
+            ],
+        )
+
+        through = getattr(model, relation).through
+        target_field = getattr(model, relation).field.m2m_reverse_field_name()
+        source_field = getattr(model, relation).field.m2m_field_name()
+        links = []
+        for product in products:
+            for target in self.pick_distinct(targets, self.rng.randint(1, 3)):
+                links.append(through(**{source_field: product, target_field: target}))
+
+        self.bulk_create(through, links)
+        return products
+
+    def create_placeholders(self):
+        """render a handful of distinct placeholder photos with Pillow"""
+
+        if not self.images:
+            return [DEFAULT_PHOTO]
+
+        from PIL import Image, ImageDraw
+
+        names = []
+        for i in range(self.images):
+            background = PLACEHOLDER_COLORS[i % len(PLACEHOLDER_COLORS)]
+            image = Image.new("RGB", (640, 480), (34, 85, 34))
+            draw = ImageDraw.Draw(image)
+            for petal in range(6):
+                angle = 2 * math.pi * petal / 6 + i
+                x = 320 + 70 * math.cos(angle)
+                y = 240 + 70 * math.sin(angle)
+                draw.ellipse((x - 80, y - 80, x + 80, y + 80), fill=background)
+            draw.ellipse((280, 200, 360, 280), fill=(120, 20, 30))
+
+            buffer = BytesIO()
+            image.save(buffer, format="JPEG", quality=80)
+            path = os.path.join("images", self.prefix, f"placeholder_{i}.jpg")
+            names.append(default_storage.save(path, ContentFile(buffer.getvalue())))
+
+        self.created["images"] = len(names)
+        return names
+
+    # roses and their children
+
+    def create_roses(self, start, stop, groups, breeders, photos):
+        roses = []
+        for i in range(start, stop):
+            title = f"{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)}"
+            roses.append(
+                Rose(
+                    title=f"{self.prefix} {title} {i}",
+                    title_eng=f"{self.prefix} {title} {i} eng",
+                    slug=f"{self.prefix}-rose-{i}",
+                    photo=self.rng.choice(photos),
+                    description=f"{title} seeded for load testing",
+                    landing_date=self.random_date(),
+                    breeder=self.pick(breeders),
+                    group=self.pick(groups),
+                )
+            )
+
+        return self.bulk_create(Rose, roses)
+
+    def create_children(self, roses, pesticides, fungicides, photos):
+        rows = {
+            Size: [],
+            Feeding: [],
+            Foliage: [],
+            RosePhoto: [],
+            Video: [],
+            RosePesticide: [],
+            RoseFungicide: [],
+        }
+
+        for rose in roses:
+            for _ in range(self.child_count("sizes")):
+                rows[Size].append(
+                    Size(
+                        rose=rose,
+                        height=self.random_decimal(10, 250),
+                        width=self.random_decimal(10, 200),
+                        date_added=self.random_date(),
+                    )
+                )
+            for _ in range(self.child_count("feedings")):
+                rows[Feeding].append(
+                    Feeding(
+                        rose=rose,
+                        basal=self.rng.choice(FEEDINGS),
+                        basal_time=self.random_date(),
+                        leaf=self.rng.choice(FEEDINGS),
+                        leaf_time=self.random_date(),
+                    )
+                )
+            for _ in range(self.child_count("foliages")):
+                rows[Foliage].append(
+                    Foliage(
+                        rose=rose,
+                        foliage=self.rng.choice(FOLIAGES),
+                        foliage_time=self.random_date(),
+                    )
+                )
+            for _ in range(self.child_count("photos")):
+                rows[RosePhoto].append(
+                    RosePhoto(
+                        rose=rose,
+                        photo=self.rng.choice(photos),
+                        year=self.random_date().year,
+                    )
+                )
+            for n in range(self.child_count("videos")):
+                rows[Video].append(
+                    Video(rose=rose, video=f"https://example.com/{rose.slug}/{n}")
+                )
+            # unique_together (rose, product): a rose never gets a product twice
+            count = self.child_count("pesticides")
+            for pesticide in self.pick_distinct(pesticides, count):
+                rows[RosePesticide].append(
+                    RosePesticide(
+                        rose=rose, pesticide=pesticide, date_added=self.random_date()
+                    )
+                )
+            count = self.child_count("fungicides")
+            for fungicide in self.pick_distinct(fungicides, count):
+                rows[RoseFungicide].append(
+                    RoseFungicide(
+                        rose=rose, fungicide=fungicide, date_added=self.random_date()
+                    )
+                )
+
+        for model, objects in rows.items():
+            self.bulk_create(model, objects)
+
+    # sampling
+
+    def child_count(self, key):
+        mean = self.per_rose[key]
+        if mean <= 0:
+            return 0
+        if self.distribution == "fixed":
+            return round(mean)
+        if self.distribution == "uniform":
+            return self.rng.randint(0, round(2 * mean))
+        return self.poisson(mean)
+
+    def poisson(self, mean):
+        # knuth's method, fine for the small means used per rose
+        limit = math.exp(-mean)
+        count, product = 0, self.rng.random()
+        while product > limit:
+            count += 1
+            product *= self.rng.random()
+        return count
+
+    def weights(self, items):
+        """cumulative weights, zipf ranks follow creation order"""
+
+        if self.popularity == "uniform":
+            return None
+        if len(items) not in self.cum_weights:
+            self.cum_weights[len(items)] = list(
+                itertools.accumulate(1 / (rank + 1) for rank in range(len(items)))
+            )
+        return self.cum_weights[len(items)]
+
+    def pick(self, items):
+        return self.rng.choices(items, cum_weights=self.weights(items))[0]
+
+    def pick_distinct(self, items, count):
+        count = min(count, len(items))
+        if self.popularity == "uniform":
+            return self.rng.sample(items, count)
+
+        picked = {}
+        weights = self.weights(items)
+        while len(picked) < count:
+            item = self.rng.choices(items, cum_weights=weights)[0]
+            picked[item.pk] = item
+        return list(picked.values())
+
+    def random_decimal(self, low, high):
+        return Decimal(f"{self.rng.uniform(low, high):.2f}")
+
+    def random_date(self):
+        span = (self.end_date - self.start_date).days
+        return self.start_date + timedelta(days=self.rng.randint(0, span))
+
+    def bulk_create(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        key = model._meta.label
+        self.created[key] = self.created.get(key, 0) + len(created)
+        return created
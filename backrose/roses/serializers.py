@@ -1,4 +1,7 @@
 from rest_framework import serializers
+
+from common.images import VariantsField
+from common.uploads import ImageUploadField
 from .models import (
     Group,
     Breeder,
@@ -34,13 +37,13 @@ class BreederSerializer(serializers.ModelSerializer):
 class PestSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pest
-        fields = "__all__"
+        fields = ["id", "name"]
 
 
 class FungusSerializer(serializers.ModelSerializer):
     class Meta:
         model = Fungus
-        fields = "__all__"
+        fields = ["id", "name"]
 
 
 class PesticideSerializer(serializers.ModelSerializer):
@@ -145,18 +148,22 @@ class SizeSerializer(serializers.ModelSerializer):
 
 
 class RosePhotoSerializer(serializers.ModelSerializer):
+    photo = ImageUploadField()
+    variants = VariantsField()
+
     class Meta:
         model = RosePhoto
-        fields = "__all__"
+        fields = ["id", "rose", "descr", "year", "photo", "variants", "blurhash"]
 
 
 class VideoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Video
-        fields = "__all__"
+        fields = ["id", "rose", "descr", "video"]
 
 
 class RoseCreateSerializer(serializers.ModelSerializer):
+    photo = ImageUploadField(required=False)
 
     class Meta:
         model = Rose
@@ -177,6 +184,7 @@ class RoseCreateSerializer(serializers.ModelSerializer):
 
 
 class RoseSerializer(serializers.ModelSerializer):
+    variants = VariantsField()
     breeder = BreederSerializer(read_only=True)
     group = GroupSerializer(read_only=True)
     pesticides = RosePesticideSerializer(
@@ -200,6 +208,8 @@ class RoseSerializer(serializers.ModelSerializer):
             "group",
             "breeder",
             "photo",
+            "variants",
+            "blurhash",
             "description",
             "landing_date",
             "observation",
@@ -217,6 +227,8 @@ class RoseSerializer(serializers.ModelSerializer):
 
 
 class RoseListSerializer(serializers.ModelSerializer):
+    variants = VariantsField()
+
     class Meta:
         model = Rose
-        fields = ["id", "title", "photo", "group"]
+        fields = ["id", "title", "photo", "variants", "blurhash", "group"]
@@ -0,0 +1,142 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from common import images
+from userprofile.models import Profile
+
+from . import adjustments, blobs, counters, sync
+from .models import (
+    Group,
+    Breeder,
+    Rose,
+    Pest,
+    Fungus,
+    Pesticide,
+    Fungicide,
+    Tombstone,
+    RosePhoto,
+)
+
+# everything the adjustments bundle is built from; roses only show there
+# through rose_count, see update_rose_counters
+ADJUSTMENT_MODELS = [Group, Breeder, Pest, Fungus, Pesticide, Fungicide]
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_adjustments(sender, **kwargs):
+    if sender in ADJUSTMENT_MODELS:
+        adjustments.bump_version()
+
+
+@receiver(m2m_changed, sender=Pesticide.pests.through)
+@receiver(m2m_changed, sender=Fungicide.fungi.through)
+def invalidate_adjustments_links(sender, action, **kwargs):
+    if action.startswith("post_"):
+        adjustments.bump_version()
+
+
+@receiver(post_init, sender=Rose)
+def remember_rose_counters(sender, instance, **kwargs):
+    counters.remember(instance)
+
+
+@receiver(post_save, sender=Rose)
+def update_rose_counters(sender, instance, created, raw=False, **kwargs):
+    if not raw and counters.rose_saved(instance, created):
+        adjustments.bump_version()
+
+
+@receiver(post_delete, sender=Rose)
+def release_rose_counters(sender, instance, **kwargs):
+    counters.rose_deleted(instance)
+    adjustments.bump_version()
+
+
+@receiver(post_delete)
+def record_tombstone(sender, instance, **kwargs):
+    if sender in sync.TRACKED_MODELS:
+        Tombstone.objects.create(model=sender._meta.label, object_id=instance.pk)
+
+
+@receiver(m2m_changed, sender=Pesticide.pests.through)
+@receiver(m2m_changed, sender=Fungicide.fungi.through)
+def touch_product(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """pests/fungi are synced as part of their product row, which has to move"""
+
+    if not action.startswith("post_"):
+        return
+
+    if reverse:
+        # changed from the pest/fungus side, pk_set holds product ids
+        product_model = model
+        pks = pk_set or []
+    else:
+        product_model = type(instance)
+        pks = [instance.pk]
+    product_model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+@receiver(post_init, sender=Rose)
+@receiver(post_init, sender=RosePhoto)
+def remember_photo(sender, instance, **kwargs):
+    images.remember(instance)
+    blobs.remember(instance)
+
+
+@receiver(pre_save, sender=Rose)
+@receiver(pre_save, sender=RosePhoto)
+def reset_photo_variants(sender, instance, raw=False, **kwargs):
+    """variants and BlurHash of a replaced photo are stale, new ones follow"""
+
+    if raw:
+        return
+    # an identical upload keeps its name and its variants
+    images.commit(instance)
+    if images.changed(instance):
+        instance.variants = None
+        instance.blurhash = ""
+
+
+@receiver(post_save, sender=Rose)
+@receiver(post_save, sender=RosePhoto)
+def render_photo_variants(sender, instance, created, raw=False, **kwargs):
+    if not raw and (created or images.changed(instance)):
+        images.schedule(instance)
+    images.remember(instance)
+
+
+@receiver(post_save, sender=Rose)
+@receiver(post_save, sender=RosePhoto)
+def count_photo_blob(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        blobs.saved(instance, created)
+
+
+@receiver(post_delete, sender=Rose)
+@receiver(post_delete, sender=RosePhoto)
+def release_photo_blob(sender, instance, **kwargs):
+    blobs.deleted(instance)
+
+
+@receiver(post_init, sender=Profile)
+def remember_profile_blob(sender, instance, **kwargs):
+    blobs.remember(instance, "image")
+
+
+@receiver(post_save, sender=Profile)
+def count_profile_blob(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        blobs.saved(instance, created, "image")
+
+
+@receiver(post_delete, sender=Profile)
+def release_profile_blob(sender, instance, **kwargs):
+    blobs.deleted(instance, "image")
@@ -0,0 +1,235 @@
+"""
+delta sync of the rose catalogue.
+
+a sync token is an opaque, signed timestamp taken before the changes are read.
+the next sync returns every row updated and every tombstone recorded since
+then, minus a small overlap: a transaction that saved a row before the token
+was taken but committed after it would otherwise be missed. clients apply
+changes as idempotent upserts, so the overlap only costs a few repeated rows.
+sqlite may hand out the id of a deleted row again, so deletions are applied
+before changes.
+
+a snapshot or a delta comes in pages of at most ``page_size`` rows,
+collection after collection in id order; a delta pages through its
+tombstones first. while more=True the token continues the sync (its start
+time, the last collection and id sent, and the time a delta runs from); the
+last page hands out a plain token from the start of the sync, so rows written
+while the client was paging come with the next delta.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import (
+    Group,
+    Breeder,
+    Rose,
+    Pest,
+    Pesticide,
+    RosePesticide,
+    Fungus,
+    Fungicide,
+    RoseFungicide,
+    Size,
+    Feeding,
+    RosePhoto,
+    Video,
+    Foliage,
+    Tombstone,
+)
+
+TOKEN_SALT = "roses.sync"
+
+OVERLAP = timedelta(seconds=5)
+
+# tokens older than this may predate pruned tombstones, such clients resync
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def flat_serializer(model, exclude=()):
+    """one row per object, relations as ids, the way a replica stores them"""
+
+    meta = type("Meta", (), {"model": model, "exclude": list(exclude)})
+    return type(
+        f"{model.__name__}SyncSerializer",
+        (serializers.ModelSerializer,),
+        {"Meta": meta},
+    )
+
+
+# (payload key, model, serializer, prefetches)
+SYNCED = [
+    ("groups", Group, flat_serializer(Group), ()),
+    ("breeders", Breeder, flat_serializer(Breeder), ()),
+    ("pests", Pest, flat_serializer(Pest), ()),
+    ("fungi", Fungus, flat_serializer(Fungus), ()),
+    ("pesticides", Pesticide, flat_serializer(Pesticide, ["roses"]), ("pests",)),
+    ("fungicides", Fungicide, flat_serializer(Fungicide, ["roses"]), ("fungi",)),
+    ("roses", Rose, flat_serializer(Rose), ()),
+    ("sizes", Size, flat_serializer(Size), ()),
+    ("feedings", Feeding, flat_serializer(Feeding), ()),
+    ("foliages", Foliage, flat_serializer(Foliage), ()),
+    ("photos", RosePhoto, flat_serializer(RosePhoto), ()),
+    ("videos", Video, flat_serializer(Video), ()),
+    ("rose_pesticides", RosePesticide, flat_serializer(RosePesticide), ()),
+    ("rose_fungicides", RoseFungicide, flat_serializer(RoseFungicide), ()),
+]
+
+TRACKED_MODELS = [model for _, model, _, _ in SYNCED]
+
+
+# the pseudo collection a delta pages its tombstones under
+TOMBSTONES = "tombstones"
+
+
+def encode_token(moment, position=None, since=None):
+    """
+    ``position`` (collection key, last id) continues a snapshot, or with
+    ``since`` a delta
+    """
+
+    def micros(value):
+        return int(value.timestamp() * 1_000_000)
+
+    if position is None:
+        return signing.dumps(micros(moment), salt=TOKEN_SALT)
+    value = [micros(moment), *position]
+    if since is not None:
+        value.append(micros(since))
+    return signing.dumps(value, salt=TOKEN_SALT)
+
+
+def decode_token(token):
+    """(moment, position or None, since or None)"""
+
+    def moment(micros):
+        return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+
+    try:
+        value = signing.loads(token, salt=TOKEN_SALT)
+        micros, *rest = value if isinstance(value, list) else [value]
+        if len(rest) not in (0, 2, 3):
+            raise ValueError
+        since = moment(rest.pop()) if len(rest) == 3 else None
+        return moment(micros), tuple(rest) or None, since
+    except (signing.BadSignature, TypeError, ValueError, OverflowError):
+        raise InvalidToken("Invalid sync token")
+
+
+def collect_changes(token=None, context=None, page_size=PAGE_SIZE):
+    """
+    rows changed and ids deleted since the token; without a token, or with
+    one older than the tombstone retention, the first page of a full
+    snapshot with reset=True, see collect_snapshot.
+    """
+
+    now = timezone.now()
+    moment, position, since = decode_token(token) if token else (None, None, None)
+    if since is not None:
+        return collect_delta(moment, since, position, page_size, context)
+    if position is not None:
+        return collect_snapshot(moment, position, page_size, context)
+    if moment is None or moment < now - TOMBSTONE_RETENTION:
+        return collect_snapshot(now, None, page_size, context)
+    return collect_delta(now, moment, None, page_size, context)
+
+
+def read_page(collections, position, page_size):
+    """
+    ({key: rows}, position of the next page or None): at most ``page_size``
+    rows of the (key, queryset) collections in order, from ``position`` on
+    or from the start; one query per collection the page reaches.
+    """
+
+    keys = [key for key, _ in collections]
+    start, after = position or (keys[0], 0)
+    if start not in keys or not isinstance(after, int):
+        raise InvalidToken("Invalid sync token")
+
+    rows, left, next_position = {}, page_size, None
+    index = keys.index(start)
+    for key, queryset in collections[index:]:
+        rows[key] = list(queryset.filter(pk__gt=after).order_by("pk")[:left])
+        left -= len(rows[key])
+        after = 0
+        if not left:
+            # a full page may end a collection, the next one then starts empty
+            next_position = (key, rows[key][-1].pk)
+            break
+    return rows, next_position
+
+
+def serialize_changes(rows, context=None):
+    return {
+        key: serializer_class(rows.get(key, []), many=True, context=context).data
+        for key, _, serializer_class, _ in SYNCED
+    }
+
+
+def collect_delta(started, since, position, page_size, context=None):
+    """one page of the delta from ``since``, taken at ``started``"""
+
+    keys = {model._meta.label: key for key, model, _, _ in SYNCED}
+    collections = [
+        (
+            TOMBSTONES,
+            Tombstone.objects.filter(
+                deleted_at__gte=since - OVERLAP, model__in=list(keys)
+            ),
+        )
+    ] + [
+        (
+            key,
+            model.objects.prefetch_related(*prefetches).filter(
+                updated_at__gte=since - OVERLAP
+            ),
+        )
+        for key, model, _, prefetches in SYNCED
+    ]
+    rows, next_position = read_page(collections, position, page_size)
+
+    deleted = {key: set() for key in keys.values()}
+    for tombstone in rows.pop(TOMBSTONES, []):
+        deleted[keys[tombstone.model]].add(tombstone.object_id)
+
+    return {
+        "token": encode_token(started, next_position, since),
+        "reset": False,
+        "more": next_position is not None,
+        "changes": serialize_changes(rows, context),
+        "deleted": {key: sorted(ids) for key, ids in deleted.items()},
+    }
+
+
+def collect_snapshot(started, position, page_size, context=None):
+    """one page of the snapshot taken at ``started``"""
+
+    collections = [
+        (key, model.objects.prefetch_related(*prefetches))
+        for key, model, _, prefetches in SYNCED
+    ]
+    rows, next_position = read_page(collections, position, page_size)
+
+    return {
+        "token": encode_token(started, next_position),
+        # only the first page tells the client to drop its replica
+        "reset": position is None,
+        "more": next_position is not None,
+        "changes": serialize_changes(rows, context),
+        "deleted": {},
+    }
+
+
+def prune_tombstones():
+    cutoff = timezone.now() - TOMBSTONE_RETENTION - OVERLAP
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
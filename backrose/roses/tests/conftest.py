@@ -4,7 +4,6 @@ import tempfile
 import pytest
 from PIL import Image
 from io import BytesIO
-from django.db.models import Count
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from decimal import Decimal
@@ -30,8 +29,7 @@ from roses.models import (
 
 @pytest.fixture
 def group():
-    group = Group.objects.create(name="fancy group")
-    return Group.objects.annotate(rose_count=Count("roses")).get(id=group.id)
+    return Group.objects.create(name="fancy group")
 
 
 @pytest.fixture
@@ -72,7 +72,14 @@ class TestRoseListSerializer:
         serializer = RoseListSerializer(instance=rose)
         data = serializer.data
 
-        assert set(data.keys()) == {"id", "title", "photo", "group"}
+        assert set(data.keys()) == {
+            "id",
+            "title",
+            "photo",
+            "variants",
+            "blurhash",
+            "group",
+        }
 
         detailed_fields = ["feedings", "foliages", "pesticides", "description"]
         for field in detailed_fields:
@@ -83,7 +90,11 @@ class TestRoseListSerializer:
 @pytest.mark.parametrize(
     "serializer_class,action,expected_fields",
     [
-        (RoseListSerializer, "list", {"id", "title", "photo", "group"}),
+        (
+            RoseListSerializer,
+            "list",
+            {"id", "title", "photo", "variants", "blurhash", "group"},
+        ),
         (
             RoseCreateSerializer,
             "create",
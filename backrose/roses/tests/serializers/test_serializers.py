@@ -1,6 +1,5 @@
 import pytest
 from decimal import Decimal
-from django.db.models import Count
 from roses.serializers import (
     GroupSerializer,
     BreederSerializer,
@@ -10,7 +9,7 @@ from roses.serializers import (
     FungusSerializer,
     SizeSerializer,
 )
-from roses.models import Rose, Group
+from roses.models import Rose
 
 
 @pytest.mark.django_db
@@ -26,7 +25,7 @@ class TestGroupSerializer:
             title="rose2", title_eng="rose2", group=group, breeder=breeder
         )
 
-        group = Group.objects.annotate(rose_count=Count("roses")).get(id=group.id)
+        group.refresh_from_db()
         serializer = GroupSerializer(instance=group)
 
         assert serializer.data["rose_count"] == 2
@@ -0,0 +1,300 @@
+import hashlib
+import os
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+
+from common.storage import ContentAddressedStorage
+from roses import blobs
+from roses.models import Blob, Rose, RosePhoto
+
+pytestmark = pytest.mark.django_db
+
+
+def jpeg(color="red", name="photo.jpg"):
+    buffer = BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, format="JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def storage(media):
+    return ContentAddressedStorage()
+
+
+def refs(name):
+    return Blob.objects.filter(name=name).values_list("refs", flat=True).first()
+
+
+class TestStorage:
+
+    def test_stored_by_content(self, storage):
+        content = jpeg().read()
+
+        name = storage.save(
+            "images/some rose/some rose_photo.JPEG", ContentFile(content)
+        )
+
+        digest = hashlib.sha256(content).hexdigest()
+        assert name == f"blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+        with storage.open(name) as file:
+            assert file.read() == content
+        assert not [
+            f
+            for f in os.listdir(os.path.dirname(storage.path(name)))
+            if f.endswith(".tmp")
+        ]
+
+    def test_identical_uploads_are_one_file(self, storage):
+        first = storage.save("images/a/a_1.jpg", jpeg())
+        second = storage.save("images/b/b_2.jpeg", jpeg())
+        other = storage.save("images/a/a_1.jpg", jpeg("blue"))
+
+        assert first == second
+        assert other != first
+        assert list(storage.blobs()) and sorted(storage.blobs()) == sorted(
+            {first, other}
+        )
+
+    def test_reuse_touches_the_blob(self, storage):
+        name = storage.save("x.jpg", jpeg())
+        os.utime(storage.path(name), (0, 0))
+
+        storage.save("y.jpg", jpeg())
+
+        assert storage.age(name) < 60
+
+    def test_delete_leaves_blobs(self, storage, media):
+        name = storage.save("x.jpg", jpeg())
+        (media / "legacy.jpg").write_bytes(b"old")
+
+        storage.delete(name)
+        storage.delete("legacy.jpg")
+
+        assert storage.exists(name)
+        assert not storage.exists("legacy.jpg")
+
+    def test_purge(self, storage):
+        name = storage.save("x.jpg", jpeg())
+        root, _ = os.path.splitext(storage.path(name))
+        for derived in (".grid.jpg", ".grid.webp"):
+            with open(root + derived, "wb") as file:
+                file.write(b"variant")
+        same_content = storage.save("x.png", ContentFile(jpeg().read()))
+
+        storage.purge(same_content)
+        assert storage.exists(name) and os.path.exists(root + ".grid.jpg")
+
+        storage.purge(name)
+        assert not os.listdir(os.path.dirname(storage.path(name)))
+
+
+class TestReferenceCounts:
+
+    @pytest.fixture
+    def shared(self, media, rose, breeder, group):
+        rose.photo = jpeg()
+        rose.save()
+        other = Rose.objects.create(
+            title="other", title_eng="other", group=group, breeder=breeder, photo=jpeg()
+        )
+        photo = RosePhoto.objects.create(rose=other, photo=jpeg())
+        return rose, other, photo
+
+    def test_shared_upload(self, shared):
+        rose, other, photo = shared
+
+        assert rose.photo.name == other.photo.name == photo.photo.name
+        assert refs(rose.photo.name) == 3
+
+    def test_rose_photo_delete_keeps_shared_file(
+        self, authenticated_client, shared, django_capture_on_commit_callbacks
+    ):
+        rose, other, photo = shared
+        name = rose.photo.name
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.delete(reverse("rose-photo", kwargs={"pk": rose.id}))
+            authenticated_client.delete(
+                reverse(
+                    "rose-photos-detail", kwargs={"rose_pk": other.id, "pk": photo.id}
+                )
+            )
+
+        assert refs(name) == 1
+        assert default_storage.exists(name)
+
+    def test_last_reference_frees_the_file(
+        self, authenticated_client, shared, settings, django_capture_on_commit_callbacks
+    ):
+        settings.BLOB_GRACE_SECONDS = 0
+        rose, other, photo = shared
+        name = rose.photo.name
+        variant = os.path.splitext(default_storage.path(name))[0] + ".grid.jpg"
+        with open(variant, "wb") as file:
+            file.write(b"variant")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.delete(reverse("rose-photo", kwargs={"pk": rose.id}))
+            other.delete()
+
+        assert not RosePhoto.objects.exists()
+        assert refs(name) is None
+        assert not default_storage.exists(name)
+        assert not os.path.exists(variant)
+
+    def test_fresh_blob_left_to_sweep(
+        self, shared, storage, django_capture_on_commit_callbacks
+    ):
+        rose, other, photo = shared
+        name = rose.photo.name
+
+        with django_capture_on_commit_callbacks(execute=True):
+            rose.delete()
+            other.delete()
+
+        # stored moments ago, an upload of the same bytes may be in flight
+        assert refs(name) is None
+        assert storage.exists(name)
+        assert blobs.sweep(storage, grace=3600) == 0
+        assert blobs.sweep(storage, grace=0) == 1
+        assert not storage.exists(name)
+
+    def test_collect_rechecks_references(self, shared, settings, storage):
+        settings.BLOB_GRACE_SECONDS = 0
+        rose, _, _ = shared
+        name = rose.photo.name
+        # a reference the count has not caught up with
+        Blob.objects.filter(name=name).update(refs=0)
+
+        blobs.collect(storage, name)
+
+        assert refs(name) == 0
+        assert storage.exists(name)
+
+    def test_replaced_photo(self, shared, django_capture_on_commit_callbacks):
+        rose, _, _ = shared
+        old = rose.photo.name
+
+        with django_capture_on_commit_callbacks(execute=True):
+            rose.photo = jpeg("blue")
+            rose.save()
+
+        assert refs(old) == 2
+        assert refs(rose.photo.name) == 1
+
+    def test_identical_upload_keeps_variants(
+        self, shared, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        rose, _, _ = shared
+        Rose.objects.filter(pk=rose.pk).update(variants={"grid": {}})
+        rose = Rose.objects.get(pk=rose.pk)
+        submitted = []
+        monkeypatch.setattr("common.images.submit", lambda *a: submitted.append(a))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            rose.photo = jpeg(name="again.jpg")
+            rose.save()
+
+        assert Rose.objects.get(pk=rose.pk).variants == {"grid": {}}
+        assert submitted == []
+        assert refs(rose.photo.name) == 3
+
+    def test_placeholder_is_not_counted(self, media, rose):
+        rose.photo = "images/cap_rose.png"
+        rose.save()
+
+        assert not Blob.objects.filter(name="images/cap_rose.png").exists()
+
+
+class TestCollect:
+
+    def test_recount_and_sweep(
+        self, media, settings, rose, storage, django_capture_on_commit_callbacks
+    ):
+        settings.BLOB_GRACE_SECONDS = 0
+        with django_capture_on_commit_callbacks(execute=True):
+            rose.photo = jpeg()
+            rose.save()
+        shared = rose.photo.name
+        unused = storage.save("gone.jpg", jpeg("green"))
+        orphan = storage.save("orphan.jpg", jpeg("blue"))
+        Blob.objects.filter(name=shared).update(refs=7)
+        Blob.objects.create(name=unused, refs=1)
+        RosePhoto.objects.bulk_create([RosePhoto(rose=rose, photo=shared)])
+        out = StringIO()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("collect_blobs", "--grace=0", stdout=out)
+
+        assert "Repaired 1 blob counts, released 1 blobs, removed 1" in out.getvalue()
+        assert refs(shared) == 2
+        assert refs(unused) is None
+        assert storage.exists(shared)
+        assert not storage.exists(unused)
+        assert not storage.exists(orphan)
+
+    def test_profile_image_is_counted(
+        self, authenticated_client, test_user, media, storage, rose
+    ):
+        response = authenticated_client.patch(
+            reverse("user"), {"image": jpeg()}, format="multipart"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        test_user.profile.refresh_from_db()
+        name = test_user.profile.image.name
+
+        assert refs(name) == 1
+        assert blobs.sweep(storage, grace=0) == 0
+        assert storage.exists(name)
+
+        # a rose photo with the same bytes letting go leaves the avatar alone
+        rose.photo = jpeg()
+        rose.save()
+        assert refs(name) == 2
+        rose.delete()
+        assert refs(name) == 1
+
+    def test_sweep_grace(self, storage):
+        young = storage.save("young.jpg", jpeg())
+
+        assert blobs.sweep(storage, grace=3600) == 0
+        assert storage.exists(young)
+
+
+class TestImmutableUrls:
+
+    def test_blob_cached_forever(self, api_client, media, storage):
+        name = storage.save("x.jpg", jpeg())
+        (media / "legacy.jpg").write_bytes(b"old")
+
+        blob = api_client.get(f"/media/{name}")
+        legacy = api_client.get("/media/legacy.jpg")
+
+        assert blob["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert "Cache-Control" not in legacy
+        blob.close()
+        legacy.close()
+
+    def test_private_media(self, authenticated_client, settings, media, storage):
+        settings.MEDIA_AUTHENTICATED = True
+        name = storage.save("x.jpg", jpeg())
+
+        response = authenticated_client.get(f"/media/{name}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Cache-Control"].startswith("private, ")
+        response.close()
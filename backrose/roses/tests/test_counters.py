@@ -0,0 +1,87 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from roses import counters
+from roses.models import Rose, Group, Breeder
+
+
+def make_rose(i, group, breeder):
+    return Rose.objects.create(
+        title=f"counted {i}", title_eng=f"counted {i} eng", group=group, breeder=breeder
+    )
+
+
+def counts(*objects):
+    return [type(obj).objects.get(pk=obj.pk).rose_count for obj in objects]
+
+
+@pytest.mark.django_db
+class TestRoseCounters:
+
+    def test_create_increments(self, group, breeder):
+        for i in range(3):
+            make_rose(i, group, breeder)
+
+        assert counts(group, breeder) == [3, 3]
+
+    def test_delete_decrements(self, group, breeder):
+        roses = [make_rose(i, group, breeder) for i in range(2)]
+
+        roses[0].delete()
+        Rose.objects.filter(pk=roses[1].pk).delete()
+
+        assert counts(group, breeder) == [0, 0]
+
+    def test_move_between_groups(self, group, breeder):
+        other = Group.objects.create(name="other group")
+        rose = make_rose(0, group, breeder)
+
+        rose.group = other
+        rose.save()
+        # saving again without a move changes nothing
+        rose.save()
+
+        assert counts(group, other, breeder) == [0, 1, 1]
+
+    def test_move_of_loaded_rose(self, group, breeder):
+        other = Breeder.objects.create(name="other breeder")
+        make_rose(0, group, breeder)
+
+        rose = Rose.objects.get(title="counted 0")
+        rose.breeder = other
+        rose.save()
+
+        assert counts(breeder, other) == [0, 1]
+
+    def test_recount_repairs_drift(self, group, breeder):
+        make_rose(0, group, breeder)
+        make_rose(1, group, breeder)
+        Group.objects.update(rose_count=7)
+        Breeder.objects.update(rose_count=0)
+
+        repaired = counters.recount()
+
+        assert repaired == {"roses.Group": 1, "roses.Breeder": 1}
+        assert counts(group, breeder) == [2, 2]
+        assert counters.recount() == {"roses.Group": 0, "roses.Breeder": 0}
+
+    def test_recount_command(self, group, breeder):
+        make_rose(0, group, breeder)
+        Group.objects.update(rose_count=0)
+
+        call_command("recount_roses", stdout=StringIO())
+
+        assert counts(group) == [1]
+
+    def test_group_list_reads_stored_count(
+        self, authenticated_client, group, breeder, django_assert_num_queries
+    ):
+        make_rose(0, group, breeder)
+
+        with django_assert_num_queries(2):
+            response = authenticated_client.get(reverse("group-list"))
+
+        assert response.data[0]["rose_count"] == 1
@@ -0,0 +1,205 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from roses.growth import Series, bands, lttb, per_segment, seasons
+from roses.models import Rose, Size
+
+START = date(2023, 11, 20)
+
+
+def measure(rose, days, heights, widths=None):
+    widths = widths or [h / 2 for h in heights]
+    Size.objects.bulk_create(
+        Size(
+            rose=rose,
+            date_added=START + timedelta(days=d),
+            height=f"{h:.2f}",
+            width=f"{w:.2f}",
+        )
+        for d, h, w in zip(days, heights, widths)
+    )
+
+
+@pytest.fixture
+def second_rose(rose):
+    return Rose.objects.create(
+        title="second rose",
+        title_eng="second rose",
+        group=rose.group,
+        breeder=rose.breeder,
+    )
+
+
+@pytest.fixture
+def measured(rose, second_rose):
+    measure(rose, [0, 10, 45, 100, 130, 200], [10, 12, 20, 31, 35, 50])
+    measure(second_rose, [5, 60, 61], [5, 9, 9.5])
+    Size.objects.create(rose=rose, height="99.00", width="99.00")
+    return rose, second_rose
+
+
+@pytest.mark.django_db
+class TestStatistics:
+
+    def test_per_segment(self, measured):
+        rose, second = measured
+        series = Series.load(Size.objects.all())
+
+        stats = per_segment(series, series.values["height"])
+
+        assert series.roses.tolist() == [rose.id, second.id]
+        assert stats["growth"].tolist() == [40, 4.5]
+        assert stats["rate"][0] == pytest.approx(40 / 200 * 30)
+        x = np.array([0, 10, 45, 100, 130, 200])
+        y = np.array([10, 12, 20, 31, 35, 50])
+        assert stats["slope"][0] == pytest.approx(np.polyfit(x, y, 1)[0] * 30)
+        assert stats["slope"][1] == pytest.approx(
+            np.polyfit([0, 55, 56], [5, 9, 9.5], 1)[0] * 30
+        )
+
+    def test_single_measurement(self, rose):
+        measure(rose, [0], [10])
+        series = Series.load(Size.objects.all())
+
+        stats = per_segment(series, series.values["height"])
+
+        assert np.isnan(stats["rate"][0])
+        assert np.isnan(stats["slope"][0])
+
+    def test_season_deltas_add_up(self, rose):
+        # november, december (next winter), march, july
+        measure(rose, [0, 15, 110, 230], [10, 11, 15, 30])
+        series = Series.load(Size.objects.all())
+
+        names, deltas = seasons(series)
+
+        assert names == ["2023-autumn", "2024-winter", "2024-spring", "2024-summer"]
+        assert deltas["height"].tolist() == [0, 1, 4, 15]
+        assert deltas["height"].sum() == 30 - 10
+
+    def test_season_deltas_average_roses(self, measured):
+        series = Series.load(Size.objects.all())
+
+        names, deltas = seasons(series)
+
+        # both roses start in november: 12 - 10 and a single measurement
+        assert names[0] == "2023-autumn"
+        assert deltas["height"][0] == pytest.approx((2 + 0) / 2)
+
+    def test_bands_match_numpy(self, rose):
+        heights = [3, 9, 1, 7, 5, 4, 8]
+        measure(rose, [11 + i for i in range(7)], heights)
+        series = Series.load(Size.objects.all())
+
+        months, values = bands(series)
+
+        assert months.tolist() == [date(2023, 12, 1)]
+        assert values["height"][0] == pytest.approx(
+            np.percentile(heights, [10, 50, 90])
+        )
+
+    def test_lttb(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.zeros(1000)
+        y[500] = 100
+
+        keep = lttb(x, y, 20)
+
+        assert len(keep) == 20
+        assert keep[0] == 0 and keep[-1] == 999
+        assert 500 in keep
+        assert np.all(np.diff(keep) > 0)
+        assert lttb(x[:10], y[:10], 20).tolist() == list(range(10))
+
+
+@pytest.mark.django_db
+class TestGrowthViews:
+
+    def test_rose(self, authenticated_client, measured):
+        rose, _ = measured
+
+        response = authenticated_client.get(
+            reverse("rose-growth", kwargs={"pk": rose.id}), {"points": 4}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.data
+        assert data["count"] == 6
+        assert (data["first"], data["last"]) == ("2023-11-20", "2024-06-07")
+        assert data["height"]["growth"] == 40
+        assert data["width"]["growth"] == 20
+        assert len(data["height"]["series"]) == 4
+        assert data["height"]["series"][0] == ["2023-11-20", 10.0]
+        assert data["height"]["series"][-1] == ["2024-06-07", 50.0]
+        assert [season["season"] for season in data["seasons"]][0] == "2023-autumn"
+        assert len(data["bands"]) == 4
+
+    def test_group(self, authenticated_client, measured):
+        rose, second = measured
+
+        response = authenticated_client.get(
+            reverse("group-growth", kwargs={"pk": rose.group_id})
+        )
+
+        data = response.data
+        assert data["count"] == 9
+        assert [row["id"] for row in data["roses"]] == [rose.id, second.id]
+        assert data["roses"][1]["height"]["growth"] == 4.5
+        assert data["roses"][1]["first"] == "2023-11-25"
+        assert data["bands"][0]["month"] == "2023-11-01"
+        assert data["next"] is None
+
+    def test_group_pages(self, authenticated_client, measured):
+        rose, second = measured
+        third = Rose.objects.create(
+            title="third rose",
+            title_eng="third rose",
+            group=rose.group,
+            breeder=rose.breeder,
+        )
+        measure(third, [0, 30], [1, 2])
+        url = reverse("group-growth", kwargs={"pk": rose.group_id})
+
+        first = authenticated_client.get(url, {"page_size": 2}).data
+        last = authenticated_client.get(first["next"]).data
+
+        assert [row["id"] for row in first["roses"]] == [rose.id, second.id]
+        assert first["count"] == 9
+        assert [row["id"] for row in last["roses"]] == [third.id]
+        assert last["count"] == 2
+        assert last["bands"][0]["month"] == "2023-11-01"
+        assert last["next"] is None
+
+    def test_group_bad_cursor(self, authenticated_client, rose):
+        response = authenticated_client.get(
+            reverse("group-growth", kwargs={"pk": rose.group_id}), {"cursor": "x"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "cursor" in response.data
+
+    def test_no_sizes(self, authenticated_client, rose):
+        rose_data = authenticated_client.get(
+            reverse("rose-growth", kwargs={"pk": rose.id})
+        ).data
+        group_data = authenticated_client.get(
+            reverse("group-growth", kwargs={"pk": rose.group_id})
+        ).data
+
+        assert rose_data["count"] == 0
+        assert rose_data["height"] is None
+        assert group_data["roses"] == []
+
+    def test_missing(self, authenticated_client, rose):
+        response = authenticated_client.get(
+            reverse("rose-growth", kwargs={"pk": rose.id + 100})
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_unauthenticated(self, api_client, rose):
+        response = api_client.get(reverse("rose-growth", kwargs={"pk": rose.id}))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,280 @@
+import os
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+
+from common import blurhash, images
+from roses.models import Rose, RosePhoto
+
+
+def upload(
+    name="camera.jpg", size=(3000, 2000), mode="RGB", format="JPEG", color="red", **info
+):
+    image = Image.new(mode, size, color)
+    buffer = BytesIO()
+    image.save(buffer, format=format, **info)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(images, "submit", lambda *args: calls.append(args))
+    return calls
+
+
+def targets(directory, variants=images.VARIANTS):
+    return {
+        variant: {
+            format: str(directory / f"out.{variant}.{format}")
+            for format in images.FORMATS
+        }
+        for variant in variants
+    }
+
+
+class TestRenderVariants:
+
+    def test_sizes(self, tmp_path):
+        source = tmp_path / "camera.jpg"
+        source.write_bytes(upload().read())
+
+        sizes = images.render_variants(str(source), targets(tmp_path))
+
+        assert sizes == {
+            "grid": (480, 320),
+            "detail": (1200, 800),
+            "full": (2400, 1600),
+        }
+        for variant, formats in targets(tmp_path).items():
+            for format, path in formats.items():
+                with Image.open(path) as image:
+                    assert image.format == format.upper()
+                    assert image.size == sizes[variant]
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_never_upscales(self, tmp_path):
+        source = tmp_path / "small.jpg"
+        source.write_bytes(upload(size=(600, 900)).read())
+
+        sizes = images.render_variants(str(source), targets(tmp_path))
+
+        assert sizes["grid"] == (320, 480)
+        assert sizes["detail"] == sizes["full"] == (600, 900)
+
+    def test_exif_orientation(self, tmp_path):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees clockwise
+        source = tmp_path / "portrait.jpg"
+        source.write_bytes(upload(size=(1600, 1200), exif=exif).read())
+
+        sizes = images.render_variants(str(source), targets(tmp_path, ["grid"]))
+
+        assert sizes == {"grid": (360, 480)}
+
+    def test_transparency(self, tmp_path):
+        source = tmp_path / "logo.png"
+        source.write_bytes(upload(mode="RGBA", format="PNG").read())
+
+        images.render_variants(str(source), targets(tmp_path, ["grid"]))
+
+        with Image.open(tmp_path / "out.grid.jpeg") as image:
+            assert image.mode == "RGB"
+
+    def test_process_pool(self, settings, tmp_path):
+        settings.IMAGE_WORKERS = 1
+        source = tmp_path / "camera.jpg"
+        source.write_bytes(upload().read())
+
+        executor = images.get_executor()
+        try:
+            future = executor.submit(
+                images.render_variants, str(source), targets(tmp_path, ["grid"])
+            )
+            assert future.result(timeout=60) == {"grid": (480, 320)}
+        finally:
+            executor.shutdown()
+            images._executor = None
+
+
+class TestBlurHash:
+
+    def test_solid_colour(self):
+        encoded = blurhash.encode(Image.new("RGB", (32, 24), (200, 40, 90)))
+
+        assert len(encoded) == 28
+        # 4 x 3 components, then the average colour in four base 83 digits
+        assert encoded[0] == "L"
+        assert encoded[2:6] == blurhash.base83((200 << 16) + (40 << 8) + 90, 4)
+
+    def test_portrait(self):
+        encoded = blurhash.encode(Image.new("RGB", (24, 32)))
+
+        assert encoded[0] == blurhash.ALPHABET[2 + 3 * 9]
+
+    def test_components(self):
+        image = Image.new("RGB", (8, 8))
+
+        assert len(blurhash.encode(image, (1, 1))) == 6
+        with pytest.raises(ValueError):
+            blurhash.encode(image, (10, 3))
+
+    def test_render(self, tmp_path):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        source = tmp_path / "portrait.jpg"
+        source.write_bytes(upload(size=(1600, 1200), exif=exif).read())
+
+        # oriented before hashing: a portrait, 3 x 4 components
+        assert images.render_blurhash(str(source))[0] == blurhash.ALPHABET[2 + 3 * 9]
+
+
+@pytest.mark.django_db
+class TestPhotoVariants:
+
+    def test_upload(
+        self, media, authenticated_client, rose, django_capture_on_commit_callbacks
+    ):
+        url = reverse("rose-photos-list", kwargs={"rose_pk": rose.id})
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.post(
+                url, {"photo": upload(), "rose": rose.id}, format="multipart"
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        photo = RosePhoto.objects.get(pk=response.data["id"])
+        root, _ = os.path.splitext(photo.photo.name)
+        assert photo.variants["grid"] == {
+            "width": 480,
+            "height": 320,
+            "jpeg": f"{root}.grid.jpg",
+            "webp": f"{root}.grid.webp",
+        }
+        for entry in photo.variants.values():
+            assert (media / entry["jpeg"]).exists()
+            assert (media / entry["webp"]).exists()
+        assert len(photo.blurhash) == 28
+
+        data = authenticated_client.get(
+            reverse("rose-photos-detail", kwargs={"rose_pk": rose.id, "pk": photo.id})
+        ).data
+        assert data["variants"]["full"]["width"] == 2400
+        assert data["blurhash"] == photo.blurhash
+        assert data["variants"]["grid"]["webp"] == "http://testserver" + (
+            default_storage.url(f"{root}.grid.webp")
+        )
+
+    def test_rose_list_and_detail(
+        self, media, authenticated_client, rose, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            rose.photo = upload()
+            rose.save()
+
+        listed = authenticated_client.get(reverse("rose-list")).data["results"][0]
+        detail = authenticated_client.get(
+            reverse("rose-detail", kwargs={"pk": rose.id})
+        ).data
+
+        assert listed["variants"] == detail["variants"]
+        assert set(listed["variants"]) == set(images.VARIANTS)
+        assert listed["blurhash"] == detail["blurhash"] == Rose.objects.get().blurhash
+        assert listed["blurhash"]
+
+    def test_not_rendered_yet(self, authenticated_client, rose):
+        response = authenticated_client.get(reverse("rose-list"))
+
+        assert response.data["results"][0]["variants"] is None
+        assert response.data["results"][0]["blurhash"] == ""
+
+    def test_replaced_photo(self, media, rose, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            rose.photo = upload("first.jpg")
+            rose.save()
+        first = Rose.objects.get()
+
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            rose = Rose.objects.get()
+            rose.photo = upload("second.jpg", color="blue")
+            rose.save()
+
+        assert Rose.objects.get().variants is None
+        assert Rose.objects.get().blurhash == ""
+        for callback in callbacks:
+            callback()
+        second = Rose.objects.get()
+        assert second.variants != first.variants
+        assert second.blurhash != first.blurhash
+
+    def test_unchanged_photo(self, rose, submitted, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            rose = Rose.objects.get()
+            rose.title = "renamed"
+            rose.save()
+            Rose.objects.only("id", "title").get().save()
+
+        assert submitted == []
+
+    def test_placeholder(self, rose, submitted, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            Rose.objects.create(
+                title="plain", title_eng="plain", group=rose.group, breeder=rose.breeder
+            )
+
+        assert submitted == []
+
+    def test_stale_job(self, media, rose, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            rose.photo = upload("first.jpg")
+            rose.save()
+        rose.photo = upload("second.jpg", color="blue")
+        rose.save()
+
+        # the job of the first upload finishes after the second was saved
+        for callback in callbacks:
+            callback()
+
+        assert Rose.objects.get().variants is None
+
+    def test_backfill_command(self, media, rose, rose_photo, breeder, group):
+        rose.photo = upload()
+        rose.save()
+        Rose.objects.create(
+            title="plain", title_eng="plain", group=group, breeder=breeder
+        )
+        RosePhoto.objects.filter(pk=rose_photo.pk).update(photo="images/missing.jpg")
+        out, err = StringIO(), StringIO()
+
+        call_command("build_image_variants", stdout=out, stderr=err)
+
+        assert "Rendered variants of 1 photos" in out.getvalue()
+        assert "roses.RosePhoto" in err.getvalue()
+        assert set(Rose.objects.get(pk=rose.pk).variants) == set(images.VARIANTS)
+        assert Rose.objects.get(title="plain").variants is None
+
+    def test_blurhash_backfill_command(self, media, rose, rose_photo):
+        rose.photo = upload()
+        rose.save()
+        RosePhoto.objects.filter(pk=rose_photo.pk).update(photo="images/missing.jpg")
+        out, err = StringIO(), StringIO()
+
+        call_command("build_blurhashes", stdout=out, stderr=err)
+
+        assert "Computed 1 BlurHashes" in out.getvalue()
+        assert "roses.RosePhoto" in err.getvalue()
+        rose = Rose.objects.get(pk=rose.pk)
+        assert len(rose.blurhash) == 28
+        assert rose.variants is None
@@ -0,0 +1,226 @@
+import json
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from roses.importer import RoseImporter, read_rows
+from roses.models import Rose, Group, Breeder, Pest, Pesticide, RosePesticide
+
+CSV = """title,title_eng,group.name,breeder.name,const_width,landing_date,pesticides
+Alpha,Alpha eng,Climber,Austin,12.50,2024-05-01,Fungex
+Beta,Beta eng,Climber,Kordes,,,Fungex;Aphidex
+"""
+
+
+def run_import(body, format, **kwargs):
+    if isinstance(body, str):
+        body = body.encode()
+    return RoseImporter(**kwargs).run(read_rows(BytesIO(body), format))
+
+
+def ndjson(*rows):
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def rose_row(title, **extra):
+    return {
+        "title": title,
+        "title_eng": f"{title} eng",
+        "group": "Climber",
+        "breeder": "Austin",
+        **extra,
+    }
+
+
+@pytest.mark.django_db
+class TestRoseImporter:
+
+    def test_csv(self):
+        result = run_import(CSV, "csv")
+
+        assert result["errors"] == []
+        assert (result["created"], result["updated"]) == (2, 0)
+        assert result["references"] == {
+            "roses.Group": 1,
+            "roses.Breeder": 2,
+            "roses.Pesticide": 2,
+        }
+
+        alpha = Rose.objects.get(title="Alpha")
+        assert alpha.slug == "alpha"
+        assert str(alpha.const_width) == "12.50"
+        assert alpha.group.slug == "climber"
+        assert Group.objects.get(name="Climber").rose_count == 2
+        assert set(
+            RosePesticide.objects.filter(rose__title="Beta").values_list(
+                "pesticide__name", flat=True
+            )
+        ) == {"Fungex", "Aphidex"}
+
+    def test_upsert_by_title(self, rose):
+        result = run_import(
+            ndjson(rose_row(rose.title, title_eng=rose.title_eng, description="new")),
+            "ndjson",
+        )
+
+        assert (result["created"], result["updated"]) == (0, 1)
+        rose.refresh_from_db()
+        assert rose.description == "new"
+        assert rose.group.name == "Climber"
+        assert Rose.objects.count() == 1
+
+    def test_bad_rows_do_not_abort_the_batch(self, rose):
+        body = ndjson(
+            rose_row("ok 1"),
+            rose_row("bad decimal", const_width="wide"),
+            rose_row("ok 1"),
+            rose_row("taken", title_eng=rose.title_eng),
+        )
+        body += "{not json\n" + ndjson(rose_row("ok 2"))
+
+        result = run_import(body, "ndjson")
+
+        errors = {error["row"]: error["errors"] for error in result["errors"]}
+        assert set(errors) == {2, 3, 4, 5}
+        assert "const_width" in errors[2]
+        assert "title" in errors[3]
+        assert "title_eng" in errors[4]
+        assert "non_field_errors" in errors[5]
+        assert result["created"] == 2
+        assert set(Rose.objects.values_list("title", flat=True)) == {
+            rose.title,
+            "ok 1",
+            "ok 2",
+        }
+
+    def test_no_create(self, group, breeder):
+        body = ndjson(
+            rose_row("known", group=group.name, breeder=breeder.name),
+            rose_row("unknown"),
+        )
+
+        result = run_import(body, "ndjson", create_missing=False)
+
+        assert result["created"] == 1
+        assert result["errors"][0]["row"] == 2
+        assert set(result["errors"][0]["errors"]) == {"group", "breeder"}
+        assert not Group.objects.filter(name="Climber").exists()
+
+    def test_export_round_trip(
+        self, authenticated_client, rose_with_relations, rose_pesticide
+    ):
+        response = authenticated_client.get(
+            reverse("rose-export"), {"include": "pesticides"}
+        )
+        body = b"".join(response.streaming_content)
+        RosePesticide.objects.all().delete()
+        Pest.objects.filter(pesticides__isnull=False).first().pesticides.clear()
+
+        result = run_import(body, "ndjson")
+
+        assert (result["created"], result["updated"], result["errors"]) == (0, 1, [])
+        link = RosePesticide.objects.get()
+        assert link.pesticide_id == rose_pesticide.pesticide_id
+        assert link.date_added == rose_pesticide.date_added
+        assert link.pesticide.pests.count() == 1
+
+    def test_queries_per_batch(self):
+        def queries_for(count):
+            # fresh references in each run, and few enough rows for one sqlite
+            # insert statement (999 variables)
+            body = ndjson(
+                *(
+                    rose_row(
+                        f"rose {count} {i}",
+                        group=f"group {count}",
+                        breeder=f"breeder {count}",
+                        pesticides=[f"product {count} {i % 3}"],
+                    )
+                    for i in range(count)
+                )
+            )
+            with CaptureQueriesContext(connection) as queries:
+                run_import(body, "ndjson", batch_size=1000)
+            return len(queries)
+
+        assert queries_for(5) == queries_for(60)
+
+
+@pytest.mark.django_db
+class TestRoseImportView:
+
+    def test_upload(self, authenticated_client):
+        upload = SimpleUploadedFile("roses.csv", CSV.encode(), "text/csv")
+
+        response = authenticated_client.post(
+            reverse("rose-import"), {"file": upload}, format="multipart"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["created"] == 2
+        assert Breeder.objects.filter(name="Kordes").exists()
+
+    def test_latin1_upload(self, authenticated_client):
+        body = CSV + "Rosé,Rosé eng,Climber,Austin\n"
+        upload = SimpleUploadedFile("roses.csv", body.encode("latin-1"), "text/csv")
+
+        response = authenticated_client.post(
+            reverse("rose-import"), {"file": upload}, format="multipart"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["created"] == 2
+        assert response.data["errors"] == [
+            {
+                "row": 3,
+                "errors": {"non_field_errors": ["Invalid CSV: not UTF-8 encoded"]},
+            }
+        ]
+
+    def test_format_field(self, authenticated_client):
+        upload = SimpleUploadedFile("roses.txt", ndjson(rose_row("txt")).encode())
+
+        response = authenticated_client.post(
+            reverse("rose-import"),
+            {"file": upload, "format": "ndjson"},
+            format="multipart",
+        )
+
+        assert response.data["created"] == 1
+
+    @pytest.mark.parametrize(
+        "data,key",
+        [
+            ({}, "file"),
+            ({"file": SimpleUploadedFile("roses.txt", b"x")}, "format"),
+        ],
+    )
+    def test_bad_request(self, authenticated_client, data, key):
+        response = authenticated_client.post(
+            reverse("rose-import"), data, format="multipart"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert key in response.data
+
+    def test_unauthenticated(self, api_client):
+        response = api_client.post(reverse("rose-import"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_import_command(tmp_path):
+    path = tmp_path / "roses.csv"
+    path.write_text(CSV)
+    out = StringIO()
+
+    call_command("import_roses", str(path), stdout=out, stderr=StringIO())
+
+    assert "Imported 2 new and 0 updated roses" in out.getvalue()
+    assert Pesticide.objects.filter(name="Aphidex").exists()
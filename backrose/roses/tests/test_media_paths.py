@@ -1,3 +1,4 @@
+import hashlib
 import os
 import pytest
 from django.conf import settings
@@ -7,6 +8,15 @@ from common.utils import get_filename
 pytestmark = pytest.mark.django_db
 
 
+def blob_dir(field_file):
+    """where the content-addressed storage keeps the file's content"""
+
+    field_file.open("rb")
+    digest = hashlib.sha256(field_file.read()).hexdigest()
+    field_file.close()
+    return os.path.join("blobs", digest[:2], digest[2:4])
+
+
 class TestRoseThumbnailPaths:
     def test_get_filename_for_rose(self, rose, fancy_image):
         filename = get_filename(rose, "test_rose.jpg")
@@ -17,9 +27,8 @@ class TestRoseThumbnailPaths:
 
         assert filename == expected_path
 
-        assert os.path.dirname(rose.photo.name) == os.path.join(
-            "images", rose.title_eng, "thumbnails"
-        )
+        # get_filename only names the upload, it is stored by content
+        assert os.path.dirname(rose.photo.name) == blob_dir(rose.photo)
 
     def test_media_directory_structure(self, rose, rose_photo):
         rose_media_dir = os.path.dirname(rose.photo.path)
@@ -28,11 +37,11 @@ class TestRoseThumbnailPaths:
         assert os.path.exists(rose_media_dir)
         assert os.path.exists(photo_media_dir)
 
-        expected_rose_dir = os.path.join(
-            settings.MEDIA_ROOT, "images", rose.title_eng, "thumbnails"
-        )
+        expected_rose_dir = os.path.join(settings.MEDIA_ROOT, blob_dir(rose.photo))
 
-        expected_photo_dir = os.path.join(settings.MEDIA_ROOT, "images", rose.title_eng)
+        expected_photo_dir = os.path.join(
+            settings.MEDIA_ROOT, blob_dir(rose_photo.photo)
+        )
 
         assert rose_media_dir == expected_rose_dir
         assert photo_media_dir == expected_photo_dir
@@ -94,9 +103,7 @@ class TestRosePhotoPaths:
         )
 
         assert filename == expected_path
-        assert os.path.dirname(rose_photo.photo.name) == os.path.join(
-            "images", rose.title_eng
-        )
+        assert os.path.dirname(rose_photo.photo.name) == blob_dir(rose_photo.photo)
 
         assert "thumbnails" not in rose_photo.photo.name
 
@@ -113,11 +120,9 @@ class TestRosePhotoPaths:
         photo1_dir = os.path.dirname(photo1.photo.name)
         photo2_dir = os.path.dirname(photo2.photo.name)
 
+        # the same content under two names is one file
         assert photo1_dir == photo2_dir
-        assert photo1_dir == os.path.join("images", rose.title_eng)
-
-        assert rose.title_eng in photo1.photo.name
-        assert rose.title_eng in photo2.photo.name
+        assert photo1.photo.name == photo2.photo.name
 
         photo1.delete()
         photo2.delete()
@@ -134,12 +139,10 @@ class TestRosePhotoPaths:
 
         assert os.path.dirname(photo1.photo.path) == os.path.dirname(photo2.photo.path)
 
-        expected_dir = os.path.join(settings.MEDIA_ROOT, "images", rose.title_eng)
+        expected_dir = os.path.join(settings.MEDIA_ROOT, blob_dir(photo1.photo))
 
         assert os.path.dirname(photo1.photo.path) == expected_dir
-
-        assert rose.title_eng in photo1.photo.name
-        assert rose.title_eng in photo2.photo.name
+        assert photo1.photo.name == photo2.photo.name
 
         photo1.delete()
         photo2.delete()
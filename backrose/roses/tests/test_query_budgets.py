@@ -0,0 +1,489 @@
+"""
+query budget regression suite.
+
+every route of roses/urls.py and userprofile/urls.py is exercised against a
+seeded catalogue; the number of queries a request runs must stay within the
+budget checked in at query_budgets.json, whatever the catalogue size. query
+counts that grow with the data are N+1 regressions, but for the routes of
+PER_CHUNK, which read the catalogue in chunks by design: their budget is what
+they run on top of one query per chunk.
+
+    QUERY_BUDGET_SIZES=10,1000,50000   catalogue sizes to run (default: 10)
+    QUERY_BUDGET_UPDATE=1              rewrite the baseline from this run
+    QUERY_BUDGET_REPORT=path.json      dump query counts and SQL time per size
+"""
+
+import json
+import os
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from PIL import Image
+from rest_framework import status
+
+import roses.urls
+import userprofile.urls
+from roses import export
+from roses.models import (
+    Rose,
+    Group,
+    Breeder,
+    Size,
+    Feeding,
+    RosePhoto,
+    Video,
+    Foliage,
+    Pest,
+    Pesticide,
+    Fungus,
+    Fungicide,
+    RosePesticide,
+    RoseFungicide,
+    Tombstone,
+)
+from roses.seeding import CatalogueSeeder
+
+BASELINE_PATH = Path(__file__).with_name("query_budgets.json")
+
+SIZES = [int(size) for size in os.getenv("QUERY_BUDGET_SIZES", "10").split(",") if size]
+
+UPDATE = os.getenv("QUERY_BUDGET_UPDATE") == "1"
+
+REPORT_PATH = os.getenv("QUERY_BUDGET_REPORT")
+
+# routes that read every rose in keyset chunks of this many
+PER_CHUNK = {"GET rose-export": export.CHUNK_SIZE}
+
+NESTED = [
+    "sizes",
+    "feedings",
+    "foliages",
+    "photos",
+    "videos",
+    "pesticides",
+    "fungicides",
+]
+
+
+def image_upload(name="budget.jpg"):
+    img_io = BytesIO()
+    Image.new("RGB", (1, 1), color="white").save(img_io, format="JPEG")
+    return SimpleUploadedFile(name, img_io.getvalue(), content_type="image/jpeg")
+
+
+def import_upload(catalogue):
+    body = (
+        "title,title_eng,group,breeder,pesticides\n"
+        f"{catalogue['rose'].title},{catalogue['rose'].title_eng},"
+        f"{catalogue['group'].name},budget breeder,budget product\n"
+        "budget import,budget import,budget group,budget breeder,budget product\n"
+    )
+    return SimpleUploadedFile("budget.csv", body.encode(), content_type="text/csv")
+
+
+def nested_payload(name, catalogue):
+    return {
+        "sizes": {"height": "10.00", "width": "5.00", "date_added": "2024-05-01"},
+        "feedings": {"basal": "basal", "leaf": "leaf"},
+        "foliages": {"foliage": "foliage"},
+        "photos": {"photo": image_upload(), "rose": catalogue["rose"].id},
+        "videos": {"video": "https://example.com/video", "rose": catalogue["rose"].id},
+        "pesticides": {"pesticide_id": catalogue["spare_pesticide"].id},
+        "fungicides": {"fungicide_id": catalogue["spare_fungicide"].id},
+    }[name]
+
+
+def batch_payload(name, catalogue):
+    """one batch item, photos can't be uploaded in a json batch"""
+
+    if name == "photos":
+        return {"descr": "budget photo"}
+    return nested_payload(name, catalogue)
+
+
+def nested_scenarios():
+    """
+    list/create/retrieve/update and the batch writes for every collection
+    nested under a rose
+    """
+
+    for name in NESTED:
+        route = f"rose-{name}"
+        yield (
+            "GET",
+            f"{route}-list",
+            lambda c: {"rose_pk": c["rose"].id},
+            None,
+            status.HTTP_200_OK,
+        )
+        yield (
+            "POST",
+            f"{route}-list",
+            lambda c: {"rose_pk": c["rose"].id},
+            lambda c, name=name: nested_payload(name, c),
+            status.HTTP_201_CREATED,
+        )
+        yield (
+            "GET",
+            f"{route}-detail",
+            lambda c, name=name: {"rose_pk": c["rose"].id, "pk": c[name].id},
+            None,
+            status.HTTP_200_OK,
+        )
+        yield (
+            "PATCH",
+            f"{route}-detail",
+            lambda c, name=name: {"rose_pk": c["rose"].id, "pk": c[name].id},
+            lambda c, name=name: nested_payload(name, c),
+            status.HTTP_200_OK,
+        )
+        yield (
+            "POST",
+            f"{route}-batch",
+            lambda c: {"rose_pk": c["rose"].id},
+            lambda c, name=name: (
+                # a multipart batch, one item per file
+                {"photo": image_upload()}
+                if name == "photos"
+                else [batch_payload(name, c)]
+            ),
+            status.HTTP_201_CREATED,
+        )
+        yield (
+            "PATCH",
+            f"{route}-batch",
+            lambda c: {"rose_pk": c["rose"].id},
+            lambda c, name=name: [{**batch_payload(name, c), "id": c[name].id}],
+            status.HTTP_200_OK,
+        )
+        yield (
+            "DELETE",
+            f"{route}-batch",
+            lambda c: {"rose_pk": c["rose"].id},
+            lambda c, name=name: [c[name].id],
+            status.HTTP_200_OK,
+        )
+
+
+def reference_scenarios():
+    """flat reference viewsets"""
+
+    for route, key in [
+        ("group", "group"),
+        ("breeder", "breeder"),
+        ("pest", "pest"),
+        ("fungus", "fungus"),
+        ("pesticide", "pesticide"),
+        ("fungicide", "fungicide"),
+    ]:
+        yield ("GET", f"{route}-list", lambda c: {}, None, status.HTTP_200_OK)
+        yield (
+            "GET",
+            f"{route}-detail",
+            lambda c, key=key: {"pk": c[key].id},
+            None,
+            status.HTTP_200_OK,
+        )
+        yield (
+            "POST",
+            f"{route}-list",
+            lambda c: {},
+            lambda c, route=route: {"name": f"budget {route}"},
+            status.HTTP_201_CREATED,
+        )
+
+
+def with_photo(rose):
+    """the rose with an uploaded photo, for the route that deletes it"""
+
+    rose.photo = image_upload()
+    rose.save()
+    return rose
+
+
+# (method, url name, url kwargs builder, payload builder, status of a success):
+# a scenario must take its success path, a budget measured on an error is moot
+SCENARIOS = [
+    ("GET", "api-root", lambda c: {}, None, status.HTTP_200_OK),
+    ("GET", "rose-list", lambda c: {}, None, status.HTTP_200_OK),
+    (
+        "POST",
+        "rose-list",
+        lambda c: {},
+        lambda c: {
+            "title": "budget rose",
+            "title_eng": "budget rose",
+            "breeder": c["breeder"].id,
+            "group": c["group"].id,
+            "photo": image_upload(),
+        },
+        status.HTTP_201_CREATED,
+    ),
+    ("GET", "rose-detail", lambda c: {"pk": c["rose"].id}, None, status.HTTP_200_OK),
+    (
+        "PATCH",
+        "rose-detail",
+        lambda c: {"pk": c["rose"].id},
+        lambda c: {"description": "budget description"},
+        status.HTTP_200_OK,
+    ),
+    (
+        "DELETE",
+        "rose-photo",
+        lambda c: {"pk": with_photo(c["rose"]).id},
+        None,
+        status.HTTP_200_OK,
+    ),
+    # one query per source, then the prefetches of the treatments on the page
+    ("GET", "rose-timeline", lambda c: {"pk": c["rose"].id}, None, status.HTTP_200_OK),
+    ("GET", "rose-growth", lambda c: {"pk": c["rose"].id}, None, status.HTTP_200_OK),
+    ("GET", "group-growth", lambda c: {"pk": c["group"].id}, None, status.HTTP_200_OK),
+    # one query per export chunk, see PER_CHUNK
+    ("GET", "rose-export", lambda c: {}, None, status.HTTP_200_OK),
+    # one batch, so constant in the number of rows
+    (
+        "POST",
+        "rose-import",
+        lambda c: {},
+        lambda c: {"file": import_upload(c)},
+        status.HTTP_200_OK,
+    ),
+    ("GET", "adjustments-list", lambda c: {}, None, status.HTTP_200_OK),
+    ("GET", "sync-list", lambda c: {}, None, status.HTTP_200_OK),
+    # what the spa asks for when a rose is opened
+    (
+        "POST",
+        "batch",
+        lambda c: {},
+        lambda c: [
+            {"path": f"/api/roses/{c['rose'].id}/"},
+            {"path": "/api/adjustments/"},
+            {"path": "/api/auth/user/"},
+        ],
+        status.HTTP_200_OK,
+    ),
+    *reference_scenarios(),
+    *nested_scenarios(),
+    ("POST", "token_obtain_pair", lambda c: {}, None, status.HTTP_200_OK),
+    # both read the refresh cookie of the authenticated client
+    ("POST", "token_refresh", lambda c: {}, None, status.HTTP_200_OK),
+    ("POST", "logout", lambda c: {}, None, status.HTTP_200_OK),
+    ("GET", "user", lambda c: {}, None, status.HTTP_200_OK),
+    (
+        "PATCH",
+        "user",
+        lambda c: {},
+        lambda c: {"app_header": "budget header"},
+        status.HTTP_200_OK,
+    ),
+    (
+        "POST",
+        "register",
+        lambda c: {},
+        lambda c: {
+            "email": "budget@example.com",
+            "username": "budget",
+            "password": "budgetfancypassword123",
+            "password2": "budgetfancypassword123",
+        },
+        status.HTTP_201_CREATED,
+    ),
+]
+
+
+def scenario_key(scenario):
+    method, name, *_ = scenario
+    return f"{method} {name}"
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+def chunk_queries(key):
+    """
+    the queries ``key`` runs for its chunks of the catalogue as it is now;
+    the reads stop at the first short chunk, so a full last one costs one more
+    """
+
+    chunk_size = PER_CHUNK.get(key)
+    if chunk_size is None:
+        return 0
+    return Rose.objects.count() // chunk_size + 1
+
+
+def load_baseline():
+    with open(BASELINE_PATH, encoding="utf-8") as baseline:
+        return json.load(baseline)
+
+
+def seed_catalogue(size):
+    """size roses with exactly one child row of every kind each"""
+
+    CatalogueSeeder(
+        roses=size,
+        groups=max(1, size // 100),
+        breeders=max(1, size // 100),
+        pests=10,
+        fungi=10,
+        pesticides=6,
+        fungicides=6,
+        per_rose={name: 1 for name in NESTED},
+        distribution="fixed",
+        popularity="uniform",
+        prefix="budget",
+    ).run()
+
+    rose = Rose.objects.order_by("id").first()
+    return {
+        "rose": rose,
+        "group": Group.objects.first(),
+        "breeder": Breeder.objects.first(),
+        "pest": Pest.objects.first(),
+        "fungus": Fungus.objects.first(),
+        "pesticide": Pesticide.objects.first(),
+        "fungicide": Fungicide.objects.first(),
+        "spare_pesticide": Pesticide.objects.exclude(roses=rose).first(),
+        "spare_fungicide": Fungicide.objects.exclude(roses=rose).first(),
+        "sizes": rose.sizes.first(),
+        "feedings": rose.feedings.first(),
+        "foliages": rose.foliages.first(),
+        "photos": rose.rosephotos.first(),
+        "videos": rose.videos.first(),
+        "pesticides": rose.rosepesticides.first(),
+        "fungicides": rose.rosefungicides.first(),
+    }
+
+
+def clear_catalogue():
+    for model in [
+        Size,
+        Feeding,
+        Foliage,
+        RosePhoto,
+        Video,
+        RosePesticide,
+        RoseFungicide,
+        Rose,
+        Pesticide,
+        Fungicide,
+        Pest,
+        Fungus,
+        Group,
+        Breeder,
+        Tombstone,
+    ]:
+        model.objects.all().delete()
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}_roses")
+def catalogue(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        catalogue = seed_catalogue(request.param)
+        catalogue["size"] = request.param
+
+    yield catalogue
+
+    with django_db_blocker.unblock():
+        clear_catalogue()
+
+
+@pytest.fixture(scope="module")
+def measurements():
+    measured = {}
+
+    yield measured
+
+    if REPORT_PATH:
+        with open(REPORT_PATH, "w", encoding="utf-8") as report:
+            json.dump(measured, report, indent=2, sort_keys=True)
+
+    if UPDATE:
+        budgets = load_baseline()
+        for key, sizes in measured.items():
+            budgets[key] = max(
+                result["queries"] - result["chunk_queries"] for result in sizes.values()
+            )
+        with open(BASELINE_PATH, "w", encoding="utf-8") as baseline:
+            json.dump(budgets, baseline, indent=2, sort_keys=True)
+            baseline.write("\n")
+
+
+def test_every_route_has_a_scenario():
+    names = set(route_names(roses.urls.urlpatterns))
+    names |= set(route_names(userprofile.urls.urlpatterns))
+
+    covered = {name for _, name, *_ in SCENARIOS}
+    assert names - covered == set()
+
+
+def test_every_scenario_has_a_budget():
+    keys = {scenario_key(scenario) for scenario in SCENARIOS}
+    assert keys - set(load_baseline()) == set() or UPDATE
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=scenario_key)
+def test_query_budget(
+    scenario,
+    catalogue,
+    measurements,
+    api_client,
+    authenticated_client,
+    user_data,
+    record_property,
+):
+    method, name, build_kwargs, build_payload, expected = scenario
+    key = scenario_key(scenario)
+
+    client = authenticated_client
+    payload = build_payload(catalogue) if build_payload else None
+    if name == "token_obtain_pair":
+        payload = {"email": user_data["email"], "password": user_data["password"]}
+    if name in ("token_obtain_pair", "register"):
+        client = api_client
+
+    url = reverse(name, kwargs=build_kwargs(catalogue))
+    has_files = isinstance(payload, dict) and any(
+        isinstance(value, SimpleUploadedFile) for value in payload.values()
+    )
+    request_format = "multipart" if has_files else "json"
+    send = getattr(client, method.lower())
+    chunked = chunk_queries(key)
+
+    with CaptureQueriesContext(connection) as captured:
+        response = send(url, payload, format=request_format)
+        if response.streaming:
+            b"".join(response.streaming_content)
+
+    assert response.status_code == expected, response.content
+
+    queries = len(captured)
+    sql_time = sum(float(query["time"]) for query in captured.captured_queries)
+    record_property("sql_queries", queries)
+    record_property("sql_time", sql_time)
+    measurements.setdefault(key, {})[catalogue["size"]] = {
+        "queries": queries,
+        "chunk_queries": chunked,
+        "sql_time": round(sql_time, 6),
+    }
+
+    if UPDATE:
+        return
+
+    budget = load_baseline().get(key)
+    assert budget is not None, f"no query budget for {key}"
+    assert queries <= budget + chunked, (
+        f"{key} ran {queries} queries with {catalogue['size']} roses, "
+        f"budget is {budget} + {chunked} chunks:\n"
+        + "\n".join(query["sql"] for query in captured.captured_queries)
+    )
@@ -0,0 +1,96 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot per-rose queries: each has to be a
+range scan of its (rose_id, date) index, without a temp b-tree sort.
+"""
+
+from datetime import date
+
+import pytest
+from django.db import connection
+
+from roses.models import Feeding, Foliage, RoseFungicide, RosePesticide, Size
+from roses.timeline import SOURCES, Timeline
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != "sqlite", reason="sqlite EXPLAIN QUERY PLAN output"
+    ),
+]
+
+INDEXES = {
+    "size": "size_rose_date_idx",
+    "basal_feeding": "feeding_rose_basal_idx",
+    "leaf_feeding": "feeding_rose_leaf_idx",
+    "foliage": "foliage_rose_time_idx",
+    "pesticide": "rosepesticide_rose_date_idx",
+    "fungicide": "rosefungicide_rose_date_idx",
+}
+
+CURSOR = (date(2024, 5, 1), "foliage", 10)
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def assert_index_scan(queryset, index):
+    plan = explain(queryset)
+    assert f"USING INDEX {index}" in plan[0], plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+@pytest.mark.parametrize("cursor", [None, CURSOR], ids=["first", "cursor"])
+@pytest.mark.parametrize("descending", [True, False], ids=["desc", "asc"])
+@pytest.mark.parametrize("source", SOURCES, ids=[source[0] for source in SOURCES])
+def test_timeline_sources(source, descending, cursor):
+    type, model, field, _ = source
+    queryset = Timeline(1, descending).source_queryset(type, model, field, cursor)
+
+    assert_index_scan(queryset[:21], INDEXES[type])
+
+
+@pytest.mark.parametrize(
+    "queryset,index",
+    [
+        (
+            Feeding.objects.filter(rose_id=1).order_by("-basal_time")[:1],
+            "feeding_rose_basal_idx",
+        ),
+        (
+            Feeding.objects.filter(rose_id=1).order_by("-leaf_time")[:1],
+            "feeding_rose_leaf_idx",
+        ),
+        (
+            Size.objects.filter(
+                rose_id=1, date_added__range=(date(2024, 1, 1), date(2024, 12, 31))
+            ).order_by("date_added"),
+            "size_rose_date_idx",
+        ),
+        (
+            Foliage.objects.filter(rose_id=1).order_by("-foliage_time")[:1],
+            "foliage_rose_time_idx",
+        ),
+        (
+            RosePesticide.objects.filter(rose_id=1).order_by("-date_added")[:1],
+            "rosepesticide_rose_date_idx",
+        ),
+        (
+            RoseFungicide.objects.filter(rose_id=1).order_by("-date_added")[:1],
+            "rosefungicide_rose_date_idx",
+        ),
+    ],
+    ids=[
+        "last basal feeding",
+        "last leaf feeding",
+        "sizes in a season",
+        "last foliage",
+        "last pesticide",
+        "last fungicide",
+    ],
+)
+def test_latest_and_ranges(queryset, index):
+    assert_index_scan(queryset, index)
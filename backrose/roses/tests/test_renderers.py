@@ -0,0 +1,91 @@
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from common.renderers import ORJSONParser, ORJSONRenderer
+from roses.serializers import RoseSerializer
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"height": Decimal("10.50"), "exponent": Decimal("1E+2")},
+        {
+            "date": datetime.date(2024, 5, 1),
+            "datetime": datetime.datetime(
+                2024, 5, 1, 10, 30, 15, 123456, tzinfo=datetime.timezone.utc
+            ),
+            "time": datetime.time(8, 15, 30, 500),
+            "delta": datetime.timedelta(days=1, seconds=5),
+        },
+        {"id": uuid.UUID(int=7), 1: "int key", "lazy": gettext_lazy("lazy")},
+        {"title": "Роза\u2028line\u2029break", "nested": [1, 2.5, None, True]},
+        [],
+    ],
+)
+def test_renders_like_json_renderer(data):
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_indent_falls_back():
+    context = {"indent": 4}
+    data = {"a": [1, 2]}
+
+    assert ORJSONRenderer().render(data, renderer_context=context) == (
+        JSONRenderer().render(data, renderer_context=context)
+    )
+
+
+@pytest.mark.django_db
+def test_rose_detail_is_identical(rose_with_relations, rose_pesticide):
+    data = RoseSerializer(rose_with_relations).data
+
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_parser():
+    body = '{"title": "Роза", "height": 10.5, "tags": [1, null]}'.encode()
+
+    parsed = ORJSONParser().parse(BytesIO(body))
+
+    assert parsed == JSONParser().parse(BytesIO(body))
+
+
+@pytest.mark.parametrize("body", [b"{", b'{"a": NaN}'])
+def test_parser_errors(body):
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(BytesIO(body))
+
+
+@pytest.mark.django_db
+def test_api_round_trip(authenticated_client, rose):
+    url = reverse("rose-sizes-list", kwargs={"rose_pk": rose.id})
+
+    response = authenticated_client.post(
+        url,
+        b'{"height": "10.50", "width": 5, "date_added": "2024-05-01"}',
+        content_type="application/json",
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response["Content-Type"] == "application/json"
+    assert response.content.startswith(b'{"id":')
+    assert response.json()["height"] == "10.50"
+
+
+@pytest.mark.django_db
+def test_api_invalid_json(authenticated_client, rose):
+    url = reverse("rose-sizes-list", kwargs={"rose_pk": rose.id})
+
+    response = authenticated_client.post(url, b"{", content_type="application/json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,125 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+
+from roses import search
+from roses.models import Rose, Breeder
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def catalogue(breeder, group):
+    austin = Breeder.objects.create(name="David Austin")
+    return [
+        Rose.objects.create(
+            title="Абрахам Дерби",
+            title_eng="Abraham Darby",
+            breeder=austin,
+            group=group,
+        ),
+        Rose.objects.create(
+            title="Дерби Шарлотта",
+            title_eng="Charlotte",
+            breeder=breeder,
+            group=group,
+        ),
+        Rose.objects.create(
+            title="Глория Дей",
+            title_eng="Gloria Dei",
+            breeder=breeder,
+            group=group,
+        ),
+        Rose.objects.create(
+            title="Память Остина",
+            title_eng="Austin Memory",
+            breeder=breeder,
+            group=group,
+        ),
+    ]
+
+
+def search_titles(client, value, **params):
+    response = client.get(reverse("rose-list"), {"search": value, **params})
+    assert response.status_code == status.HTTP_200_OK
+    return [item["title"] for item in response.data["results"]]
+
+
+def index_rows():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, title, title_eng, breeder FROM {search.FTS_TABLE} ORDER BY rowid"
+        )
+        return cursor.fetchall()
+
+
+def test_build_match_query():
+    assert search.build_match_query("fan ro") == '"fan"* "ro"*'
+    assert search.build_match_query('ab"ra*ham') == '"ab"* "ra"* "ham"*'
+    assert search.build_match_query("  --  ") == ""
+
+
+class TestRoseSearch:
+
+    def test_prefix_matching(self, authenticated_client, catalogue):
+        assert search_titles(authenticated_client, "abr") == ["Абрахам Дерби"]
+        assert search_titles(authenticated_client, "глор") == ["Глория Дей"]
+
+    def test_all_terms_must_match(self, authenticated_client, catalogue):
+        assert search_titles(authenticated_client, "gloria abr") == []
+
+    def test_breeder_name(self, authenticated_client, catalogue):
+        assert search_titles(authenticated_client, "david aus") == ["Абрахам Дерби"]
+
+    def test_title_hits_rank_first(self, authenticated_client, catalogue):
+        titles = search_titles(authenticated_client, "austin")
+        assert titles == ["Память Остина", "Абрахам Дерби"]
+
+    def test_explicit_ordering_wins(self, authenticated_client, catalogue):
+        titles = search_titles(authenticated_client, "дерби", ordering="-title")
+        assert titles == ["Дерби Шарлотта", "Абрахам Дерби"]
+
+    def test_punctuation_only(self, authenticated_client, catalogue):
+        assert search_titles(authenticated_client, "***") == []
+
+
+class TestSearchIndexSync:
+
+    def test_rose_update_and_delete(self, rose):
+        rose.title = "renamed rose"
+        rose.save()
+        assert index_rows() == [
+            (rose.id, "renamed rose", rose.title_eng, rose.breeder.name)
+        ]
+
+        rose.delete()
+        assert index_rows() == []
+
+    def test_breeder_rename(self, rose, breeder):
+        breeder.name = "renamed breeder"
+        breeder.save()
+        assert index_rows()[0][3] == "renamed breeder"
+
+    def test_bulk_create(self, breeder, group):
+        Rose.objects.bulk_create(
+            Rose(
+                title=f"bulk {i}",
+                title_eng=f"bulk {i}",
+                slug=f"bulk-{i}",
+                breeder=breeder,
+                group=group,
+            )
+            for i in range(3)
+        )
+        assert len(index_rows()) == 3
+
+    def test_rebuild_command(self, catalogue, capsys):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.FTS_TABLE}")
+
+        call_command("rebuild_search_index")
+
+        assert "Indexed 4 roses" in capsys.readouterr().out
+        assert [row[0] for row in index_rows()] == [rose.id for rose in catalogue]
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+
+from roses.models import (
+    Rose,
+    Group,
+    Breeder,
+    Pest,
+    Fungus,
+    Pesticide,
+    Fungicide,
+    RosePesticide,
+    RoseFungicide,
+    RosePhoto,
+    Size,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def seed(**options):
+    call_command("seed_roses", stdout=open(os.devnull, "w"), **options)
+
+
+def clear():
+    Rose.objects.all().delete()
+    for model in (Pesticide, Fungicide, Pest, Fungus, Group, Breeder):
+        model.objects.all().delete()
+
+
+def snapshot():
+    return (
+        list(Rose.objects.order_by("id").values_list("title", "group__name")),
+        list(Size.objects.order_by("id").values_list("height", "date_added")),
+        list(
+            RosePesticide.objects.order_by("id").values_list(
+                "rose__title", "pesticide__name"
+            )
+        ),
+    )
+
+
+def test_seed_roses_counts(capsys):
+    call_command(
+        "seed_roses",
+        roses=120,
+        groups=3,
+        breeders=4,
+        batch_size=50,
+        distribution="fixed",
+        sizes_per_rose=2,
+        pesticides_per_rose=3,
+    )
+
+    assert Rose.objects.count() == 120
+    assert Size.objects.count() == 240
+    assert RosePesticide.objects.count() == 360
+    assert Rose.objects.values("group").distinct().count() == 3
+    assert "Seeded" in capsys.readouterr().out
+
+
+def test_seed_roses_is_reproducible():
+    seed(roses=30, seed=7)
+    first = snapshot()
+
+    clear()
+    seed(roses=30, seed=7)
+
+    assert snapshot() == first
+
+    clear()
+    seed(roses=30, seed=8)
+
+    assert snapshot() != first
+
+
+def test_treatments_respect_unique_together():
+    seed(roses=50, pesticides=3, fungicides=3, pesticides_per_rose=10)
+
+    for model in (RosePesticide, RoseFungicide):
+        duplicates = (
+            model.objects.values("rose", model._meta.unique_together[0][1])
+            .annotate(total=Count("id"))
+            .filter(total__gt=1)
+        )
+        assert not duplicates.exists()
+
+    assert RosePesticide.objects.count() > 50
+
+
+def test_prefix_in_use():
+    seed(roses=1)
+
+    with pytest.raises(CommandError):
+        seed(roses=1)
+
+
+def test_placeholder_images():
+    seed(roses=5, images=2, photos_per_rose=1, distribution="fixed", prefix="pics")
+
+    paths = set(RosePhoto.objects.values_list("photo", flat=True))
+    paths |= set(Rose.objects.values_list("photo", flat=True))
+    # two placeholders, stored by content
+    assert len(paths) <= 2
+    for path in paths:
+        assert path.startswith("blobs/")
+        assert os.path.exists(os.path.join(settings.MEDIA_ROOT, path))
@@ -0,0 +1,158 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image, JpegImagePlugin
+from rest_framework import serializers, status
+
+from common import images
+from common.uploads import ImageUploadField
+from roses.models import RosePhoto
+
+
+def upload(size=(1200, 800), format="JPEG", name="camera.jpg", **info):
+    buffer = BytesIO()
+    Image.new("RGB", size, "red").save(buffer, format=format, **info)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def forbid_decoding(monkeypatch):
+    def load(self):
+        raise AssertionError("the upload was decoded")
+
+    def forbid():
+        monkeypatch.setattr(Image.Image, "load", load)
+        monkeypatch.setattr("PIL.ImageFile.ImageFile.load", load)
+
+    return forbid
+
+
+class TestImageUploadField:
+
+    def test_reads_the_header_only(self, forbid_decoding):
+        file = upload()
+        forbid_decoding()
+
+        assert ImageUploadField().to_internal_value(file) is file
+        assert file.content_type == "image/jpeg"
+        assert file.tell() == 0
+
+    def test_too_many_bytes(self, settings):
+        settings.IMAGE_UPLOAD_MAX_BYTES = 100
+
+        with pytest.raises(serializers.ValidationError) as error:
+            ImageUploadField().to_internal_value(upload())
+
+        assert error.value.detail[0].code == "too_large"
+
+    def test_too_many_pixels(self, settings, forbid_decoding):
+        settings.IMAGE_UPLOAD_MAX_PIXELS = 1_000_000
+        # a few kilobytes that would decode to 24 megabytes
+        bomb = upload(size=(4000, 2000), format="PNG", name="bomb.png")
+        forbid_decoding()
+
+        with pytest.raises(serializers.ValidationError) as error:
+            ImageUploadField().to_internal_value(bomb)
+
+        assert error.value.detail[0].code == "too_many_pixels"
+
+    def test_pillow_bomb(self, settings, monkeypatch):
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100_000)
+
+        with pytest.raises(serializers.ValidationError) as error:
+            ImageUploadField().to_internal_value(upload())
+
+        assert error.value.detail[0].code == "too_many_pixels"
+
+    @pytest.mark.parametrize(
+        "file, code",
+        [
+            (upload(format="BMP", name="old.bmp"), "unsupported"),
+            (SimpleUploadedFile("fake.jpg", b"not an image"), "invalid_image"),
+            (SimpleUploadedFile("empty.jpg", b""), "empty"),
+        ],
+    )
+    def test_rejected(self, file, code):
+        with pytest.raises(serializers.ValidationError) as error:
+            ImageUploadField().to_internal_value(file)
+
+        assert error.value.detail[0].code == code
+
+    def test_downscale(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees clockwise
+        file = upload(size=(4000, 3000), name="camera.png", exif=exif)
+
+        scaled = ImageUploadField(max_edge=1024).to_internal_value(file)
+
+        assert scaled.name == "camera.jpg"
+        with Image.open(scaled) as image:
+            assert image.format == "JPEG"
+            assert image.size == (768, 1024)
+
+    def test_small_image_kept(self):
+        file = upload(size=(600, 400))
+
+        assert ImageUploadField(max_edge=1024).to_internal_value(file) is file
+
+    def test_draft_decoding(self, monkeypatch):
+        decoded = []
+        draft = JpegImagePlugin.JpegImageFile.draft
+
+        def record(image, mode, size):
+            result = draft(image, mode, size)
+            decoded.append(image.size)
+            return result
+
+        monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", record)
+
+        images.downscale(upload(size=(4096, 3072)), 256)
+
+        # decoded at an eighth of its size
+        assert decoded == [(512, 384)]
+
+
+@pytest.mark.django_db
+class TestRosePhotoUpload:
+
+    def test_accepted(self, media, authenticated_client, rose):
+        url = reverse("rose-photos-list", kwargs={"rose_pk": rose.id})
+
+        response = authenticated_client.post(
+            url, {"photo": upload(), "rose": rose.id}, format="multipart"
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert RosePhoto.objects.get().photo.size == upload().size
+
+    def test_too_many_pixels(self, media, settings, authenticated_client, rose):
+        settings.IMAGE_UPLOAD_MAX_PIXELS = 500_000
+        url = reverse("rose-photos-list", kwargs={"rose_pk": rose.id})
+
+        response = authenticated_client.post(
+            url, {"photo": upload(), "rose": rose.id}, format="multipart"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["photo"] == ["Upload an image of at most 500000 pixels."]
+        assert not RosePhoto.objects.exists()
+
+    def test_rose_photo(self, media, settings, authenticated_client, rose):
+        settings.IMAGE_UPLOAD_MAX_BYTES = 100
+
+        response = authenticated_client.patch(
+            reverse("rose-detail", kwargs={"pk": rose.id}),
+            {"photo": upload()},
+            format="multipart",
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "photo" in response.data
@@ -1,7 +1,7 @@
 import pytest
 from django.urls import reverse
 from rest_framework import status
-from roses.models import Rose
+from roses.models import Rose, Group, Breeder, Pest, Pesticide
 
 
 @pytest.mark.django_db
@@ -59,3 +59,90 @@ class TestAdjustmentViewSet:
 
         assert test_group is not None
         assert test_group["rose_count"] >= 1
+
+
+@pytest.mark.django_db
+class TestAdjustmentsCache:
+
+    def test_etag_and_not_modified(
+        self, authenticated_client, pesticide, fungicide, django_assert_num_queries
+    ):
+        url = reverse("adjustments-list")
+        response = authenticated_client.get(url)
+        etag = response["ETag"]
+
+        assert response.status_code == status.HTTP_200_OK
+        assert etag.startswith('"')
+
+        # only the user lookup of the authentication
+        with django_assert_num_queries(1):
+            response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+
+    def test_cached_payload(
+        self, authenticated_client, group, django_assert_num_queries
+    ):
+        url = reverse("adjustments-list")
+        first = authenticated_client.get(url)
+
+        with django_assert_num_queries(1):
+            second = authenticated_client.get(url)
+
+        assert second.data == first.data
+        assert second["ETag"] == first["ETag"]
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda: Pest.objects.create(name="new pest"),
+            lambda: Group.objects.create(name="new group"),
+            lambda: Breeder.objects.get().delete(),
+            lambda: Pesticide.objects.get().pests.clear(),
+            lambda: Rose.objects.create(
+                title="new rose",
+                title_eng="new rose",
+                group=Group.objects.get(),
+                breeder=Breeder.objects.get(),
+            ),
+        ],
+    )
+    def test_writes_invalidate(
+        self, authenticated_client, group, breeder, pesticide, change
+    ):
+        url = reverse("adjustments-list")
+        etag = authenticated_client.get(url)["ETag"]
+
+        change()
+
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    def test_rose_edit_keeps_the_bundle(self, authenticated_client, rose):
+        url = reverse("adjustments-list")
+        etag = authenticated_client.get(url)["ETag"]
+
+        rose.description = "edited"
+        rose.variants = {"grid": {}}
+        rose.save()
+
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    @pytest.mark.parametrize("delete", [False, True])
+    def test_rose_counts_invalidate(self, authenticated_client, rose, delete):
+        other = Group.objects.create(name="other group", slug="other-group")
+        url = reverse("adjustments-list")
+        etag = authenticated_client.get(url)["ETag"]
+
+        if delete:
+            rose.delete()
+        else:
+            rose.group = other
+            rose.save()
+
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
@@ -0,0 +1,153 @@
+import threading
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from common.batch import BatchView
+from userprofile.authenticate import CustomAuthentication
+
+pytestmark = pytest.mark.django_db
+
+
+def batch(client, *subs):
+    return client.post(reverse("batch"), list(subs), format="json")
+
+
+class TestBatchView:
+
+    def test_opening_a_rose(self, authenticated_client, rose, test_user):
+        response = batch(
+            authenticated_client,
+            {"path": f"/api/roses/{rose.id}/"},
+            {"path": "/api/adjustments/"},
+            {"path": "/api/auth/user/"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        rose_result, adjustments, user = response.json()
+        assert rose_result["status"] == 200
+        assert (
+            rose_result["body"]
+            == authenticated_client.get(
+                reverse("rose-detail", kwargs={"pk": rose.id})
+            ).json()
+        )
+        assert adjustments["body"]["groups"][0]["id"] == rose.group_id
+        assert "ETag" in adjustments["headers"]
+        assert user["body"]["email"] == test_user.email
+
+    def test_writes_run_in_order(self, authenticated_client, size):
+        sizes = f"/api/roses/{size.rose_id}/sizes/"
+
+        response = batch(
+            authenticated_client,
+            {
+                "method": "PATCH",
+                "path": f"{sizes}{size.id}/",
+                "body": {"height": "42.00"},
+            },
+            {"path": sizes},
+            {
+                "method": "POST",
+                "path": sizes,
+                "body": {"height": "1.00", "width": "1.00"},
+            },
+            {"path": sizes},
+        )
+
+        patch, before, post, after = response.json()
+        assert patch["status"] == 200
+        assert [item["height"] for item in before["body"]] == ["42.00"]
+        assert post["status"] == 201
+        assert len(after["body"]) == 2
+
+    def test_sub_request_errors(self, authenticated_client, rose):
+        response = batch(
+            authenticated_client,
+            {"method": "POST", "path": f"/api/roses/{rose.id}/sizes/", "body": {}},
+            {"path": f"/api/roses/{rose.id + 100}/"},
+            {"path": "/api/no-such-route/"},
+            {"path": "/api/batch/"},
+            {"path": "/api/roses/export/?format=csv"},
+        )
+
+        statuses = [result["status"] for result in response.json()]
+        assert statuses == [400, 404, 404, 400, 400]
+        assert "height" in response.json()[0]["body"]
+
+    def test_query_string_and_headers(
+        self, authenticated_client, create_multiple_roses
+    ):
+        etag = authenticated_client.get(reverse("adjustments-list"))["ETag"]
+
+        response = batch(
+            authenticated_client,
+            {"path": "/api/roses/?search=fancy_rose_2"},
+            {"path": "/api/adjustments/", "headers": {"If-None-Match": etag}},
+        )
+
+        roses, adjustments = response.json()
+        assert [rose["title"] for rose in roses["body"]["results"]] == ["fancy_rose_2"]
+        assert adjustments["status"] == 304
+        assert adjustments["body"] is None
+
+    def test_authenticates_once(self, authenticated_client, rose, monkeypatch):
+        calls = []
+        authenticate = CustomAuthentication.authenticate
+
+        def counting(self, request):
+            calls.append(request.path)
+            return authenticate(self, request)
+
+        monkeypatch.setattr(CustomAuthentication, "authenticate", counting)
+
+        batch(authenticated_client, *[{"path": f"/api/roses/{rose.id}/"}] * 3)
+
+        assert calls == ["/api/batch/"]
+
+    @pytest.mark.parametrize(
+        "subs",
+        [
+            [],
+            [{"path": "/media/x.jpg"}],
+            [{"method": "TRACE", "path": "/api/roses/"}],
+        ],
+    )
+    def test_bad_batch(self, authenticated_client, subs):
+        response = batch(authenticated_client, *subs)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_max_requests(self, authenticated_client, monkeypatch):
+        monkeypatch.setattr(BatchView, "max_requests", 2)
+
+        response = batch(authenticated_client, *[{"path": "/api/groups/"}] * 3)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_unauthenticated(self, api_client):
+        response = batch(api_client, {"path": "/api/roses/"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_run_concurrently(authenticated_client, rose, monkeypatch):
+    threads = set()
+    run = BatchView.run
+
+    def recording(self, request, sub, batch_response=None):
+        threads.add(threading.get_ident())
+        return run(self, request, sub, batch_response)
+
+    monkeypatch.setattr(BatchView, "run", recording)
+
+    response = batch(
+        authenticated_client,
+        {"path": f"/api/roses/{rose.id}/"},
+        {"path": "/api/groups/"},
+        {"path": "/api/auth/user/"},
+    )
+
+    assert [result["status"] for result in response.json()] == [200, 200, 200]
+    assert response.json()[0]["body"]["title"] == rose.title
+    assert threading.get_ident() not in threads
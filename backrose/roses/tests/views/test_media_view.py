@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.utils.http import http_date
+from rest_framework import status
+
+pytestmark = pytest.mark.django_db
+
+PHOTO = b"\xff\xd8 not really a jpeg"
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    settings.STATIC_ROOT = str(tmp_path / "static")
+    photo = tmp_path / "media" / "images" / "fancy rose" / "fancy rose_1.jpg"
+    photo.parent.mkdir(parents=True)
+    photo.write_bytes(PHOTO)
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "app.css").write_text("body {}")
+    (tmp_path / "secret.txt").write_text("outside")
+    return tmp_path
+
+
+URL = "/media/images/fancy%20rose/fancy%20rose_1.jpg"
+
+
+class TestFileResponse:
+
+    def test_streams_the_file(self, api_client, media):
+        response = api_client.get(URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "image/jpeg"
+        assert response["Content-Length"] == str(len(PHOTO))
+        assert "Last-Modified" in response
+        assert "X-Accel-Redirect" not in response
+        assert b"".join(response.streaming_content) == PHOTO
+        response.close()
+
+    def test_not_modified(self, api_client, media):
+        later = datetime.now(timezone.utc) + timedelta(hours=1)
+
+        response = api_client.get(
+            URL, HTTP_IF_MODIFIED_SINCE=http_date(later.timestamp())
+        )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_static(self, api_client, media):
+        response = api_client.get("/static/app.css")
+
+        assert response["Content-Type"] == "text/css"
+        assert b"".join(response.streaming_content) == b"body {}"
+        response.close()
+
+
+class TestAccelRedirect:
+
+    @pytest.fixture(autouse=True)
+    def behind_nginx(self, settings):
+        settings.MEDIA_ACCEL_REDIRECT = True
+
+    def test_hands_over_to_nginx(self, api_client, media):
+        response = api_client.get(URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Accel-Redirect"] == (
+            "/protected/media/images/fancy%20rose/fancy%20rose_1.jpg"
+        )
+        assert response["Content-Type"] == "image/jpeg"
+        assert response.content == b""
+
+    def test_static(self, api_client, media):
+        response = api_client.get("/static/app.css")
+
+        assert response["X-Accel-Redirect"] == "/protected/static/app.css"
+
+    @pytest.mark.parametrize(
+        "path",
+        [
+            "/media/../secret.txt",
+            "/media/images/%2e%2e/%2e%2e/secret.txt",
+            "/media/images/fancy%20rose/",
+            "/media/images/missing.jpg",
+            "/media/.hidden",
+            "/media/images/fancy%20rose/fancy%20rose_1.grid.jpg.tmp",
+        ],
+    )
+    def test_not_found(self, api_client, media, path):
+        (media / "media" / ".hidden").write_text("hidden")
+        (
+            media / "media" / "images" / "fancy rose" / "fancy rose_1.grid.jpg.tmp"
+        ).write_text("half")
+
+        response = api_client.get(path)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "X-Accel-Redirect" not in response
+
+    def test_read_only(self, api_client, media):
+        response = api_client.post(URL)
+
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+
+class TestAuthorisation:
+
+    @pytest.fixture(autouse=True)
+    def private_media(self, settings):
+        settings.MEDIA_AUTHENTICATED = True
+        settings.MEDIA_ACCEL_REDIRECT = True
+
+    def test_anonymous(self, api_client, media):
+        assert api_client.get(URL).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_bad_token(self, api_client, media):
+        api_client.cookies["access"] = "garbage"
+
+        assert api_client.get(URL).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_logged_in(self, authenticated_client, media):
+        response = authenticated_client.get(URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Accel-Redirect"].startswith("/protected/media/")
+
+    def test_static_stays_public(self, api_client, media):
+        assert api_client.get("/static/app.css").status_code == status.HTTP_200_OK
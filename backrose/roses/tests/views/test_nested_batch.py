@@ -0,0 +1,316 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+
+from roses.models import (
+    Blob,
+    Feeding,
+    Pesticide,
+    RosePesticide,
+    RosePhoto,
+    Size,
+    Tombstone,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def sizes(count, height="10.00"):
+    return [
+        {"height": height, "width": "5.00", "date_added": f"2024-05-{i % 28 + 1:02d}"}
+        for i in range(count)
+    ]
+
+
+def list_url(rose, name="sizes"):
+    return reverse(f"rose-{name}-list", kwargs={"rose_pk": rose.id})
+
+
+def batch_url(rose, name="sizes"):
+    return reverse(f"rose-{name}-batch", kwargs={"rose_pk": rose.id})
+
+
+class TestBatchCreate:
+
+    @pytest.mark.parametrize("url", [list_url, batch_url])
+    def test_create(self, authenticated_client, rose, url):
+        response = authenticated_client.post(url(rose), sizes(3), format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [item["date_added"] for item in response.data] == [
+            "2024-05-01",
+            "2024-05-02",
+            "2024-05-03",
+        ]
+        assert sorted(item["id"] for item in response.data) == sorted(
+            Size.objects.filter(rose=rose).values_list("id", flat=True)
+        )
+
+    def test_single_object_still_works(self, authenticated_client, rose):
+        response = authenticated_client.post(list_url(rose), sizes(1)[0], format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["height"] == "10.00"
+
+    def test_invalid_item_rejects_the_batch(self, authenticated_client, rose):
+        items = sizes(3)
+        items[1]["height"] = "tall"
+
+        response = authenticated_client.post(list_url(rose), items, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == {}
+        assert "height" in response.data[1]
+        assert not Size.objects.exists()
+
+    def test_constant_queries(self, authenticated_client, rose):
+        def queries_for(count):
+            with CaptureQueriesContext(connection) as queries:
+                authenticated_client.post(list_url(rose), sizes(count), format="json")
+            return len(queries)
+
+        assert queries_for(2) == queries_for(50)
+
+    def test_treatments(self, authenticated_client, rose, pesticide):
+        response = authenticated_client.post(
+            list_url(rose, "pesticides"),
+            [{"pesticide_id": pesticide.id, "date_added": "2024-05-01"}],
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data[0]["pesticide"]["pests"][0]["name"] == "fancy pest"
+
+    def test_unique_violation(self, authenticated_client, rose, pesticide):
+        item = {"pesticide_id": pesticide.id}
+
+        response = authenticated_client.post(
+            list_url(rose, "pesticides"), [item, item], format="json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == [
+            {},
+            {"non_field_errors": ["Duplicate rose, pesticide in batch."]},
+        ]
+        assert not RosePesticide.objects.exists()
+
+    def test_unique_against_existing_rows(
+        self, authenticated_client, rose, pesticide, rose_pesticide
+    ):
+        other = Pesticide.objects.create(name="other pesticide")
+
+        response = authenticated_client.post(
+            list_url(rose, "pesticides"),
+            [{"pesticide_id": other.id}, {"pesticide_id": pesticide.id}],
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == [
+            {},
+            {"non_field_errors": ["A row with this rose, pesticide already exists."]},
+        ]
+        assert RosePesticide.objects.count() == 1
+
+    def test_limit(self, authenticated_client, rose, monkeypatch):
+        from roses.views import SizeViewSet
+
+        monkeypatch.setattr(SizeViewSet, "batch_limit", 2)
+
+        response = authenticated_client.post(batch_url(rose), sizes(3), format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_missing_rose(self, authenticated_client, rose):
+        url = reverse("rose-sizes-batch", kwargs={"rose_pk": rose.id + 100})
+
+        response = authenticated_client.post(url, sizes(1), format="json")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestBatchUpdate:
+
+    def test_update(self, authenticated_client, rose):
+        created = authenticated_client.post(list_url(rose), sizes(3), format="json")
+        items = [{"id": item["id"], "height": "20.00"} for item in created.data[:2]]
+
+        response = authenticated_client.patch(batch_url(rose), items, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["height"] for item in response.data] == ["20.00", "20.00"]
+        heights = dict(Size.objects.values_list("id", "height"))
+        assert [str(heights[item["id"]]) for item in created.data] == [
+            "20.00",
+            "20.00",
+            "10.00",
+        ]
+
+    def test_touches_updated_at(self, authenticated_client, feeding):
+        before = feeding.updated_at
+
+        authenticated_client.patch(
+            batch_url(feeding.rose, "feedings"),
+            [{"id": feeding.id, "leaf": "more"}],
+            format="json",
+        )
+
+        feeding = Feeding.objects.get(id=feeding.id)
+        assert feeding.leaf == "more"
+        assert feeding.updated_at > before
+
+    def test_bad_ids(self, authenticated_client, rose, size, rose_with_relations):
+        other = rose_with_relations.sizes.get()
+        items = [
+            {"id": size.id, "height": "20.00"},
+            {"height": "20.00"},
+            {"id": other.id},
+            {"id": size.id},
+        ]
+
+        response = authenticated_client.patch(batch_url(rose), items, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == {}
+        assert [list(errors) for errors in response.data[1:]] == [["id"]] * 3
+        size.refresh_from_db()
+        assert str(size.height) != "20.00"
+
+    def test_invalid_value(self, authenticated_client, size):
+        response = authenticated_client.patch(
+            batch_url(size.rose), [{"id": size.id, "width": "wide"}], format="json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "width" in response.data[0]
+
+    def test_unique_violation(
+        self, authenticated_client, rose, pesticide, rose_pesticide
+    ):
+        other = RosePesticide.objects.create(
+            rose=rose, pesticide=Pesticide.objects.create(name="other pesticide")
+        )
+        items = [
+            {"id": rose_pesticide.id, "date_added": "2024-05-01"},
+            {"id": other.id, "pesticide_id": pesticide.id},
+        ]
+
+        response = authenticated_client.patch(
+            batch_url(rose, "pesticides"), items, format="json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == [
+            {},
+            {"non_field_errors": ["Duplicate rose, pesticide in batch."]},
+        ]
+        other.refresh_from_db()
+        assert other.pesticide_id != pesticide.id
+
+
+class TestBatchDelete:
+
+    def test_delete(self, authenticated_client, rose):
+        created = authenticated_client.post(list_url(rose), sizes(3), format="json")
+        ids = [created.data[0]["id"], {"id": created.data[1]["id"]}]
+
+        response = authenticated_client.delete(batch_url(rose), ids, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == [
+            {"id": created.data[0]["id"], "deleted": True},
+            {"id": created.data[1]["id"], "deleted": True},
+        ]
+        assert list(Size.objects.values_list("id", flat=True)) == [
+            created.data[2]["id"]
+        ]
+        assert Tombstone.objects.filter(model="roses.Size").count() == 2
+
+    def test_unknown_id_deletes_nothing(self, authenticated_client, size):
+        response = authenticated_client.delete(
+            batch_url(size.rose), [size.id, size.id + 100], format="json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == [{}, {"id": ["Not found."]}]
+        assert Size.objects.filter(id=size.id).exists()
+
+    def test_empty(self, authenticated_client, rose):
+        response = authenticated_client.delete(batch_url(rose), [], format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_unauthenticated(api_client, rose):
+    response = api_client.post(batch_url(rose), sizes(1), format="json")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestPhotoBatch:
+    """batch writes send the save signals, the blob and variant bookkeeping runs"""
+
+    @pytest.fixture
+    def media(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        return tmp_path
+
+    def upload(self, color, name="photo.jpg"):
+        buffer = BytesIO()
+        Image.new("RGB", (64, 48), color).save(buffer, format="JPEG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+    def test_create(
+        self, authenticated_client, rose, media, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.post(
+                batch_url(rose, "photos"),
+                {
+                    "photo": [
+                        self.upload("red"),
+                        self.upload("blue"),
+                        self.upload("red"),
+                    ]
+                },
+                format="multipart",
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        photos = list(RosePhoto.objects.filter(rose=rose).order_by("id"))
+        assert [photo.id for photo in photos] == [item["id"] for item in response.data]
+        assert photos[0].photo.name == photos[2].photo.name
+        assert Blob.objects.get(name=photos[0].photo.name).refs == 2
+        assert Blob.objects.get(name=photos[1].photo.name).refs == 1
+        assert all(photo.variants and photo.blurhash for photo in photos)
+
+    def test_update_and_delete(
+        self, authenticated_client, rose, media, django_capture_on_commit_callbacks
+    ):
+        photo = RosePhoto.objects.create(rose=rose, photo=self.upload("red"))
+        name = photo.photo.name
+
+        response = authenticated_client.patch(
+            batch_url(rose, "photos"),
+            [{"id": photo.id, "descr": "renamed"}],
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Blob.objects.get(name=name).refs == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.delete(
+                batch_url(rose, "photos"), [photo.id], format="json"
+            )
+
+        assert not Blob.objects.filter(name=name).exists()
+        assert Tombstone.objects.filter(
+            model="roses.RosePhoto", object_id=photo.id
+        ).exists()
@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from roses.views import RoseViewSet
+
+
+def read_ndjson(response):
+    body = b"".join(response.streaming_content).decode()
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def read_csv(response):
+    body = b"".join(response.streaming_content).decode()
+    return list(csv.DictReader(io.StringIO(body)))
+
+
+@pytest.mark.django_db
+class TestRoseExport:
+
+    def test_ndjson_by_default(self, authenticated_client, create_multiple_roses):
+        response = authenticated_client.get(reverse("rose-export"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "application/x-ndjson"
+        assert "roses.ndjson" in response["Content-Disposition"]
+
+        rows = read_ndjson(response)
+        assert [row["id"] for row in rows] == [
+            rose.id for rose in create_multiple_roses
+        ]
+        assert rows[0]["group"]["name"] == create_multiple_roses[0].group.name
+        assert "sizes" not in rows[0]
+
+    def test_include_collections(
+        self, authenticated_client, rose_with_relations, rose_pesticide
+    ):
+        response = authenticated_client.get(
+            reverse("rose-export"), {"include": "sizes,pesticides"}
+        )
+
+        (row,) = read_ndjson(response)
+        assert len(row["sizes"]) == 1
+        assert row["pesticides"][0]["pesticide"]["name"] == "fancy pesticide treatment"
+        assert "feedings" not in row
+
+    def test_csv(self, authenticated_client, rose_with_relations):
+        response = authenticated_client.get(
+            reverse("rose-export"), {"format": "csv", "include": "sizes"}
+        )
+
+        assert response["Content-Type"] == "text/csv; charset=utf-8"
+        (row,) = read_csv(response)
+        assert row["title"] == rose_with_relations.title
+        assert row["breeder.name"] == rose_with_relations.breeder.name
+        assert json.loads(row["sizes"])[0]["id"] == rose_with_relations.sizes.get().id
+
+    def test_accept_header(self, authenticated_client, rose):
+        response = authenticated_client.get(
+            reverse("rose-export"), HTTP_ACCEPT="text/csv"
+        )
+
+        assert response["Content-Type"].startswith("text/csv")
+
+    def test_queries_per_chunk(
+        self, authenticated_client, create_multiple_roses, monkeypatch
+    ):
+        monkeypatch.setattr(RoseViewSet, "export_chunk_size", 4)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(
+                reverse("rose-export"), {"include": "sizes"}
+            )
+            rows = read_ndjson(response)
+
+        assert len(rows) == 10
+        # user, then roses + sizes for chunks of 4, 4 and 2
+        assert len(queries) == 1 + 3 * 2
+
+    def test_filters_apply(self, authenticated_client, create_multiple_roses):
+        response = authenticated_client.get(
+            reverse("rose-export"), {"search": "fancy_rose_2"}
+        )
+
+        assert [row["title"] for row in read_ndjson(response)] == ["fancy_rose_2"]
+
+    def test_unknown_include(self, authenticated_client):
+        response = authenticated_client.get(reverse("rose-export"), {"include": "x"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert b"include" in response.content
+
+    def test_unauthenticated(self, api_client):
+        response = api_client.get(reverse("rose-export"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
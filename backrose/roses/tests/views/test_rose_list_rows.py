@@ -0,0 +1,74 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+
+from common import RowSerializer
+from roses.models import Rose
+from roses.serializers import RoseListSerializer, RoseSerializer
+from roses.views import RoseViewSet
+
+
+def fetch(client, params, monkeypatch, row_list):
+    monkeypatch.setattr(RoseViewSet, "row_list", row_list)
+    response = client.get(reverse("rose-list"), params)
+    assert response.status_code == 200
+    return response.content
+
+
+@pytest.mark.django_db
+class TestRoseListRows:
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {},
+            {"page": 2},
+            {"ordering": "-title"},
+            {"pagination": "cursor", "page_size": 4},
+            {"pagination": "cursor", "ordering": "title"},
+            {"search": "fancy_rose_3"},
+        ],
+    )
+    def test_output_is_byte_identical(
+        self, authenticated_client, create_multiple_roses, monkeypatch, params
+    ):
+        # one rose without a photo renders null
+        Rose.objects.filter(pk=create_multiple_roses[0].pk).update(photo="")
+
+        rows = fetch(authenticated_client, params, monkeypatch, row_list=True)
+        instances = fetch(authenticated_client, params, monkeypatch, row_list=False)
+
+        assert rows == instances
+
+    def test_cursor_links_follow(
+        self, authenticated_client, create_multiple_roses, monkeypatch
+    ):
+        params = {"pagination": "cursor", "page_size": 3, "ordering": "title"}
+        first = authenticated_client.get(reverse("rose-list"), params)
+
+        rows = authenticated_client.get(first.data["next"]).content
+        monkeypatch.setattr(RoseViewSet, "row_list", False)
+        instances = authenticated_client.get(first.data["next"]).content
+
+        assert rows == instances
+
+    def test_list_runs_one_query_per_page(
+        self, authenticated_client, create_multiple_roses, django_assert_num_queries
+    ):
+        # user, count, page
+        with django_assert_num_queries(3):
+            authenticated_client.get(reverse("rose-list"))
+
+    def test_columns(self):
+        assert RowSerializer(RoseListSerializer).columns == [
+            "id",
+            "title",
+            "photo",
+            "variants",
+            "blurhash",
+            "group",
+        ]
+
+    def test_nested_serializer_is_rejected(self):
+        with pytest.raises(ImproperlyConfigured):
+            RowSerializer(RoseSerializer)
@@ -0,0 +1,93 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from roses.models import Rose
+
+pytestmark = pytest.mark.django_db
+
+
+def walk_pages(client, url, params):
+    """follow next links from the first cursor page, collecting titles"""
+
+    titles = []
+    response = client.get(url, params)
+    while True:
+        assert response.status_code == status.HTTP_200_OK
+        titles.extend(item["title"] for item in response.data["results"])
+        if not response.data["next"]:
+            return titles
+        response = client.get(response.data["next"])
+
+
+@pytest.mark.django_db
+class TestRoseCursorPagination:
+
+    def test_page_number_is_default(self, authenticated_client, create_multiple_roses):
+        response = authenticated_client.get(reverse("rose-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 10
+        assert len(response.data["results"]) == 9
+
+    def test_cursor_mode_walks_all_roses(
+        self, authenticated_client, create_multiple_roses
+    ):
+        titles = walk_pages(
+            authenticated_client,
+            reverse("rose-list"),
+            {"pagination": "cursor", "page_size": 3},
+        )
+
+        assert titles == [rose.title for rose in create_multiple_roses]
+
+    def test_cursor_mode_has_no_count(
+        self, authenticated_client, create_multiple_roses
+    ):
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(
+                reverse("rose-list"), {"pagination": "cursor"}
+            )
+
+        assert "count" not in response.data
+        assert not any("COUNT(" in query["sql"] for query in queries)
+        assert not any("OFFSET" in query["sql"] for query in queries)
+
+    @pytest.mark.parametrize("ordering", ["title", "-title", "-id"])
+    def test_cursor_mode_follows_ordering(
+        self, authenticated_client, create_multiple_roses, ordering
+    ):
+        titles = walk_pages(
+            authenticated_client,
+            reverse("rose-list"),
+            {"pagination": "cursor", "page_size": 4, "ordering": ordering},
+        )
+
+        expected = Rose.objects.order_by(ordering).values_list("title", flat=True)
+        assert titles == list(expected)
+
+    def test_cursor_is_stable_across_inserts(
+        self, authenticated_client, create_multiple_roses, breeder, group
+    ):
+        url = reverse("rose-list")
+        first = authenticated_client.get(
+            url, {"pagination": "cursor", "page_size": 5, "ordering": "title"}
+        )
+
+        # sorts before every title already served
+        Rose.objects.create(
+            title="a_new_rose", title_eng="a_new_rose", breeder=breeder, group=group
+        )
+
+        second = authenticated_client.get(first.data["next"])
+        served = [item["title"] for item in first.data["results"]]
+        served += [item["title"] for item in second.data["results"]]
+
+        assert len(served) == len(set(served)) == 10
+        assert "a_new_rose" not in served
+
+    def test_invalid_cursor(self, authenticated_client):
+        response = authenticated_client.get(reverse("rose-list"), {"cursor": "bogus"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,159 @@
+from datetime import date, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from roses.models import (
+    Feeding,
+    Foliage,
+    Fungicide,
+    Pesticide,
+    RoseFungicide,
+    RosePesticide,
+    Size,
+)
+
+pytestmark = pytest.mark.django_db
+
+START = date(2020, 1, 1)
+
+
+def day(n):
+    return START + timedelta(days=n)
+
+
+@pytest.fixture
+def history(rose):
+    """events on a handful of days, with same-day ties between and within types"""
+
+    expected = []
+
+    def event(type, obj, when):
+        if when is not None:
+            expected.append((when, type, obj.id))
+
+    for n in range(6):
+        size = Size.objects.create(
+            rose=rose, height="1.00", width="1.00", date_added=day(n % 3)
+        )
+        event("size", size, size.date_added)
+
+    for n in range(3):
+        feeding = Feeding.objects.create(
+            rose=rose,
+            basal="basal",
+            basal_time=day(n),
+            leaf="leaf",
+            leaf_time=day(n + 1) if n else None,
+        )
+        event("basal_feeding", feeding, feeding.basal_time)
+        event("leaf_feeding", feeding, feeding.leaf_time)
+
+    foliage = Foliage.objects.create(rose=rose, foliage="yellow", foliage_time=day(2))
+    event("foliage", foliage, foliage.foliage_time)
+    Foliage.objects.create(rose=rose, foliage="undated")
+
+    for n in range(3):
+        link = RosePesticide.objects.create(
+            rose=rose,
+            pesticide=Pesticide.objects.create(name=f"pesticide {n}"),
+            date_added=day(n),
+        )
+        event("pesticide", link, link.date_added)
+    link = RoseFungicide.objects.create(
+        rose=rose,
+        fungicide=Fungicide.objects.create(name="fungicide"),
+        date_added=day(1),
+    )
+    event("fungicide", link, link.date_added)
+
+    return expected
+
+
+def read_all(client, rose, **params):
+    url = reverse("rose-timeline", kwargs={"pk": rose.id})
+    events, pages = [], 0
+    response = client.get(url, params)
+    while True:
+        assert response.status_code == status.HTTP_200_OK
+        events.extend(response.data["results"])
+        pages += 1
+        if response.data["next"] is None:
+            return events, pages
+        response = client.get(response.data["next"])
+
+
+def keys(events):
+    return [(date.fromisoformat(e["date"]), e["type"], e["id"]) for e in events]
+
+
+class TestRoseTimeline:
+
+    def test_newest_first(self, authenticated_client, rose, history):
+        events, pages = read_all(authenticated_client, rose, page_size=4)
+
+        assert keys(events) == sorted(history, reverse=True)
+        assert len(history) == 16
+        assert pages == 4
+
+    def test_oldest_first(self, authenticated_client, rose, history):
+        events, _ = read_all(authenticated_client, rose, page_size=3, order="asc")
+
+        assert keys(events) == sorted(history)
+
+    def test_single_page(self, authenticated_client, rose, history):
+        events, pages = read_all(authenticated_client, rose, page_size=100)
+
+        assert pages == 1
+        assert len(events) == len(history)
+
+    def test_event_data(self, authenticated_client, rose, rose_pesticide, feeding):
+        events, _ = read_all(authenticated_client, rose)
+
+        by_type = {event["type"]: event for event in events}
+        assert by_type["pesticide"]["data"]["pesticide"]["pests"][0]["name"] == (
+            "fancy pest"
+        )
+        assert by_type["basal_feeding"]["data"]["id"] == feeding.id
+
+    def test_queries_per_page(self, authenticated_client, rose, history):
+        url = reverse("rose-timeline", kwargs={"pk": rose.id})
+
+        for page_size in (2, 50):
+            with CaptureQueriesContext(connection) as queries:
+                authenticated_client.get(url, {"page_size": page_size})
+            # user, rose, one per source, pests and fungi of the treatments
+            # that made it onto the page
+            assert len(queries) <= 2 + 6 + 2
+
+    def test_empty(self, authenticated_client, rose):
+        response = authenticated_client.get(
+            reverse("rose-timeline", kwargs={"pk": rose.id})
+        )
+
+        assert response.data == {"next": None, "results": []}
+
+    @pytest.mark.parametrize(
+        "params,key",
+        [({"cursor": "garbage"}, "cursor"), ({"order": "sideways"}, "order")],
+    )
+    def test_bad_params(self, authenticated_client, rose, params, key):
+        response = authenticated_client.get(
+            reverse("rose-timeline", kwargs={"pk": rose.id}), params
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert key in response.data
+
+    def test_missing_rose(self, authenticated_client, rose):
+        response = authenticated_client.get(
+            reverse("rose-timeline", kwargs={"pk": rose.id + 100})
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_unauthenticated(self, api_client, rose):
+        response = api_client.get(reverse("rose-timeline", kwargs={"pk": rose.id}))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -3,7 +3,15 @@ import json
 from django.urls import reverse
 from rest_framework import status
 from pytils.translit import slugify
-from roses.models import Rose
+from roses.models import (
+    Rose,
+    Pest,
+    Pesticide,
+    RosePesticide,
+    Fungus,
+    Fungicide,
+    RoseFungicide,
+)
 
 pytestmark = pytest.mark.django_db
 
@@ -100,7 +108,7 @@ class TestRoseViewSet:
 
         list_response = authenticated_client.get(list_url)
         list_fields = set(list_response.data["results"][0].keys())
-        assert list_fields == {"id", "title", "photo", "group"}
+        assert list_fields == {"id", "title", "photo", "variants", "blurhash", "group"}
 
         detail_response = authenticated_client.get(detail_url)
         detail_fields = set(detail_response.data.keys())
@@ -110,3 +118,99 @@ class TestRoseViewSet:
         assert len(detail_fields) > len(list_fields)
 
 
+@pytest.mark.django_db
+class TestRoseQueryPlans:
+
+    def test_list_skips_nested_relations(
+        self, authenticated_client, create_multiple_roses, django_assert_num_queries
+    ):
+        # user lookup, page count, page rows
+        with django_assert_num_queries(3) as captured:
+            response = authenticated_client.get(reverse("rose-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        page_query = captured.captured_queries[-1]["sql"]
+        assert "description" not in page_query
+        assert "roses_breeder" not in page_query
+
+    def test_list_payload_unchanged(self, authenticated_client, rose):
+        response = authenticated_client.get(reverse("rose-list"))
+
+        item = response.data["results"][0]
+        assert item["id"] == rose.id
+        assert item["title"] == rose.title
+        assert item["group"] == rose.group_id
+        assert item["photo"].endswith(rose.photo.url)
+
+    def test_update_responds_with_full_rose(
+        self, authenticated_client, rose_with_relations
+    ):
+        url = reverse("rose-detail", kwargs={"pk": rose_with_relations.id})
+
+        response = authenticated_client.patch(
+            url, {"description": "new description"}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["description"] == "new description"
+        assert len(response.data["feedings"]) == 1
+        assert response.data["breeder"]["name"] == rose_with_relations.breeder.name
+
+    def test_retrieve_query_count_is_fixed(
+        self, authenticated_client, rose_with_relations, django_assert_num_queries
+    ):
+        url = reverse("rose-detail", kwargs={"pk": rose_with_relations.id})
+
+        def add_treatments(start, count):
+            for i in range(start, start + count):
+                pest = Pest.objects.create(name=f"pest {i}")
+                pesticide = Pesticide.objects.create(name=f"pesticide {i}")
+                pesticide.pests.add(pest)
+                RosePesticide.objects.create(
+                    rose=rose_with_relations, pesticide=pesticide
+                )
+
+                fungus = Fungus.objects.create(name=f"fungus {i}")
+                fungicide = Fungicide.objects.create(name=f"fungicide {i}")
+                fungicide.fungi.add(fungus)
+                RoseFungicide.objects.create(
+                    rose=rose_with_relations, fungicide=fungicide
+                )
+
+        # user, rose with breeder and group, five plain collections,
+        # treatments and their pests/fungi
+        add_treatments(0, 2)
+        with django_assert_num_queries(11):
+            response = authenticated_client.get(url)
+        assert len(response.data["pesticides"]) == 2
+
+        add_treatments(2, 20)
+        with django_assert_num_queries(11):
+            response = authenticated_client.get(url)
+
+        assert len(response.data["pesticides"]) == 22
+        assert len(response.data["fungicides"]) == 22
+        assert response.data["pesticides"][-1]["pesticide"]["pests"][0]["name"] == (
+            "pest 21"
+        )
+
+    def test_nested_treatments_query_count(
+        self,
+        authenticated_client,
+        rose,
+        pesticide,
+        fungicide,
+        django_assert_num_queries,
+    ):
+        for i in range(5):
+            extra = Pesticide.objects.create(name=f"pesticide {i}")
+            extra.pests.add(Pest.objects.create(name=f"pest {i}"))
+            RosePesticide.objects.create(rose=rose, pesticide=extra)
+
+        url = reverse("rose-pesticides-list", kwargs={"rose_pk": rose.id})
+
+        # user, treatments joined with pesticides, pests
+        with django_assert_num_queries(3):
+            response = authenticated_client.get(url)
+
+        assert len(response.data) == 5
@@ -0,0 +1,128 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+COLLECTIONS = {
+    "feedings",
+    "foliages",
+    "sizes",
+    "pesticides",
+    "fungicides",
+    "photos",
+    "videos",
+}
+
+
+def get_detail(client, rose, params):
+    url = reverse("rose-detail", kwargs={"pk": rose.id})
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    return response, len(queries)
+
+
+@pytest.mark.django_db
+class TestRoseSparseFields:
+
+    def test_full_by_default(self, authenticated_client, rose_with_relations):
+        response, _ = get_detail(authenticated_client, rose_with_relations, {})
+
+        assert COLLECTIONS <= set(response.data)
+
+    def test_fields_prunes_output_and_prefetches(
+        self, authenticated_client, rose_with_relations
+    ):
+        response, queries = get_detail(
+            authenticated_client, rose_with_relations, {"fields": "id,title,group"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data) == {"id", "title", "group"}
+        # user, rose joined with group
+        assert queries == 2
+
+    def test_empty_expand_is_header_only(
+        self, authenticated_client, rose_with_relations
+    ):
+        response, queries = get_detail(
+            authenticated_client, rose_with_relations, {"expand": ""}
+        )
+
+        assert not COLLECTIONS & set(response.data)
+        assert {"title", "breeder", "group", "photo"} <= set(response.data)
+        assert queries == 2
+
+    def test_expand_selected_collections(
+        self, authenticated_client, rose_with_relations, rose_pesticide
+    ):
+        response, queries = get_detail(
+            authenticated_client, rose_with_relations, {"expand": "sizes,pesticides"}
+        )
+
+        assert COLLECTIONS & set(response.data) == {"sizes", "pesticides"}
+        assert len(response.data["pesticides"]) == 1
+        # user, rose, sizes, pesticides with their product, pests
+        assert queries == 5
+
+    def test_nested_paths(
+        self, authenticated_client, rose_with_relations, rose_pesticide
+    ):
+        response, queries = get_detail(
+            authenticated_client,
+            rose_with_relations,
+            {"fields": "id,pesticides.date_added,breeder.name"},
+        )
+
+        assert response.data["pesticides"] == [
+            {"date_added": str(rose_pesticide.date_added)}
+        ]
+        assert response.data["breeder"] == {"name": rose_with_relations.breeder.name}
+        # the pesticide and its pests are no longer loaded
+        assert queries == 3
+
+    @pytest.mark.parametrize(
+        "params,key",
+        [
+            ({"fields": "id,nope"}, "fields"),
+            ({"expand": "title"}, "expand"),
+            ({"fields": "pesticides.nope"}, "fields.pesticides"),
+        ],
+    )
+    def test_unknown_fields(self, authenticated_client, rose, params, key):
+        response, _ = get_detail(authenticated_client, rose, params)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert key in response.data
+
+    def test_update_response_stays_full(self, authenticated_client, rose):
+        url = reverse("rose-detail", kwargs={"pk": rose.id})
+        response = authenticated_client.patch(
+            f"{url}?fields=id", {"description": "sparse"}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert COLLECTIONS <= set(response.data)
+
+
+@pytest.mark.django_db
+class TestNestedSparseFields:
+
+    def test_list_fields(self, authenticated_client, rose, rose_pesticide):
+        url = reverse("rose-pesticides-list", kwargs={"rose_pk": rose.id})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(url, {"fields": "id,date_added"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data[0]) == {"id", "date_added"}
+        # user, rose pesticides without joins or prefetches
+        assert len(queries) == 2
+        assert "roses_pesticide" not in queries[-1]["sql"]
+
+    def test_retrieve_fields(self, authenticated_client, rose, size):
+        url = reverse("rose-sizes-detail", kwargs={"rose_pk": rose.id, "pk": size.id})
+
+        response = authenticated_client.get(url, {"fields": "height"})
+
+        assert set(response.data) == {"height"}
@@ -0,0 +1,185 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from roses import sync
+from roses.models import Group, Breeder, Pesticide, Tombstone
+
+
+def age(*models, by=timedelta(hours=1)):
+    """move rows out of the overlap window of a fresh token"""
+
+    for model in models:
+        model.objects.update(updated_at=timezone.now() - by)
+
+
+@pytest.mark.django_db
+class TestSyncViewSet:
+
+    def test_full_snapshot(self, authenticated_client, rose_with_relations):
+        response = authenticated_client.get(reverse("sync-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["reset"] is True
+        assert response.data["deleted"] == {}
+        assert set(response.data["changes"]) == {key for key, *_ in sync.SYNCED}
+        assert [row["id"] for row in response.data["changes"]["roses"]] == [
+            rose_with_relations.id
+        ]
+        assert len(response.data["changes"]["sizes"]) == 1
+        assert response.data["more"] is False
+
+    def test_paged_snapshot(self, authenticated_client, rose_with_relations):
+        whole = authenticated_client.get(reverse("sync-list")).data["changes"]
+
+        url = reverse("sync-list")
+        pages = [authenticated_client.get(url, {"page_size": 3}).data]
+        while pages[-1]["more"]:
+            params = {"page_size": 3, "since": pages[-1]["token"]}
+            pages.append(authenticated_client.get(url, params).data)
+
+        assert len(pages) > 1
+        assert [page["reset"] for page in pages] == [True] + [False] * (len(pages) - 1)
+        assert all(
+            sum(len(rows) for rows in page["changes"].values()) <= 3 for page in pages
+        )
+        for key, rows in whole.items():
+            assert [row for page in pages for row in page["changes"][key]] == rows
+
+        # the last token is a delta from the start of the snapshot
+        response = authenticated_client.get(url, {"since": pages[-1]["token"]})
+        assert response.data["reset"] is False
+        assert set(response.data["deleted"]) == set(whole)
+
+    def test_delta_returns_only_changed_rows(
+        self, authenticated_client, create_multiple_roses, breeder
+    ):
+        age(*sync.TRACKED_MODELS)
+        token = authenticated_client.get(reverse("sync-list")).data["token"]
+
+        changed = create_multiple_roses[3]
+        changed.description = "changed"
+        changed.save()
+
+        response = authenticated_client.get(reverse("sync-list"), {"since": token})
+
+        assert response.data["reset"] is False
+        assert [row["id"] for row in response.data["changes"]["roses"]] == [changed.id]
+        assert response.data["changes"]["roses"][0]["description"] == "changed"
+        assert response.data["changes"]["breeders"] == []
+
+    def test_delta_lists_deleted_ids(self, authenticated_client, rose_with_relations):
+        age(*sync.TRACKED_MODELS)
+        token = authenticated_client.get(reverse("sync-list")).data["token"]
+        size_ids = list(rose_with_relations.sizes.values_list("id", flat=True))
+        rose_id = rose_with_relations.id
+
+        rose_with_relations.delete()
+
+        response = authenticated_client.get(reverse("sync-list"), {"since": token})
+
+        assert response.data["deleted"]["roses"] == [rose_id]
+        # cascaded rows get their tombstones too
+        assert response.data["deleted"]["sizes"] == size_ids
+        assert response.data["changes"]["roses"] == []
+
+    def test_paged_delta(self, authenticated_client, create_multiple_roses):
+        age(*sync.TRACKED_MODELS)
+        token = authenticated_client.get(reverse("sync-list")).data["token"]
+        deleted = [rose.id for rose in create_multiple_roses[:3]]
+        changed = create_multiple_roses[3:]
+        for rose in create_multiple_roses[:3]:
+            rose.delete()
+        for rose in changed:
+            rose.description = "changed"
+            rose.save()
+
+        url = reverse("sync-list")
+        pages = [authenticated_client.get(url, {"page_size": 2, "since": token}).data]
+        while pages[-1]["more"]:
+            params = {"page_size": 2, "since": pages[-1]["token"]}
+            pages.append(authenticated_client.get(url, params).data)
+
+        assert len(pages) > 2
+        assert not any(page["reset"] for page in pages)
+        assert all(
+            sum(len(rows) for rows in page["changes"].values())
+            + sum(len(ids) for ids in page["deleted"].values())
+            <= 2
+            for page in pages
+        )
+        assert [i for page in pages for i in page["deleted"]["roses"]] == deleted
+        # deletions come before changes, sqlite may reuse a deleted id
+        last_deletion = max(
+            i for i, page in enumerate(pages) if page["deleted"]["roses"]
+        )
+        first_change = min(
+            i for i, page in enumerate(pages) if page["changes"]["roses"]
+        )
+        assert last_deletion <= first_change
+        assert [row["id"] for page in pages for row in page["changes"]["roses"]] == [
+            rose.id for rose in changed
+        ]
+
+        # the last token is a plain delta from the start of the paged one
+        assert sync.decode_token(pages[-1]["token"])[1:] == (None, None)
+
+    def test_foreign_position(self, authenticated_client):
+        now = timezone.now()
+        token = sync.encode_token(now, ("nope", 0), now)
+
+        response = authenticated_client.get(reverse("sync-list"), {"since": token})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_m2m_change_touches_product(self, authenticated_client, pesticide, pest):
+        other = type(pest).objects.create(name="other pest")
+        age(Pesticide)
+        token = authenticated_client.get(reverse("sync-list")).data["token"]
+
+        other.pesticides.add(pesticide)
+
+        response = authenticated_client.get(reverse("sync-list"), {"since": token})
+        rows = response.data["changes"]["pesticides"]
+
+        assert [row["id"] for row in rows] == [pesticide.id]
+        assert set(rows[0]["pests"]) == {pest.id, other.id}
+
+    def test_expired_token_resets(self, authenticated_client, group, breeder):
+        token = sync.encode_token(
+            timezone.now() - sync.TOMBSTONE_RETENTION - timedelta(days=1)
+        )
+
+        response = authenticated_client.get(reverse("sync-list"), {"since": token})
+
+        assert response.data["reset"] is True
+        assert len(response.data["changes"]["groups"]) == Group.objects.count()
+        assert len(response.data["changes"]["breeders"]) == Breeder.objects.count()
+
+    def test_invalid_token(self, authenticated_client):
+        response = authenticated_client.get(reverse("sync-list"), {"since": "bogus"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "since" in response.data
+
+    def test_unauthenticated(self, api_client):
+        response = api_client.get(reverse("sync-list"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_prune_tombstones(self, rose):
+        rose_id = rose.id
+        rose.delete()
+        Tombstone.objects.create(model="roses.Rose", object_id=0)
+        Tombstone.objects.filter(object_id=0).update(
+            deleted_at=timezone.now() - sync.TOMBSTONE_RETENTION - timedelta(days=1)
+        )
+
+        call_command("prune_tombstones", stdout=StringIO())
+
+        kept = Tombstone.objects.filter(object_id__in=[0, rose_id])
+        assert list(kept.values_list("object_id", flat=True)) == [rose_id]
@@ -1,4 +1,6 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
@@ -139,3 +141,80 @@ def test_nested_resources_basic_crud(authenticated_client, rose, nested_config):
     response = authenticated_client.get(list_url)
     assert response.status_code == status.HTTP_200_OK
     assert len(response.data) >= 1
+
+
+def rose_lookups(queries):
+    return [
+        query["sql"]
+        for query in queries.captured_queries
+        if query["sql"].startswith("SELECT") and 'FROM "roses_rose"' in query["sql"]
+    ]
+
+
+class TestNestedParentLookup:
+
+    def test_reads_skip_the_rose(self, authenticated_client, size):
+        urls = [
+            reverse("rose-sizes-list", kwargs={"rose_pk": size.rose_id}),
+            reverse(
+                "rose-sizes-detail", kwargs={"rose_pk": size.rose_id, "pk": size.id}
+            ),
+        ]
+
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                response = authenticated_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert rose_lookups(queries) == []
+
+    def test_update_skips_the_rose(self, authenticated_client, size):
+        url = reverse(
+            "rose-sizes-detail", kwargs={"rose_pk": size.rose_id, "pk": size.id}
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.patch(url, {"height": "1.00"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert rose_lookups(queries) == []
+
+    def test_create_looks_up_the_rose_once(self, authenticated_client, rose):
+        url = reverse("rose-sizes-list", kwargs={"rose_pk": rose.id})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.post(
+                url, {"height": "1.00", "width": "1.00"}
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(rose_lookups(queries)) == 1
+
+    def test_empty_collection(self, authenticated_client, rose):
+        url = reverse("rose-sizes-list", kwargs={"rose_pk": rose.id})
+
+        response = authenticated_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == []
+
+    @pytest.mark.parametrize(
+        "method,name,kwargs",
+        [
+            ("get", "rose-sizes-list", {}),
+            ("post", "rose-sizes-list", {}),
+            ("get", "rose-sizes-detail", {"pk": 1}),
+            ("patch", "rose-sizes-detail", {"pk": 1}),
+            ("delete", "rose-sizes-detail", {"pk": 1}),
+            ("patch", "rose-sizes-batch", {}),
+        ],
+    )
+    def test_missing_rose(self, authenticated_client, size, method, name, kwargs):
+        url = reverse(name, kwargs={"rose_pk": size.rose_id + 100, **kwargs})
+        data = {"height": "1.00", "width": "1.00"}
+        if "batch" in name:
+            data = [{"id": size.id, **data}]
+
+        response = getattr(authenticated_client, method)(url, data, format="json")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "Rose" in str(response.data["detail"])
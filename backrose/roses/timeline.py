@@ -0,0 +1,138 @@
+"""
+one dated stream of everything that happened to a rose, see
+RoseViewSet.timeline.
+
+every source (a model and one of its date fields) is read in (date, id) order
+past the cursor and limited to one page, then the sources are k-way merged
+and cut to the page. a page therefore costs one bounded range query per
+source however long the history is. events are ordered by (date, type, id),
+newest first unless ascending; rows without a date have no place in time and
+are left out.
+"""
+
+import heapq
+from datetime import date
+
+from django.core import signing
+from django.db.models import Q, prefetch_related_objects
+
+from common.plans import build_query_plan
+from .models import Feeding, Foliage, RoseFungicide, RosePesticide, Size
+from .serializers import (
+    FeedingSerializer,
+    FoliageSerializer,
+    RoseFungicideSerializer,
+    RosePesticideSerializer,
+    SizeSerializer,
+)
+
+CURSOR_SALT = "roses.timeline"
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# (event type, model, date field, serializer)
+SOURCES = [
+    ("size", Size, "date_added", SizeSerializer),
+    ("basal_feeding", Feeding, "basal_time", FeedingSerializer),
+    ("leaf_feeding", Feeding, "leaf_time", FeedingSerializer),
+    ("foliage", Foliage, "foliage_time", FoliageSerializer),
+    ("pesticide", RosePesticide, "date_added", RosePesticideSerializer),
+    ("fungicide", RoseFungicide, "date_added", RoseFungicideSerializer),
+]
+
+PLANS = {type: build_query_plan(serializer) for type, _, _, serializer in SOURCES}
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(key):
+    day, type, pk = key
+    return signing.dumps([day.isoformat(), type, pk], salt=CURSOR_SALT)
+
+
+def decode_cursor(cursor):
+    try:
+        day, type, pk = signing.loads(cursor, salt=CURSOR_SALT)
+        return date.fromisoformat(day), type, int(pk)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def past(field, type, cursor, descending):
+    """rows of one source whose (date, type, id) key lies past the cursor"""
+
+    day, cursor_type, pk = cursor
+    beyond, beyond_or_on = ("lt", "lte") if descending else ("gt", "gte")
+    if type == cursor_type:
+        return Q(**{f"{field}__{beyond}": day}) | Q(**{field: day, f"pk__{beyond}": pk})
+    # on the cursor's day a whole source sorts on one side of the cursor type
+    if (type < cursor_type) == descending:
+        return Q(**{f"{field}__{beyond_or_on}": day})
+    return Q(**{f"{field}__{beyond}": day})
+
+
+class Timeline:
+    def __init__(self, rose_id, descending=True):
+        self.rose_id = rose_id
+        self.descending = descending
+
+    def source_queryset(self, type, model, field, cursor=None):
+        """
+        one source in key order, a range scan of its (rose_id, date) index:
+        sqlite indexes end in the rowid, so the id tie-break needs no sort
+        """
+
+        queryset = model.objects.filter(
+            rose_id=self.rose_id, **{f"{field}__isnull": False}
+        )
+        if cursor is not None:
+            queryset = queryset.filter(past(field, type, cursor, self.descending))
+
+        plan = PLANS[type]
+        if plan.select_related:
+            queryset = queryset.select_related(*plan.select_related)
+
+        order = "-" if self.descending else ""
+        return queryset.order_by(f"{order}{field}", f"{order}pk")
+
+    def read_source(self, type, model, field, cursor, limit):
+        queryset = self.source_queryset(type, model, field, cursor)
+        return [((getattr(obj, field), type, obj.pk), obj) for obj in queryset[:limit]]
+
+    def page(self, cursor=None, size=PAGE_SIZE, context=None):
+        """(events, cursor of the next page or None)"""
+
+        cursor = decode_cursor(cursor) if cursor else None
+
+        sources = [
+            self.read_source(type, model, field, cursor, size + 1)
+            for type, model, field, _ in SOURCES
+        ]
+        merged = heapq.merge(
+            *sources, key=lambda item: item[0], reverse=self.descending
+        )
+        rows = [row for _, row in zip(range(size + 1), merged)]
+        has_more = len(rows) > size
+        rows = rows[:size]
+
+        serializers = {}
+        for type, _, _, serializer_class in SOURCES:
+            objs = [obj for (_, row_type, _), obj in rows if row_type == type]
+            if objs and PLANS[type].prefetch_related:
+                prefetch_related_objects(objs, *PLANS[type].prefetch_related)
+            serializers[type] = serializer_class(context=context)
+
+        events = [
+            {
+                "type": type,
+                "date": day.isoformat(),
+                "id": pk,
+                "data": serializers[type].to_representation(obj),
+            }
+            for (day, type, pk), obj in rows
+        ]
+        next_cursor = encode_cursor(rows[-1][0]) if has_more else None
+        return events, next_cursor
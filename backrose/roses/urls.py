@@ -17,6 +17,7 @@ from .views import (
     VideoViewSet,
     FoliageViewSet,
     AdjustmentsViewSet,
+    SyncViewSet,
 )
 
 router = DefaultRouter()
@@ -28,6 +29,7 @@ router.register(r"fungi", FungusViewSet, basename="fungus")
 router.register(r"pesticides", PesticideViewSet, basename="pesticide")
 router.register(r"fungicides", FungicideViewSet, basename="fungicide")
 router.register(r"adjustments", AdjustmentsViewSet, basename="adjustments")
+router.register(r"sync", SyncViewSet, basename="sync")
 
 roses_router = routers.NestedDefaultRouter(router, r"roses", lookup="rose")
 roses_router.register(r"sizes", SizeViewSet, basename="rose-sizes")
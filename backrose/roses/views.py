@@ -1,10 +1,24 @@
-from common import NestedViewSet
-from django.db.models import Count
+from common import (
+    NestedViewSet,
+    QueryPlan,
+    RowListMixin,
+    SparseFieldsMixin,
+    build_query_plan,
+    prune_fields,
+)
+from common.renderers import CSVRenderer, NDJSONRenderer
+from common.sparse import parse_paths
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from . import export, growth, importer, sync, timeline
+from .adjustments import get_adjustments
 from .filters import RoseFilter
 from .pagination import CustomPagination
 from .models import (
@@ -43,21 +57,30 @@ from .serializers import (
 )
 
 
-class RoseViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Rose.objects.all()
-        .order_by("id")
-        .prefetch_related(
-            "feedings",
-            "foliages",
-            "rosephotos",
-            "sizes",
-            "videos",
-            "rosepesticides",
-            "rosefungicides",
-        )
-        .select_related("breeder", "group")
-    )
+def growth_points(request):
+    try:
+        points = int(request.query_params.get("points", growth.POINTS))
+    except ValueError:
+        points = growth.POINTS
+    return max(growth.MIN_POINTS, min(points, growth.MAX_POINTS))
+
+
+class RoseViewSet(RowListMixin, SparseFieldsMixin, viewsets.ModelViewSet):
+    queryset = Rose.objects.all().order_by("id")
+    query_plans = {
+        # RoseListSerializer: group is rendered as its pk, no join needed. the
+        # list is served from values() rows, the plan covers row_list = False
+        "list": QueryPlan(
+            only=("id", "title", "photo", "variants", "blurhash", "group")
+        ),
+        "retrieve": build_query_plan(RoseSerializer),
+        # the timeline and growth only need to know the rose is there
+        "timeline": QueryPlan(only=("id",)),
+        "growth": QueryPlan(only=("id",)),
+    }
+    # the list renders from rows, see RowListMixin
+    sparse_actions = ("retrieve",)
+    export_chunk_size = export.CHUNK_SIZE
     pagination_class = CustomPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RoseFilter
@@ -76,11 +99,124 @@ class RoseViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
 
-        instance.refresh_from_db()
+        instance = (
+            self.get_query_plan("retrieve").apply(self.queryset).get(pk=instance.pk)
+        )
 
         response_serializer = RoseSerializer(instance)
         return Response(response_serializer.data)
 
+    @action(
+        detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, CSVRenderer]
+    )
+    def export(self, request):
+        """
+        the whole (filtered) catalogue as NDJSON or CSV (?format= or Accept),
+        ?include=sizes,feedings,... embeds collections. rows come in id order.
+        """
+
+        serializer = RoseSerializer(context=self.get_serializer_context())
+        include = parse_paths(request.query_params.get("include", ""))
+        prune_fields(serializer, expand=include, expand_param="include")
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = export.iter_rows(
+            queryset, serializer, build_query_plan(serializer), self.export_chunk_size
+        )
+
+        renderer = request.accepted_renderer
+        if renderer.format == "csv":
+            content = export.stream_csv(rows, export.csv_columns(serializer))
+            content_type = f"{renderer.media_type}; charset={renderer.charset}"
+        else:
+            content = export.stream_ndjson(rows)
+            content_type = renderer.media_type
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="roses.{renderer.format}"'
+        )
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        url_name="import",
+        parser_classes=[MultiPartParser, FormParser],
+    )
+    def import_catalogue(self, request):
+        """
+        upsert roses from an uploaded CSV/NDJSON ``file``, the format comes
+        from the file name or a ``format`` form field. rows that fail are
+        listed under errors, the others are imported.
+        """
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"file": ["No file was submitted."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        format = request.data.get("format") or importer.guess_format(upload.name)
+        if format not in importer.FORMATS:
+            return Response(
+                {"format": [f"Expected one of {', '.join(importer.FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = importer.RoseImporter().run(importer.read_rows(upload.file, format))
+        return Response(result)
+
+    @action(detail=True, methods=["get"])
+    def timeline(self, request, pk=None):
+        """
+        sizes, feedings, foliages and treatments of the rose merged into one
+        dated stream, newest first (?order=asc for oldest first), paged with
+        ?cursor= and ?page_size=.
+        """
+
+        rose = self.get_object()
+        params = request.query_params
+
+        order = params.get("order", "desc")
+        if order not in ("asc", "desc"):
+            return Response(
+                {"order": ["Expected asc or desc."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            size = int(params.get("page_size", timeline.PAGE_SIZE))
+        except ValueError:
+            size = timeline.PAGE_SIZE
+        size = max(1, min(size, timeline.MAX_PAGE_SIZE))
+
+        try:
+            events, cursor = timeline.Timeline(rose.pk, order == "desc").page(
+                params.get("cursor"), size, context=self.get_serializer_context()
+            )
+        except timeline.InvalidCursor as e:
+            return Response({"cursor": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = None
+        if cursor is not None:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", cursor
+            )
+        return Response({"next": next_url, "results": events})
+
+    @action(detail=True, methods=["get"])
+    def growth(self, request, pk=None):
+        """
+        growth of the rose from its sizes: totals, rates and regression
+        slopes per 30 days, seasonal deltas, monthly percentile bands and the
+        series downsampled to ?points= (default 200)
+        """
+
+        rose = self.get_object()
+        return Response(growth.rose_growth(rose.pk, growth_points(request)))
+
     @action(detail=True, methods=["delete"])
     def photo(self, request, pk=None):
         rose = self.get_object()
@@ -95,11 +231,40 @@ class RoseViewSet(viewsets.ModelViewSet):
 
 
 class GroupViewSet(viewsets.ModelViewSet):
-    queryset = Group.objects.annotate(rose_count=Count("roses"))
+    queryset = Group.objects.all()
     serializer_class = GroupSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["name"]
 
+    @action(detail=True, methods=["get"])
+    def growth(self, request, pk=None):
+        """
+        growth of the roses in the group, with the seasons and bands of those
+        roses, paged by rose with ?cursor= and ?page_size=
+        """
+
+        group = self.get_object()
+        params = request.query_params
+        try:
+            size = int(params.get("page_size", growth.PAGE_SIZE))
+        except ValueError:
+            size = growth.PAGE_SIZE
+        size = max(1, min(size, growth.MAX_PAGE_SIZE))
+
+        try:
+            result, cursor = growth.group_growth(
+                group.pk, growth_points(request), params.get("cursor"), size
+            )
+        except growth.InvalidCursor as e:
+            return Response({"cursor": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = None
+        if cursor is not None:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", cursor
+            )
+        return Response({**result, "next": next_url})
+
     # to do:
     # need to add ProtectedError in case of trying to delete group with roses both for backend and frontend
 
@@ -146,11 +311,13 @@ class FoliageViewSet(NestedViewSet):
 
 class RosePesticideViewSet(NestedViewSet):
     queryset = RosePesticide.objects.all()
+    query_plans = {"default": build_query_plan(RosePesticideSerializer)}
     serializer_class = RosePesticideSerializer
 
 
 class RoseFungicideViewSet(NestedViewSet):
     queryset = RoseFungicide.objects.all()
+    query_plans = {"default": build_query_plan(RoseFungicideSerializer)}
     serializer_class = RoseFungicideSerializer
 
 
@@ -158,6 +325,17 @@ class RosePhotoViewSet(NestedViewSet):
     queryset = RosePhoto.objects.all()
     serializer_class = RosePhotoSerializer
 
+    def get_batch_items(self, request):
+        """files can't travel in json: a multipart batch is one item per photo"""
+
+        if request.method == "POST" and request.FILES:
+            rose = self.kwargs["rose_pk"]
+            return [
+                {"photo": photo, "rose": rose}
+                for photo in request.FILES.getlist("photo")
+            ]
+        return super().get_batch_items(request)
+
 
 class VideoViewSet(NestedViewSet):
     queryset = Video.objects.all()
@@ -165,22 +343,52 @@ class VideoViewSet(NestedViewSet):
 
 
 class AdjustmentsViewSet(viewsets.ViewSet):
-    """Bulk endpoint"""
+    """Bulk endpoint, cached until reference data changes"""
 
     def list(self, request):
-        return Response(
-            {
-                "groups": GroupSerializer(
-                    Group.objects.annotate(rose_count=Count("roses")), many=True
-                ).data,
-                "breeders": BreederSerializer(Breeder.objects.all(), many=True).data,
-                "pests": PestSerializer(Pest.objects.all(), many=True).data,
-                "fungi": FungusSerializer(Fungus.objects.all(), many=True).data,
-                "pesticides": PesticideSerializer(
-                    Pesticide.objects.prefetch_related("pests"), many=True
-                ).data,
-                "fungicides": FungicideSerializer(
-                    Fungicide.objects.prefetch_related("fungi"), many=True
-                ).data,
-            }
-        )
+        etag, data = get_adjustments(self.build_adjustments)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in etags or "*" in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(data, headers=headers)
+
+    def build_adjustments(self):
+        return {
+            "groups": GroupSerializer(Group.objects.all(), many=True).data,
+            "breeders": BreederSerializer(Breeder.objects.all(), many=True).data,
+            "pests": PestSerializer(Pest.objects.all(), many=True).data,
+            "fungi": FungusSerializer(Fungus.objects.all(), many=True).data,
+            "pesticides": PesticideSerializer(
+                Pesticide.objects.prefetch_related("pests"), many=True
+            ).data,
+            "fungicides": FungicideSerializer(
+                Fungicide.objects.prefetch_related("fungi"), many=True
+            ).data,
+        }
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Changes since ?since=<token>, a full snapshot without one, in pages of
+    ?page_size= rows: follow the token while more is true
+    """
+
+    def list(self, request):
+        params = request.query_params
+        try:
+            size = int(params.get("page_size", sync.PAGE_SIZE))
+        except ValueError:
+            size = sync.PAGE_SIZE
+        size = max(1, min(size, sync.MAX_PAGE_SIZE))
+
+        try:
+            data = sync.collect_changes(
+                params.get("since"), context={"request": request}, page_size=size
+            )
+        except sync.InvalidToken as e:
+            return Response({"since": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(data, headers={"Cache-Control": "private, no-store"})
@@ -1,3 +1,4 @@
+from common.uploads import ImageUploadField
 from userprofile.models import User
 from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
@@ -6,6 +7,9 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.exceptions import TokenError
 
+# longest side of a stored profile picture, larger uploads are scaled down
+PROFILE_IMAGE_EDGE = 1024
+
 
 class UserSerializer(serializers.ModelSerializer):
 
@@ -14,9 +18,10 @@ class UserSerializer(serializers.ModelSerializer):
         source="profile.app_header",
         help_text="Заголовок приложения из профиля",
     )
-    image = serializers.ImageField(
+    image = ImageUploadField(
         required=False,
         source="profile.image",
+        max_edge=PROFILE_IMAGE_EDGE,
         help_text="Изображение профиля пользователя",
     )
 
@@ -1,4 +1,8 @@
+from io import BytesIO
+
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.urls import reverse
@@ -236,6 +240,25 @@ class TestUpdateProfileView:
         test_user.refresh_from_db()
         assert test_user.profile.app_header == update_data["app_header"]
 
+    def test_profile_image_scaled_down(
+        self, authenticated_client, test_user, settings, tmp_path
+    ):
+        """a large profile picture is stored as a JPEG of at most 1024 pixels"""
+        settings.MEDIA_ROOT = str(tmp_path)
+        buffer = BytesIO()
+        Image.new("RGB", (3000, 2000), "red").save(buffer, format="PNG")
+        image = SimpleUploadedFile("me.png", buffer.getvalue(), "image/png")
+
+        response = authenticated_client.patch(
+            reverse("user"), {"image": image}, format="multipart"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        test_user.profile.refresh_from_db()
+        with Image.open(test_user.profile.image) as stored:
+            assert stored.format == "JPEG"
+            assert stored.size == (1024, 683)
+
     def test_get_user_profile(self, authenticated_client, test_user):
         """get user profile test"""
         url = reverse("user")
@@ -0,0 +1,36 @@
+import { useMemo } from 'react';
+import { decode } from '../utils/blurhash';
+
+// the hash is blurred anyway, a few pixels stretched by css are enough
+const SIZE = 32;
+const cache = new Map();
+
+const toDataUrl = (hash) => {
+  if (!cache.has(hash)) {
+    const canvas = document.createElement('canvas');
+    canvas.width = SIZE;
+    canvas.height = SIZE;
+    const context = canvas.getContext('2d');
+    const image = context.createImageData(SIZE, SIZE);
+    image.data.set(decode(hash, SIZE, SIZE));
+    context.putImageData(image, 0, 0);
+    cache.set(hash, canvas.toDataURL());
+  }
+  return cache.get(hash);
+};
+
+// a css background for the tile until its photo arrives
+const useBlurhash = (hash) =>
+  useMemo(() => {
+    if (!hash) return undefined;
+    try {
+      return {
+        backgroundImage: `url(${toDataUrl(hash)})`,
+        backgroundSize: '100% 100%',
+      };
+    } catch {
+      return undefined;
+    }
+  }, [hash]);
+
+export default useBlurhash;
@@ -1,9 +1,13 @@
 import { Link } from 'react-router-dom';
 import { memo, useState } from 'react';
 import { RoseLoader } from '../Loaders/RoseLoader';
+import useBlurhash from '../../hooks/useBlurhash';
 
 const RoseCard = memo(({ rose, onDelete }) => {
   const [imageError, setImageError] = useState(false);
+  // resized copy for the tile, the original until it is rendered
+  const grid = rose.variants?.grid;
+  const placeholder = useBlurhash(rose.blurhash);
 
   return (
     <div id={rose.id} className="flex justify-center relative isolate">
@@ -21,12 +25,19 @@ const RoseCard = memo(({ rose, onDelete }) => {
         >
           <div className="p-4 h-48 relative flex items-center justify-center">
             {rose.photo && !imageError ? (
-              <img
-                src={rose.photo}
-                alt={rose.title_eng}
-                className="h-full w-auto max-w-full object-contain"
-                onError={() => setImageError(true)}
-              />
+              <picture className="h-full flex items-center justify-center">
+                {grid && <source srcSet={grid.webp} type="image/webp" />}
+                <img
+                  src={grid ? grid.jpeg : rose.photo}
+                  alt={rose.title_eng}
+                  width={grid?.width}
+                  height={grid?.height}
+                  loading="lazy"
+                  style={placeholder}
+                  className="h-full w-auto max-w-full object-contain"
+                  onError={() => setImageError(true)}
+                />
+              </picture>
             ) : (
               <div className="flex items-center justify-center h-full">
                 <RoseLoader />
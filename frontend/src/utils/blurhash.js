@@ -0,0 +1,82 @@
+// BlurHash decoding (https://blurha.sh), the counterpart of the encoder in
+// backrose/common/blurhash.py
+
+const ALPHABET =
+  '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~';
+
+const decode83 = (text) => {
+  let value = 0;
+  for (const character of text) {
+    const digit = ALPHABET.indexOf(character);
+    if (digit < 0) throw new Error(`invalid BlurHash character ${character}`);
+    value = value * 83 + digit;
+  }
+  return value;
+};
+
+const toLinear = (value) => {
+  const v = value / 255;
+  return v <= 0.04045 ? v / 12.92 : Math.pow((v + 0.055) / 1.055, 2.4);
+};
+
+const toSrgb = (value) => {
+  const v = Math.max(0, Math.min(1, value));
+  return v <= 0.0031308
+    ? Math.trunc(v * 12.92 * 255 + 0.5)
+    : Math.trunc((1.055 * Math.pow(v, 1 / 2.4) - 0.055) * 255 + 0.5);
+};
+
+const signPow = (value, exponent) =>
+  Math.sign(value) * Math.pow(Math.abs(value), exponent);
+
+const decodeDc = (value) => [
+  toLinear(value >> 16),
+  toLinear((value >> 8) & 255),
+  toLinear(value & 255),
+];
+
+const decodeAc = (value, maximum) =>
+  [Math.floor(value / 361), Math.floor(value / 19) % 19, value % 19].map(
+    (quantised) => signPow((quantised - 9) / 9, 2) * maximum
+  );
+
+// RGBA pixels of a width x height image, as ImageData wants them
+export const decode = (hash, width, height) => {
+  const sizeFlag = decode83(hash[0]);
+  const xComponents = (sizeFlag % 9) + 1;
+  const yComponents = Math.floor(sizeFlag / 9) + 1;
+  if (hash.length !== 4 + 2 * xComponents * yComponents) {
+    throw new Error('invalid BlurHash length');
+  }
+
+  const maximum = (decode83(hash[1]) + 1) / 166;
+  const colors = [decodeDc(decode83(hash.substring(2, 6)))];
+  for (let i = 1; i < xComponents * yComponents; i++) {
+    colors.push(decodeAc(decode83(hash.substring(4 + i * 2, 6 + i * 2)), maximum));
+  }
+
+  const pixels = new Uint8ClampedArray(width * height * 4);
+  for (let y = 0; y < height; y++) {
+    for (let x = 0; x < width; x++) {
+      let r = 0;
+      let g = 0;
+      let b = 0;
+      for (let j = 0; j < yComponents; j++) {
+        for (let i = 0; i < xComponents; i++) {
+          const basis =
+            Math.cos((Math.PI * x * i) / width) * Math.cos((Math.PI * y * j) / height);
+          const color = colors[i + j * xComponents];
+          r += color[0] * basis;
+          g += color[1] * basis;
+          b += color[2] * basis;
+        }
+      }
+      const offset = 4 * (x + y * width);
+      pixels[offset] = toSrgb(r);
+      pixels[offset + 1] = toSrgb(g);
+      pixels[offset + 2] = toSrgb(b);
+      pixels[offset + 3] = 255;
+    }
+  }
+  return pixels;
+};